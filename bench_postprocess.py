@@ -0,0 +1,118 @@
+"""
+Benchmark hậu xử lý: vòng lặp từng box (`.item()` mỗi phần tử) so với đường vector hoá
+(`processors/boxes.py`: một lần `boxes.data.cpu().numpy()` + np.bincount / argsort).
+
+    python bench_postprocess.py --boxes 300 --repeat 500            # tensor Torch (nếu có)
+    python bench_postprocess.py --boxes 300 --device cuda           # box nằm trên GPU
+
+Không cần ultralytics / Qt: dùng Results giả chỉ có `boxes.data/xyxy/cls`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.agent_detect.processors.color_check import ColorCheckProcessor
+from src.agent_detect.processors.solder_check import compare_object_counts
+
+
+def make_result(n: int, n_classes: int, device: str, rng: np.random.Generator):
+    xy = rng.uniform(0, 2000, (n, 2))
+    data = np.column_stack([
+        xy, xy + rng.uniform(5, 40, (n, 2)),
+        rng.uniform(0.3, 1.0, n), rng.integers(0, n_classes, n),
+    ]).astype(np.float32)
+    try:
+        import torch
+
+        data = torch.from_numpy(data).to(device)
+    except ImportError:
+        pass
+    return SimpleNamespace(boxes=SimpleNamespace(data=data, xyxy=data[:, :4], cls=data[:, 5]))
+
+
+# --- Cài đặt cũ (tham chiếu) ---------------------------------------------------
+
+
+def _to_float(v) -> float:
+    try:
+        return v.item()
+    except Exception:
+        return float(v)
+
+
+def legacy_color(r, expected_ids: list[int]) -> str:
+    coords = [
+        (_to_float(box[0]), _to_float(box[1]), int(_to_float(cls)))
+        for box, cls in zip(r.boxes.xyxy, r.boxes.cls)
+    ]
+    if not coords:
+        return "ERR"
+    if len(coords) != len(expected_ids):
+        return "NG"
+    coords.sort(key=lambda c: c[0])
+    return "OK" if [c[2] for c in coords] == expected_ids else "NG"
+
+
+def legacy_counts(results, required_counts: dict[int, int]) -> dict[int, int]:
+    detected = {cid: 0 for cid in required_counts}
+    for result in results:
+        for cls_val in result.boxes.cls:
+            class_id = int(getattr(cls_val, "item", lambda: cls_val)())
+            if class_id in required_counts:
+                detected[class_id] += 1
+    return detected
+
+
+# --------------------------------------------------------------------------------
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--boxes", type=int, default=300, help="Số box mỗi kết quả")
+    ap.add_argument("--classes", type=int, default=8)
+    ap.add_argument("--repeat", type=int, default=200)
+    ap.add_argument("--device", default="cpu", help="cpu / cuda (khi có Torch)")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    r = make_result(max(args.boxes, 1), args.classes, args.device, rng)
+    results = [r]
+
+    # Đáp án đúng cho ColorCheck: class id sắp theo x1
+    data = r.boxes.data.cpu().numpy() if hasattr(r.boxes.data, "cpu") else r.boxes.data
+    expected = [int(c) for c in data[np.argsort(data[:, 0], kind="stable"), 5]]
+    required = {c: 0 for c in range(args.classes)}
+
+    color = ColorCheckProcessor()
+    color.configure({"colors": expected, "sort_direction": "X"})
+
+    # Hai cách phải cho cùng kết quả
+    assert legacy_color(r, expected) == color._evaluate(r, "x", expected) == "OK"
+    new_counts = {k: v["detected"] for k, v in compare_object_counts(results, required).items()}
+    assert legacy_counts(results, required) == new_counts
+
+    cases = {
+        "ColorCheck._evaluate": (
+            lambda: legacy_color(r, expected),
+            lambda: color._evaluate(r, "x", expected),
+        ),
+        "compare_object_counts": (
+            lambda: legacy_counts(results, required),
+            lambda: compare_object_counts(results, required),
+        ),
+    }
+    print(f"{args.boxes} box, {args.classes} lớp, {args.repeat} lần, device={args.device}")
+    print(f"{'Hàm':<24}{'cũ (ms)':>12}{'mới (ms)':>12}{'tăng tốc':>10}")
+    for name, (old, new) in cases.items():
+        t_old = timeit.timeit(old, number=args.repeat) / args.repeat * 1000.0
+        t_new = timeit.timeit(new, number=args.repeat) / args.repeat * 1000.0
+        print(f"{name:<24}{t_old:>12.3f}{t_new:>12.3f}{t_old / t_new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
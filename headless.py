@@ -0,0 +1,426 @@
+"""
+Headless Runner - Chạy pipeline Camera → Detect → Protocol không cần giao diện.
+
+Đọc cấu hình đã lưu từ GUI (`runtime/app_settings.json`), dựng lại cùng pipeline nhưng
+không tạo widget nào (chỉ QCoreApplication cho QThread/Signal):
+1. Camera: USB (FrameGrabber), RTSP (RtspStream) hoặc DVP (service_dvp.py + shared memory).
+2. Detect: ThreshCheck (logic thuần) → YoloWorker → post-processor đang chọn.
+3. Protocol: gửi trạng thái kết quả tới các TCPClient đã cấu hình.
+
+Tuỳ chọn `--publish` ghi frame đã vẽ kết quả vào kênh shared memory `VIEW_SHM_NAME`;
+GUI gắn vào làm viewer bằng `python main.py --attach`.
+
+Cách dùng:
+    python headless.py [--settings runtime/app_settings.json] [--publish]
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+os.environ.setdefault("OPENCV_LOG_LEVEL", "ERROR")
+
+import cv2
+import numpy as np
+from PySide6.QtCore import QCoreApplication, QObject, QTimer, Qt
+
+import shared_memory_utils as smu
+from shared_memory_utils import SharedMemoryManager
+from src.agent_camera.frame import Frame
+from src.agent_camera.processors.base import Processor, CamSettings
+from src.agent_camera.processors.worker import Worker
+from src.agent_camera.processors.grabber import FrameGrabber
+from src.agent_camera.processors.rtsp_cam import RtspStream
+from src.agent_camera.dvp_service import DvpService, ServiceChannel, to_bgr
+from src.utils.metrics import metrics
+
+# Kênh SHM chứa frame đã vẽ kết quả cho viewer (GUI --attach)
+VIEW_SHM_NAME = smu.SHM_NAME + "_view"
+
+DEFAULT_SETTINGS = Path("runtime") / "app_settings.json"
+
+# Cùng thứ tự với CameraType trong src/agent_camera/base_widget.py
+CAMERA_GIGE, CAMERA_USB, CAMERA_RTSP, CAMERA_DVP = range(4)
+
+
+# ----------------------------- Camera sources -----------------------------
+
+
+class UsbSource(Processor):
+    """Nguồn USB không có panel: VideoCapture + FrameGrabber."""
+
+    name = "USBCamera"
+
+    def __init__(self, index: int) -> None:
+        super().__init__()
+        backend = cv2.CAP_DSHOW if sys.platform == "win32" else cv2.CAP_V4L2
+        cap = cv2.VideoCapture(index, backend)
+        if not cap.isOpened():
+            cap = cv2.VideoCapture(index)
+        if not cap.isOpened():
+            raise ConnectionError(f"Không thể mở USB Camera (index={index})")
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self._grabber = FrameGrabber(cap, name="UsbGrabber", release_on_exit=True).start()
+        self.is_open = True
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        return self._grabber.read(timeout=0.5)
+
+    def wait_ready(self, timeout: float) -> bool:
+        # read() đã tự chặn
+        return True
+
+    def disconnect_camera(self) -> bool:
+        self._grabber.stop()  # grabber tự release capture khi luồng thoát
+        self.is_open = False
+        return True
+
+
+class RtspSource(Processor):
+    """Nguồn RTSP không có panel: RtspStream (tự kết nối lại)."""
+
+    name = "RTSPCamera"
+
+    def __init__(self, url: str, transport: str = "udp", threads: int = 0) -> None:
+        super().__init__()
+        self._stream = RtspStream(url, transport, threads)
+        if not self._stream.open():
+            raise ConnectionError(f"Không thể mở luồng RTSP: {url}")
+        self.is_open = True
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        return self._stream.read(timeout=0.5)
+
+    def wait_ready(self, timeout: float) -> bool:
+        return True
+
+    def disconnect_camera(self) -> bool:
+        self._stream.close()
+        self.is_open = False
+        return True
+
+
+class ShmSource(Processor):
+    """
+    Đọc frame từ một kênh shared memory (service_dvp.py hoặc kênh viewer của headless).
+    Chặn trên tín hiệu commit của producer; tự gắn lại khi producer khởi động lại.
+
+    Với service DVP, truyền `channel` để đọc qua chính SHM của `ServiceChannel` (dưới
+    `channel.lock`, như IpcChannel trên GUI): watchdog gắn lại kênh sau restart, không có
+    mapping thứ hai bị lần attach mới xoá mất lease.
+    """
+
+    name = "DVPCamera"
+
+    def __init__(self, shm_name: str = smu.SHM_NAME,
+                 channel: Optional[ServiceChannel] = None) -> None:
+        super().__init__()
+        self.shm_name = channel.name if channel is not None else shm_name
+        self._channel = channel
+        self._shm: Optional[SharedMemoryManager] = None
+        self._last_id = -1
+        self._generation = None
+        self.is_open = True
+
+    def _connected(self) -> bool:
+        if self._shm is None:
+            if self._channel is not None:
+                return False
+            shm = SharedMemoryManager(create=False, name=self.shm_name)
+            if not shm.shm:
+                return False
+            self._shm = shm
+        return self._shm.ensure_connected()
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        if self._channel is None:
+            return self._read()
+        with self._channel.lock:
+            if self._channel.shm is not self._shm:
+                # Watchdog vừa gắn lại kênh (service restart): frame id đếm lại từ đầu
+                self._shm, self._last_id = self._channel.shm, -1
+            return self._read()
+
+    def _read(self) -> Optional[np.ndarray]:
+        if not self._connected():
+            return None
+        # Producer khởi động lại (layout mới) hoặc frame id lùi -> đọc lại từ đầu
+        if (self._shm.generation != self._generation
+                or self._shm.latest_frame_id() < self._last_id):
+            self._generation, self._last_id = self._shm.generation, -1
+        last = self._last_id if self._last_id >= 0 else None
+        frame, header = self._shm.acquire_frame(last_id=last, with_header=True)
+        if frame is None:
+            self._shm.wait_frame(last, timeout=0.1)
+            return None
+        self._last_id = header.frame_id
+        return to_bgr(frame, header)
+
+    def wait_ready(self, timeout: float) -> bool:
+        # Đã kết nối thì get_frame() tự chờ tín hiệu; chưa có producer thì chờ thử lại
+        if self._shm is not None:
+            return True
+        return super().wait_ready(timeout)
+
+    def disconnect_camera(self) -> bool:
+        # SHM của ServiceChannel do chủ kênh đóng
+        if self._shm is not None and self._channel is None:
+            self._shm.close()
+        self._shm = None
+        self.is_open = False
+        return True
+
+
+# ----------------------------- Protocol -----------------------------
+
+
+class TcpResultSink:
+    """Gửi trạng thái kết quả (OK/NG/...) tới một server TCP, tự kết nối lại khi rớt."""
+
+    retry_interval = 2.0
+
+    def __init__(self, addr: str, port: int) -> None:
+        self.addr = addr or "127.0.0.1"
+        self.port = int(port)
+        self._sock: Optional[socket.socket] = None
+        self._next_try = 0.0
+
+    def send(self, text: str) -> bool:
+        if self._sock is None:
+            if time.monotonic() < self._next_try:
+                return False
+            try:
+                self._sock = socket.create_connection((self.addr, self.port), timeout=0.5)
+                print(f"[Headless] TCP đã kết nối {self.addr}:{self.port}")
+            except OSError:
+                self._next_try = time.monotonic() + self.retry_interval
+                metrics.count("protocol.errors")
+                return False
+        try:
+            self._sock.sendall(text.encode("utf-8"))
+            return True
+        except OSError:
+            self.close()
+            self._next_try = time.monotonic() + self.retry_interval
+            metrics.count("protocol.errors")
+            return False
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+
+def build_sinks(protocols: Dict[str, Any]) -> List[TcpResultSink]:
+    sinks = []
+    for name, data in (protocols or {}).items():
+        kind = data.get("type")
+        cfg = data.get("settings", {})
+        if kind == "TCPClient":
+            sinks.append(TcpResultSink(cfg.get("addr"), cfg.get("port", 9760)))
+        else:
+            print(f"[Headless] Bỏ qua protocol '{name}' ({kind}): chưa hỗ trợ chạy headless")
+    return sinks
+
+
+# ----------------------------- Pipeline -----------------------------
+
+
+class HeadlessPipeline(QObject):
+    """Camera → Detect → Protocol không có widget."""
+
+    def __init__(self, settings: Dict[str, Any], publish: bool = False) -> None:
+        super().__init__()
+        # Import muộn: kéo theo ultralytics/torch
+        from src.agent_detect.worker import YoloWorker
+        from src.agent_detect.processors._thresh_Check import ThreshCheck
+        from src.agent_detect.processors.pipeline import ProcessorPipeline
+        from src.agent_detect.processors.registry import create_processors
+        from src.agent_detect.utils import plot, put_status
+
+        self._plot, self._put_status = plot, put_status
+        self._thresh_check = ThreshCheck.evaluate
+        self._service: Optional[DvpService] = None
+        self._service_channels: List[ServiceChannel] = []
+        self._viewer: Optional[SharedMemoryManager] = None
+        self._publish = publish
+
+        detect = settings.get("detect", {})
+        self._thresh_cfg = detect.get("thresh_config", {})
+        self._plot_cfg = detect.get("plot_config", {})
+
+        # Post-processor: theo tên đã lưu, nếu không khớp thì theo index
+        procs = create_processors()
+        if not procs:
+            raise RuntimeError("Không tìm thấy processor hậu xử lý nào")
+        by_name = {p.name: p for p in procs}
+        idx = min(max(int(detect.get("active_index", 0)), 0), len(procs) - 1)
+        active = by_name.get(detect.get("active_name"), procs[idx])
+        panels = detect.get("panels", {})
+        for p in procs:
+            p.configure(panels.get(p.name, {}))
+        active.configure(detect.get("panel", {}))
+        # Chuỗi processor (nếu có) thay cho processor đang chọn
+        self._proc = ProcessorPipeline.from_dict(detect.get("pipeline"), procs) or active
+
+        self._sinks = build_sinks(settings.get("protocol", {}))
+
+        # Detect
+        self._yolo = YoloWorker()
+        model_path = detect.get("model_path")
+        if not model_path:
+            raise ValueError("Chưa cấu hình model_path trong settings['detect']")
+        self._yolo.set_options(**detect.get("inference", {}))
+        self._yolo.set_model(model_path, detect.get("backend", "pytorch"))
+        print(f"[Headless] Model: {model_path} ({self._yolo.backend})")
+        self._yolo.set_conf(detect.get("model_conf", 50) / 100.0)
+        batch = detect.get("batch", {})
+        self._yolo.set_batch(batch.get("size", 1), batch.get("wait_ms", 0))
+        self._yolo.result_ready.connect(self._on_result, Qt.ConnectionType.QueuedConnection)
+
+        # Camera
+        self._source = self._build_source(settings.get("camera", {}))
+        self._worker = Worker(self._source)
+        # Direct: kiểm độ sáng + chuyển frame cho YoloWorker ngay trên luồng camera
+        self._worker.frame_ready.connect(self._on_frame, Qt.ConnectionType.DirectConnection)
+
+    def _build_source(self, cam: Dict[str, Any]) -> Processor:
+        s = CamSettings(**cam.get("panel", {}))
+        cam_type = cam.get("camera_type", CAMERA_USB)
+        if cam_type == CAMERA_USB:
+            digits = "".join(ch for ch in (s.dev or "0") if ch.isdigit())
+            return UsbSource(int(digits or 0))
+        if cam_type == CAMERA_RTSP:
+            return RtspSource(s.dev, s.advanced.get("transport", "udp"),
+                              int(s.advanced.get("threads", 0)))
+        if cam_type == CAMERA_DVP:
+            # Cùng vòng đời với GUI: handshake, watchdog heartbeat, restart có backoff
+            devices = [d.strip() for d in (s.dev or "").split(",") if d.strip()]
+            self._service = DvpService(devices)
+            ok, msg = self._service.launch()
+            if not ok:
+                raise ConnectionError(f"Service DVP không khởi động được: {msg}")
+            self._service_channels = [ServiceChannel(i) for i in range(max(len(devices), 1))]
+            self._service.start_watchdog(self._service_channels)
+            metrics.register_gauge("camera.service_restarts", lambda: self._service.restarts)
+            index = int(s.advanced.get("channel", 0))
+            if not 0 <= index < len(self._service_channels):
+                raise ValueError(f"channel={index} ngoài số camera của service")
+            return ShmSource(channel=self._service_channels[index])
+        raise ValueError(f"camera_type={cam_type} chưa hỗ trợ chạy headless")
+
+    def start(self) -> None:
+        self._yolo.start()
+        self._worker.start()
+        print("[Headless] Pipeline đang chạy (Ctrl+C để dừng)")
+
+    def stop(self) -> None:
+        self._worker.stop()
+        self._source.disconnect_camera()
+        self._yolo.stop()
+        if self._service is not None:
+            self._service.stop_watchdog()
+            for ch in self._service_channels:
+                ch.close()
+            self._service.terminate()
+        for sink in self._sinks:
+            sink.close()
+        if self._viewer is not None:
+            self._viewer.close()
+
+    # Luồng camera
+    def _on_frame(self, frame: Frame) -> None:
+        with metrics.timer("detect.thresh"):
+            ok, avg = self._thresh_check(frame.data, self._thresh_cfg)
+        if ok:
+            self._yolo.on_frame_ready(frame)
+        else:
+            metrics.count("detect.below_thresh")
+
+    # Luồng chính
+    def _on_result(self, source: Frame, results: list) -> None:
+        try:
+            with metrics.timer("detect.process"):
+                output = self._proc.process(results)
+            output.seq = source.seq
+            output.timestamp = source.timestamp
+            metrics.record("pipeline.capture_to_result", output.latency_ms)
+
+            for sink in self._sinks:
+                sink.send(output.status)
+            print(f"\r[Headless] #{output.seq} {output.status} "
+                  f"({output.latency_ms:.0f} ms)   ", end="", flush=True)
+
+            if self._publish:
+                with metrics.timer("detect.plot"):
+                    img = self._plot(results[0], **self._plot_cfg)
+                    img = self._put_status(img, output.status, 1.2)
+                self._publish_frame(img, output.seq)
+        except Exception as e:
+            metrics.count("detect.errors")
+            print("\r[Headless] Lỗi xử lý processor:", e, end="", flush=True)
+
+    def _publish_frame(self, img: np.ndarray, seq: int) -> None:
+        """Ghi frame đã vẽ vào kênh viewer (tạo khi có frame đầu tiên để biết kích thước)."""
+        if self._viewer is None:
+            h, w = img.shape[:2]
+            channels = img.shape[2] if img.ndim == 3 else 1
+            self._viewer = SharedMemoryManager(
+                create=True, slot_size=smu.slot_bytes_for(w, h, channels), name=VIEW_SHM_NAME
+            )
+            print(f"\n[Headless] Viewer channel: {VIEW_SHM_NAME}")
+        if not self._viewer.write_frame(img, max(seq, 0)):
+            metrics.count("view.dropped")
+
+
+def load_settings(path: Path) -> Dict[str, Any]:
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Chạy pipeline Camera → Detect → Protocol không GUI")
+    parser.add_argument("--settings", type=Path, default=DEFAULT_SETTINGS)
+    parser.add_argument("--publish", action="store_true",
+                        help=f"Ghi frame đã vẽ kết quả vào shared memory '{VIEW_SHM_NAME}'")
+    parser.add_argument("--metrics", type=Path, default=None,
+                        help="Ghi thêm snapshot chỉ số hiệu năng (CSV/JSONL) mỗi 10 giây")
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    try:
+        pipeline = HeadlessPipeline(load_settings(args.settings), publish=args.publish)
+    except Exception as e:
+        print(f"[Headless] Không khởi tạo được pipeline: {e}")
+        return 1
+
+    pipeline.start()
+    app.aboutToQuit.connect(pipeline.stop)
+
+    # Ctrl+C: event loop Qt không trả quyền cho Python, dùng timer để handler được gọi
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, lambda *_: app.quit())
+    tick = QTimer()
+    tick.start(200)
+    tick.timeout.connect(lambda: None)
+
+    if args.metrics:
+        export = QTimer()
+        export.timeout.connect(lambda: metrics.export(args.metrics))
+        export.start(10_000)
+
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -35,6 +35,7 @@ from PySide6.QtGui import QAction, QIcon
 
 # Import các module chính
 from src.agent_camera import BaseCameraWidget
+from src.agent_camera.frame import as_array
 try:
     from src.agent_detect import BaseDetectWidget
 except ImportError as e:
@@ -46,7 +47,7 @@ try:
 except ImportError as e:
     print(f"Warning: Could not import ProtocolMain: {e}")
     ProtocolMain = None
-from src.utils import apply_stylesheet, center_window, ViewImage, SettingsManager
+from src.utils import apply_stylesheet, center_window, ViewImage, SettingsManager, metrics
 
 
 class MainWindow(QMainWindow):
@@ -159,7 +160,9 @@ class MainWindow(QMainWindow):
         
     def _create_settings_tab(self):
         """Tạo tab Settings."""
-        from PySide6.QtWidgets import QLabel, QPushButton, QGroupBox, QFormLayout
+        from PySide6.QtWidgets import (
+            QLabel, QPushButton, QGroupBox, QFormLayout, QTableWidget, QHeaderView
+        )
         
         widget = QWidget()
         layout = QVBoxLayout(widget)
@@ -187,9 +190,69 @@ class MainWindow(QMainWindow):
         
         action_group.setLayout(action_layout)
         layout.addWidget(action_group)
+
+        # Performance group: latency p50/p95/p99, FPS, hàng đợi, drop theo từng stage
+        perf_group = QGroupBox("Hiệu năng pipeline")
+        perf_layout = QVBoxLayout()
+
+        self.tbl_metrics = QTableWidget(0, 5)
+        self.tbl_metrics.setHorizontalHeaderLabels(["Stage", "n", "p50", "p95", "p99 / giá trị"])
+        self.tbl_metrics.verticalHeader().setVisible(False)
+        self.tbl_metrics.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.tbl_metrics.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        perf_layout.addWidget(self.tbl_metrics)
+
+        btn_row = QHBoxLayout()
+        btn_export = QPushButton("📤 Xuất CSV/JSONL")
+        btn_export.clicked.connect(self._export_metrics)
+        btn_row.addWidget(btn_export)
+        btn_reset = QPushButton("🔄 Reset")
+        btn_reset.clicked.connect(metrics.reset)
+        btn_row.addWidget(btn_reset)
+        perf_layout.addLayout(btn_row)
+
+        perf_group.setLayout(perf_layout)
+        layout.addWidget(perf_group, stretch=1)
+
+        # Chỉ làm mới bảng khi tab Settings đang hiển thị
+        self._metrics_timer = QTimer(self)
+        self._metrics_timer.setInterval(1000)
+        self._metrics_timer.timeout.connect(self._refresh_metrics)
         
-        layout.addStretch()
         return widget
+
+    def _refresh_metrics(self):
+        """Cập nhật bảng chỉ số hiệu năng từ registry."""
+        from PySide6.QtWidgets import QTableWidgetItem
+
+        rows = metrics.snapshot()
+        self.tbl_metrics.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            if row["kind"] == "latency":
+                cells = [
+                    str(row.get("count", 0)),
+                    *(f"{row[k]:.1f} ms" if k in row else "-" for k in ("p50_ms", "p95_ms", "p99_ms")),
+                ]
+            else:
+                unit = " fps" if row["kind"] == "rate" else ""
+                cells = [str(row.get("count", "")), "", "", f"{row['value']:.1f}{unit}"]
+            for j, text in enumerate([row["name"], *cells]):
+                self.tbl_metrics.setItem(i, j, QTableWidgetItem(text))
+
+    def _export_metrics(self):
+        """Ghi thêm snapshot chỉ số hiện tại vào file CSV hoặc JSONL."""
+        from PySide6.QtWidgets import QFileDialog
+
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Xuất chỉ số hiệu năng", "runtime/metrics.csv", "CSV (*.csv);;JSON Lines (*.jsonl)"
+        )
+        if not path:
+            return
+        try:
+            metrics.export(path)
+            self.status_bar.showMessage(f"✓ Đã xuất chỉ số: {path}", 3000)
+        except Exception as e:
+            QMessageBox.critical(self, "Lỗi", f"Không thể xuất chỉ số:\n{e}")
         
     def _setup_menu(self):
         """Thiết lập menu bar."""
@@ -264,23 +327,52 @@ class MainWindow(QMainWindow):
             )
 
     def _on_frame_received(self, frame):
-        """Hiển thị frame lên ViewImage và tự động fit lần đầu."""
+        """Hiển thị frame (Frame hoặc ndarray) lên ViewImage và tự động fit lần đầu."""
+        if hasattr(frame, 'age'):
+            metrics.record("pipeline.capture_to_display", frame.age() * 1000.0)
+        frame = as_array(frame)
         if frame is None:
             return
             
         try:
-            self.view_image.add_image(frame)
+            with metrics.timer("view.add_image"):
+                self.view_image.add_image(frame)
             
             if self._first_frame:
                 self.view_image.refit()
                 self._first_frame = False
         except Exception as e:
+            metrics.count("view.errors")
             print(f"Lỗi hiển thị frame: {e}")
 
+    def attach_viewer(self, shm_name=None):
+        """Gắn GUI làm viewer cho headless runner (đọc kênh SHM do `headless.py --publish` ghi)."""
+        from headless import ShmSource, VIEW_SHM_NAME
+        from src.agent_camera.processors.worker import Worker
+
+        self._viewer_source = ShmSource(shm_name or VIEW_SHM_NAME)
+        self._viewer_worker = Worker(self._viewer_source)
+        self._viewer_worker.frame_ready.connect(
+            self._on_frame_received,
+            Qt.ConnectionType.QueuedConnection
+        )
+        self._viewer_worker.start()
+        self.status_bar.showMessage(f"Viewer: {self._viewer_source.shm_name}", 4000)
+
+    def _detach_viewer(self):
+        worker = getattr(self, "_viewer_worker", None)
+        if worker is not None:
+            worker.stop()
+            self._viewer_source.disconnect_camera()
+            self._viewer_worker = None
+
     def _on_detect_result(self, result):
         """Xử lý kết quả từ module Detect."""
         try:
             status = result.status if hasattr(result, 'status') else str(result)
+            latency = getattr(result, 'latency_ms', None)
+            if latency is not None:
+                status = f"{status} (frame #{result.seq}, trễ {latency:.0f} ms)"
             self.status_bar.showMessage(f"AI Status: {status}", 2000)
             
             # TODO: Có thể gửi kết quả qua Protocol nếu cần
@@ -291,6 +383,11 @@ class MainWindow(QMainWindow):
     def _on_tab_changed(self, index):
         """Callback khi chuyển tab."""
         tab_names = ["Camera", "Detect", "Protocol", "Settings"]
+        if self.tab_widget.widget(index) is self.settings_widget:
+            self._refresh_metrics()
+            self._metrics_timer.start()
+        else:
+            self._metrics_timer.stop()
         if 0 <= index < len(tab_names):
             self.status_bar.showMessage(f"Đã chuyển sang tab: {tab_names[index]}", 2000)
 
@@ -391,6 +488,7 @@ class MainWindow(QMainWindow):
         else:
             if reply == QMessageBox.StandardButton.Yes:
                 self._save_settings()
+            self._detach_viewer()
             event.accept()
 
 
@@ -410,6 +508,10 @@ def main():
         pass
     
     window.show()
+
+    # --attach: chỉ làm viewer cho pipeline đang chạy bằng headless.py --publish
+    if "--attach" in sys.argv:
+        window.attach_viewer()
     
     # Chạy event loop
     sys.exit(app.exec())
@@ -1,10 +1,17 @@
 """
 DVP Camera Service (Python 3.6)
-Writes frames to Shared Memory (mmap) for high-performance IPC.
+Writes frames to Shared Memory (named mmap on Windows, /dev/shm on Linux) for high-performance IPC.
+
+Several cameras can be served by one process: each device gets its own SHM channel
+(see shared_memory_utils.channel_name) and its own acquisition thread.
+
+Each channel also has a small command channel (shared_memory_utils.ControlChannel) so the
+GUI can change exposure, trigger mode and sensor ROI, and fire software triggers.
 """
 import sys
 import time
 import argparse
+import threading
 import numpy as np
 import cv2
 
@@ -17,7 +24,8 @@ except ImportError:
 
 # Import Shared Memory Manager
 try:
-    from shared_memory_utils import SharedMemoryManager
+    import shared_memory_utils as smu
+    from shared_memory_utils import SharedMemoryManager, ControlChannel
 except ImportError:
     print("FATAL: Could not import 'shared_memory_utils'.")
     sys.exit(1)
@@ -40,80 +48,303 @@ def frame2mat(frameBuffer):
     mat = mat.reshape(frame.iHeight, frame.iWidth, shape)
     return mat
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--port", type=int, default=65432, help="Unused in Shared Memory mode")
-    parser.add_argument("--device", type=str, default=None, help="Device FriendlyName or Index")
-    args = parser.parse_args()
+def pixel_format(frame):
+    """Map DVP ImageFormat to the SHM pixel format code."""
+    table = {
+        ImageFormat.FORMAT_MONO: smu.PIXFMT_MONO,
+        ImageFormat.FORMAT_BAYER_BG: smu.PIXFMT_BAYER_BG,
+        ImageFormat.FORMAT_BAYER_GB: smu.PIXFMT_BAYER_GB,
+        ImageFormat.FORMAT_BAYER_GR: smu.PIXFMT_BAYER_GR,
+        ImageFormat.FORMAT_BAYER_RG: smu.PIXFMT_BAYER_RG,
+        ImageFormat.FORMAT_BGR24: smu.PIXFMT_BGR24,
+        ImageFormat.FORMAT_BGR32: smu.PIXFMT_BGR32,
+        ImageFormat.FORMAT_RGB24: smu.PIXFMT_RGB24,
+        ImageFormat.FORMAT_RGB32: smu.PIXFMT_RGB32,
+    }
+    return table.get(frame.format, 0)
 
-    # 1. Setup Camera
-    camera = None
+def max_resolution(camera, mat):
+    """Max sensor resolution (ROI description), falling back to the first frame size."""
     try:
-        if args.device and args.device.isdigit():
-             camera = Camera(int(args.device))
-        elif args.device:
-             camera = Camera(str(args.device))
-        else:
-             # Auto select first
-             camera = Camera(0)
-             
-        camera.TriggerState = False # Continuous
-        camera.Start()
-        print(f"CAMERA_READY: {camera}")
-    except Exception as e:
-        print(f"CAMERA_ERROR: {e}")
-        return
+        desc = camera.RoiDescr
+        return int(desc.iMaxW), int(desc.iMaxH)
+    except Exception:
+        return mat.shape[1], mat.shape[0]
 
-    # 2. Setup Shared Memory
-    try:
-        shm = SharedMemoryManager(create=True)
-        print("SHARED_MEMORY_READY")
-    except Exception as e:
-        print(f"SHM_ERROR: {e}")
-        if camera:
-            camera.Stop()
-            camera.Close()
-        return
+def grab_first(camera, attempts=5):
+    """Wait for the first frame; used to size the SHM slots."""
+    for _ in range(attempts):
+        try:
+            frame = camera.GetFrame(2000)
+        except dvpException:
+            continue
+        if frame:
+            mat = frame2mat(frame)
+            if mat is not None:
+                return frame, mat
+    return None, None
 
-    frame_count = 0
-    print("SERVICE_LOOP_START")
+class CameraChannel(object):
+    """One camera + one SHM ring, pumped by its own thread, plus a command thread."""
+
+    def __init__(self, index, device, args):
+        self.index = index
+        self.device = device
+        self.args = args
+        self.name = smu.channel_name(index)
+        self.camera = None
+        self.shm = None
+        self.ctl = None
+        self.frame_count = 0
+        self.dropped = 0
+        self.timeouts = 0
+        self.heartbeat = 0
+        self._first = None
+        self._pending_roi = None
+        self._roi_lock = threading.Lock()
+        self._running = False
+        self._thread = None
+        self._ctl_thread = None
+
+    def open(self):
+        """Open camera and SHM. Prints the readiness lines the GUI waits for."""
+        tag = "[{}]".format(self.index)
+        try:
+            if self.device is not None and str(self.device).isdigit():
+                 self.camera = Camera(int(self.device))
+            elif self.device is not None:
+                 self.camera = Camera(str(self.device))
+            else:
+                 # Auto select first
+                 self.camera = Camera(0)
+
+            self.camera.TriggerState = False # Continuous
+            if self.args.raw:
+                try:
+                    self.camera.TargetFormat = StreamFormat.S_RAW8
+                except Exception as e:
+                    print(f"RAW_FORMAT_WARNING{tag}: {e}")
+            self.camera.Start()
+            print(f"CAMERA_READY{tag}: {self.camera}")
+        except Exception as e:
+            print(f"CAMERA_ERROR{tag}: {e}")
+            self.close()
+            return False
+
+        # Setup Shared Memory (slot sized for the largest frame the camera can produce)
+        self._first, first_mat = grab_first(self.camera)
+        try:
+            slot_bytes = self.args.slot_bytes
+            if not slot_bytes:
+                if first_mat is None:
+                    slot_bytes = smu.SHM_SLOT_SIZE
+                else:
+                    width, height = max_resolution(self.camera, first_mat)
+                    slot_bytes = smu.slot_bytes_for(width, height, first_mat.shape[2],
+                                                    first_mat.itemsize)
+            self.shm = SharedMemoryManager(create=True, n_slots=self.args.slots,
+                                           slot_size=slot_bytes, name=self.name)
+            print(f"SHARED_MEMORY_READY{tag}: name={self.name} slots={self.args.slots} "
+                  f"slot_bytes={slot_bytes}")
+        except Exception as e:
+            print(f"SHM_ERROR{tag}: {e}")
+            self.close()
+            return False
+
+        try:
+            self.ctl = ControlChannel(self.name, create=True)
+        except Exception as e:
+            # Streaming still works without remote control
+            print(f"CONTROL_ERROR{tag}: {e}")
+            self.ctl = None
+        return True
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        if self.ctl:
+            self._ctl_thread = threading.Thread(target=self._control_loop, daemon=True)
+            self._ctl_thread.start()
+
+    def stop(self):
+        self._running = False
+        for thread in (self._thread, self._ctl_thread):
+            if thread:
+                thread.join(timeout=3.0)
+        self._thread = self._ctl_thread = None
+
+    # -----------------
+    # Commands (GUI -> camera)
+    # -----------------
+    def _control_loop(self):
+        while self._running:
+            try:
+                req = self.ctl.poll(timeout=0.2)
+                if req is None:
+                    continue
+                seq, cmd, params = req
+                try:
+                    self.ctl.respond(seq, True, self.handle_command(cmd, params))
+                except Exception as e:
+                    self.ctl.respond(seq, False, str(e))
+            except Exception as e:
+                print(f"Control Error[{self.index}]: {e}")
+                time.sleep(0.1)
+
+    def handle_command(self, cmd, params):
+        """Apply one command; the return value is sent back to the GUI."""
+        cam = self.camera
+        if cmd == "configure":
+            if "exposure_auto" in params:
+                if params["exposure_auto"]:
+                    cam.AeOperation = AeOperation.AE_OP_CONTINUOUS
+                    cam.AeMode = AeMode.AE_MODE_AE_ONLY
+                else:
+                    cam.AeOperation = AeOperation.AE_OP_OFF
+            if params.get("exposure") and not params.get("exposure_auto"):
+                cam.Exposure = float(params["exposure"])
+            if "trigger_mode" in params:
+                # Hardware/software trigger: only frames actually requested are read out
+                cam.TriggerState = bool(params["trigger_mode"])
+            if params.get("roi"):
+                self.set_roi(*params["roi"])
+            return self.status()
+        if cmd == "trigger":
+            cam.TriggerFire()
+            return None
+        if cmd == "status":
+            return self.status()
+        raise ValueError("Unknown command: {}".format(cmd))
+
+    def set_roi(self, x, y, w, h):
+        """
+        Sensor ROI (restarts acquisition; must fit in the slot sized at start-up).
+        Only queued here: _loop applies it between two GetFrame calls, so Stop()/Start()
+        never run while the acquisition thread is inside GetFrame.
+        """
+        with self._roi_lock:
+            self._pending_roi = (int(x), int(y), int(w), int(h))
+
+    def _apply_pending_roi(self):
+        with self._roi_lock:
+            roi, self._pending_roi = self._pending_roi, None
+        if roi is None:
+            return
+        cam = self.camera
+        cam.Stop()
+        try:
+            region = cam.Roi
+            region.X, region.Y, region.W, region.H = roi
+            cam.Roi = region
+        except Exception as e:
+            print(f"ROI_ERROR[{self.index}]: {e}")
+        finally:
+            cam.Start()
+
+    def status(self):
+        return {"frames": self.frame_count, "dropped": self.dropped, "timeouts": self.timeouts}
+
+    def _loop(self):
+        while self._running:
+            # Heartbeat + counters for the GUI watchdog (advances at least every GetFrame timeout)
+            self.heartbeat += 1
+            self.shm.publish_stats(self.heartbeat, self.frame_count, self.timeouts, self.dropped)
 
-    try:
-        while True:
             # Get Frame
             try:
-                # Timeout 2000ms
-                frame = camera.GetFrame(2000)
+                self._apply_pending_roi()
+                if self._first is not None:
+                    frame, self._first = self._first, None
+                else:
+                    # Timeout 2000ms
+                    frame = self.camera.GetFrame(2000)
                 if frame:
+                    stamp = time.monotonic()
                     mat = frame2mat(frame)
                     if mat is not None:
-                        # Write to Shared Memory
-                        shm.write_frame(mat, frame_count)
-                        frame_count += 1
-                        
+                        # Write to Shared Memory (bo frame neu reader dang muon het cac slot)
+                        if not self.shm.write_frame(mat, self.frame_count,
+                                                    pixel_format(frame[0]), stamp):
+                            self.dropped += 1
+                        self.frame_count += 1
+
             except dvpException as e:
                 # Timeout is normal if frame rate is low or camera hasn't started sending yet
-                if e.Status != Status.DVP_STATUS_TIME_OUT:
-                    print(f"DVP Warning: {e.Status}")
-                    
+                if e.Status == Status.DVP_STATUS_TIME_OUT:
+                    self.timeouts += 1
+                else:
+                    print(f"DVP Warning[{self.index}]: {e.Status}")
+
             except Exception as e:
-                print(f"Loop Error: {e}")
+                print(f"Loop Error[{self.index}]: {e}")
                 # Don't break immediately, retry
                 time.sleep(0.1)
 
-    except KeyboardInterrupt:
-        print("Stopping service...")
-        
-    finally:
-        print("Closing resources...")
+    def close(self):
         try:
-            if shm: shm.close()
+            if self.ctl: self.ctl.close()
         except: pass
+        self.ctl = None
         try:
-            if camera:
-                camera.Stop()
-                camera.Close()
+            if self.shm: self.shm.close()
         except: pass
+        self.shm = None
+        try:
+            if self.camera:
+                self.camera.Stop()
+                self.camera.Close()
+        except: pass
+        self.camera = None
+
+
+def parse_devices(spec):
+    """'0,1,SN123' -> [0, 1, 'SN123']; None -> [None] (first camera)."""
+    if not spec:
+        return [None]
+    return [d.strip() for d in spec.split(",") if d.strip()]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=65432, help="Unused in Shared Memory mode")
+    parser.add_argument("--device", type=str, default=None,
+                        help="Device FriendlyName or Index; comma-separated for several cameras")
+    parser.add_argument("--slots", type=int, default=smu.SHM_SLOTS, help="Ring buffer slots")
+    parser.add_argument("--slot-bytes", type=int, default=0,
+                        help="Slot size in bytes (0 = from camera max resolution)")
+    parser.add_argument("--raw", action="store_true",
+                        help="Ship RAW8 Bayer frames (debayered by the reader)")
+    args = parser.parse_args()
+
+    # 1. Open every device on its own channel (channel index = position in --device)
+    channels = []
+    for index, device in enumerate(parse_devices(args.device)):
+        channel = CameraChannel(index, device, args)
+        if channel.open():
+            channels.append(channel)
+
+    if not channels:
+        print("SERVICE_ERROR: no camera could be opened")
+        return
+
+    # 2. One acquisition thread per camera
+    for channel in channels:
+        channel.start()
+    print(f"SERVICE_LOOP_START: channels={len(channels)}")
+
+    try:
+        while True:
+            time.sleep(0.5)
+
+    except KeyboardInterrupt:
+        print("Stopping service...")
+
+    finally:
+        for channel in channels:
+            channel.stop()
+            print(f"Closing resources[{channel.index}]... "
+                  f"(frames: {channel.frame_count}, dropped: {channel.dropped})")
+            channel.close()
 
 if __name__ == "__main__":
     main()
@@ -1,96 +1,850 @@
+import ctypes
+import ctypes.util
+import json
 import mmap
+import os
 import struct
+import tempfile
+import threading
+import time
+import weakref
+from collections import namedtuple
+from contextlib import contextmanager
+
 import numpy as np
 import platform
 
-SHM_SIZE = 32 * 1024 * 1024  # 32 MB
-SHM_NAME = "Local\\DvpCamFrame_v3" # v3 to force fresh memory
+# NOTE: module nay duoc dung chung boi service_dvp.py (Python 3.6) va ung dung chinh,
+# nen chi dung cu phap/thu vien co san tu Python 3.6.
+
+SHM_NAME = "Local\\DvpCamFrame_v6" # v6: header nhieu dinh dang (dtype, pixel format, stride)
+SHM_SLOTS = 4                      # So slot mac dinh cua ring (4-8)
+SHM_SLOT_SIZE = 16 * 1024 * 1024   # 16 MB / slot (mac dinh neu service khong tinh tu camera)
+
+SHM_MAGIC = 0xDEADBEEF
+SHM_VERSION = 3
+
+# Dinh dang pixel (dong bo voi ImageFormat cua DVP)
+PIXFMT_MONO = 1
+PIXFMT_BAYER_BG = 2
+PIXFMT_BAYER_GB = 3
+PIXFMT_BAYER_GR = 4
+PIXFMT_BAYER_RG = 5
+PIXFMT_BGR24 = 6
+PIXFMT_BGR32 = 7
+PIXFMT_RGB24 = 8
+PIXFMT_RGB32 = 9
+BAYER_FORMATS = (PIXFMT_BAYER_BG, PIXFMT_BAYER_GB, PIXFMT_BAYER_GR, PIXFMT_BAYER_RG)
+
+# Ma dtype trong header
+_DTYPES = {1: np.uint8, 2: np.uint16}
+_DTYPE_CODES = {np.dtype(v): k for k, v in _DTYPES.items()}
+
+# Control block: Magic, Version, NumSlots, Generation, SlotSize, LatestFrameID
+# Generation: so ngau nhien khac 0, writer doi moi lan khoi tao layout; reader dua vao
+# de biet ring da duoc khoi tao lai (lease cu khong con hieu luc).
+_CTRL = struct.Struct('<IIIIQq')
+_CTRL_GEN = 12
+_CTRL_LATEST = 24
+# Health (sau control block): Heartbeat, FramesWritten, GetFrameTimeouts, Dropped
+# Heartbeat tang moi vong lap cua service, ke ca khi GetFrame timeout.
+_HEALTH = struct.Struct('<QQQQ')
+_CTRL_HEALTH = 32
+CTRL_SIZE = 64
+
+ServiceStats = namedtuple('ServiceStats', 'heartbeat frames timeouts dropped')
+
+# Slot header: Seq, Lease, FrameID, Timestamp, Width, Height, Channels, DType, PixelFormat,
+#              Stride (byte/dong), DataLen
+# Seq theo kieu seqlock: le = writer dang ghi, chan = frame da commit.
+# Lease: so view reader dang muon slot; writer khong ghi de slot co Lease > 0.
+# Timestamp: time.monotonic() luc service nhan frame (dong ho chung toan he thong).
+_SLOT = struct.Struct('<IIqdIIIIIIQ')
+_SLOT_LEASE = 4
+_SLOT_META = struct.Struct('<qdIIIIIIQ')  # phan header sau Seq/Lease
+SLOT_HDR_SIZE = 64
+
+FrameHeader = namedtuple(
+    'FrameHeader',
+    'frame_id timestamp width height channels dtype pixel_format stride data_len')
+
+_PAGE = 4096
+
+
+# Hang rao bo nho cho handshake lease/seq giua hai process (xem _claim_slot / _acquire).
+# Moi ben ghi mot truong roi doc truong cua ben kia (kieu Dekker); CPU x86/x64 duoc phep
+# dua lenh doc len truoc lenh ghi chua flush, khi do ca hai cung doc gia tri cu va writer
+# ghi de slot reader tuong da giu. Lay/tra mot mutex dung lenh atomic co prefix `lock`
+# (pthread/sem tren Linux, Interlocked*/SRW lock tren Windows), la hang rao store-load
+# day du tren x86/x64 - kien truc duy nhat dvp.pyd ho tro. Tren ARM mutex chi dam bao
+# acquire/release: can CAS that su tren header slot truoc khi dung module o do.
+_FENCE_LOCK = threading.Lock()
+
+
+def _fence():
+    """Full memory barrier giua lenh ghi va lenh doc tiep theo (xem chu thich tren)."""
+    with _FENCE_LOCK:
+        pass
+
+
+def _align(n, a=_PAGE):
+    return (n + a - 1) // a * a
+
+
+def _data_offset(n_slots):
+    return _align(CTRL_SIZE + n_slots * SLOT_HDR_SIZE)
+
+
+def slot_bytes_for(width, height, channels=1, itemsize=1):
+    """Kich thuoc slot (lam tron len trang) cho frame lon nhat WxHxC."""
+    return _align(width * height * channels * itemsize, _PAGE)
+
+
+def segment_size(n_slots, slot_size):
+    """Tong kich thuoc vung nho cho ring co `n_slots` slot, moi slot `slot_size` byte."""
+    return _data_offset(n_slots) + n_slots * _align(slot_size)
+
+
+def channel_name(index, base=SHM_NAME):
+    """Ten kenh SHM cho camera thu `index` (kenh 0 giu ten goc de tuong thich)."""
+    index = int(index)
+    return base if index == 0 else "{}_{}".format(base, index)
+
+
+# -----------------
+# Backend (tu chon theo he dieu hanh)
+# -----------------
+_IS_WINDOWS = platform.system() == "Windows"
+
+
+def _posix_path(name):
+    """'Local\\DvpCamFrame_v5' -> /dev/shm/DvpCamFrame_v5 (hoac thu muc tam neu khong co /dev/shm)."""
+    base = name.split("\\")[-1]
+    shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(shm_dir, base)
+
+
+def _open_segment(name, size, create=False, writable=True):
+    """
+    Mo vung nho chia se theo ten.
+    - Windows: named mapping (mmap tagname).
+    - POSIX: file trong /dev/shm (tmpfs) map bang mmap; cung layout voi Windows.
+    """
+    if _IS_WINDOWS:
+        access = mmap.ACCESS_WRITE if (create or writable) else mmap.ACCESS_READ
+        return mmap.mmap(-1, size, tagname=name, access=access)
+
+    path = _posix_path(name)
+    if create:
+        fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+    else:
+        fd = os.open(path, os.O_RDWR if writable else os.O_RDONLY)
+    try:
+        if create:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+        elif os.fstat(fd).st_size < size:
+            raise ValueError("Shared memory chua du kich thuoc: {}".format(path))
+        access = mmap.ACCESS_WRITE if (create or writable) else mmap.ACCESS_READ
+        return mmap.mmap(fd, size, access=access)
+    finally:
+        # mmap giu tham chieu rieng toi vung nho, dong fd ngay duoc
+        os.close(fd)
+
+
+def _unlink_segment(name):
+    """Xoa vung nho (chi can tren POSIX; Windows tu giai phong khi handle cuoi cung dong)."""
+    if _IS_WINDOWS:
+        return
+    try:
+        os.unlink(_posix_path(name))
+    except OSError:
+        pass
+
+
+class FrameNotifier:
+    """
+    Tin hieu "co frame moi" giua writer va reader, dat ten theo kenh SHM.
+    - Windows: named auto-reset Event (kernel32).
+    - POSIX: named semaphore (sem_open), writer chi post khi gia tri dang la 0
+      nen nhieu frame lien tiep duoc gop thanh mot lan danh thuc.
+    Neu he thong khong ho tro, `available` = False va wait() chi ngu ngan (polling).
+    Reader mo lai notifier moi khi attach lai vao layout moi (xem SharedMemoryManager._attach).
+    """
+
+    _WAIT_OBJECT_0 = 0
+
+    def __init__(self, name, create=False):
+        self.name = name
+        self.create = create
+        self._handle = None
+        self._lib = None
+        try:
+            if _IS_WINDOWS:
+                self._open_windows()
+            else:
+                self._open_posix()
+        except (OSError, AttributeError) as e:
+            print(f"[SHM Debug] FrameNotifier unavailable: {e}")
+            self._handle = None
+
+    @property
+    def available(self):
+        return self._handle is not None
+
+    # -----------------
+    # Windows
+    # -----------------
+    def _open_windows(self):
+        from ctypes import wintypes
+
+        k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        k32.CreateEventW.argtypes = [ctypes.c_void_p, wintypes.BOOL, wintypes.BOOL, wintypes.LPCWSTR]
+        k32.CreateEventW.restype = wintypes.HANDLE
+        k32.SetEvent.argtypes = [wintypes.HANDLE]
+        k32.WaitForSingleObject.argtypes = [wintypes.HANDLE, wintypes.DWORD]
+        k32.WaitForSingleObject.restype = wintypes.DWORD
+        k32.CloseHandle.argtypes = [wintypes.HANDLE]
+        self._lib = k32
+
+        # Auto-reset, khoi tao o trang thai chua bao; CreateEventW mo lai event neu da ton tai
+        handle = k32.CreateEventW(None, False, False, self.name + "_evt")
+        if not handle:
+            raise ctypes.WinError(ctypes.get_last_error())
+        self._handle = handle
+
+    # -----------------
+    # POSIX
+    # -----------------
+    def _open_posix(self):
+        lib = None
+        for cand in (ctypes.util.find_library("c"), ctypes.util.find_library("pthread"),
+                     ctypes.util.find_library("rt")):
+            try:
+                cand_lib = ctypes.CDLL(cand, use_errno=True)
+                cand_lib.sem_open
+                cand_lib.sem_timedwait
+            except (OSError, AttributeError, TypeError):
+                continue
+            lib = cand_lib
+            break
+        if lib is None:
+            raise OSError("sem_open/sem_timedwait khong kha dung")
+
+        lib.sem_open.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_uint, ctypes.c_uint]
+        lib.sem_open.restype = ctypes.c_void_p
+        lib.sem_post.argtypes = [ctypes.c_void_p]
+        lib.sem_trywait.argtypes = [ctypes.c_void_p]
+        lib.sem_timedwait.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        lib.sem_getvalue.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int)]
+        lib.sem_close.argtypes = [ctypes.c_void_p]
+        self._lib = lib
+
+        sem = lib.sem_open(self._posix_name(), os.O_CREAT, 0o600, 0)
+        if sem in (None, ctypes.c_void_p(-1).value):
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._handle = sem
+
+    def _posix_name(self):
+        return ("/" + self.name.split("\\")[-1] + "_evt").encode()
+
+    # -----------------
+    # API
+    # -----------------
+    def signal(self):
+        """Writer: bao co frame moi da commit."""
+        if self._handle is None:
+            return
+        if _IS_WINDOWS:
+            self._lib.SetEvent(self._handle)
+            return
+        value = ctypes.c_int(0)
+        if self._lib.sem_getvalue(self._handle, ctypes.byref(value)) != 0 or value.value < 1:
+            self._lib.sem_post(self._handle)
+
+    def wait(self, timeout):
+        """Reader: chan toi khi co tin hieu hoac het `timeout` (giay). Tra ve True neu duoc bao."""
+        if self._handle is None:
+            time.sleep(min(timeout, 0.002))
+            return False
+        if _IS_WINDOWS:
+            ms = max(0, int(timeout * 1000))
+            return self._lib.WaitForSingleObject(self._handle, ms) == self._WAIT_OBJECT_0
+
+        class _Timespec(ctypes.Structure):
+            _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+        deadline = time.time() + max(0.0, timeout)
+        ts = _Timespec(int(deadline), int((deadline % 1) * 1e9))
+        ok = self._lib.sem_timedwait(self._handle, ctypes.byref(ts)) == 0
+        # Gop cac lan post con ton dong
+        while ok and self._lib.sem_trywait(self._handle) == 0:
+            pass
+        return ok
+
+    def close(self):
+        if self._handle is None:
+            return
+        if _IS_WINDOWS:
+            self._lib.CloseHandle(self._handle)
+        else:
+            # Khong sem_unlink: reader con attach van giu semaphore theo ten, writer khoi dong
+            # lai se mo dung semaphore do (O_CREAT) thay vi tao mot cai moi ma reader khong thay.
+            self._lib.sem_close(self._handle)
+        self._handle = None
+
 
 class SharedMemoryManager:
-    def __init__(self, create=False):
+    """
+    Ring buffer N slot tren shared memory (writer: service_dvp.py, reader: IpcCameraProcessor).
+
+    Moi slot co bo dem `seq` kieu seqlock nen reader luon nhan duoc frame da commit
+    tron ven ma khong can khoa; reader co the cham vai frame ma khong mat frame.
+
+    Reader co the muon (lease) mot slot de doc truc tiep khong copy:
+        with shm.borrow_frame() as (view, frame_id):
+            ...
+    Writer bo qua slot dang duoc muon cho toi khi lease duoc tra.
+
+    Moi slot mang header dinh dang (dtype, pixel format, stride, timestamp) nen co the
+    truyen frame 8/16-bit, Bayer RAW hoac BGR. Kich thuoc slot do writer quyet dinh
+    (xem `slot_bytes_for`) va reader doc tu control block.
+    """
+
+    def __init__(self, create=False, n_slots=SHM_SLOTS, slot_size=SHM_SLOT_SIZE, name=SHM_NAME):
         self.shm = None
         self.create = create
-        
-        if platform.system() != "Windows":
-             raise RuntimeError("SharedMemoryManager only supports Windows for now due to named mmap.")
+        self.name = name
+        self.n_slots = 0
+        self.slot_size = 0
+        self.generation = None  # None = chua tung attach
+        self._data_offset = 0
+        self._next_slot = 0
+        self._lease_lock = threading.Lock()
+        self._notifier = None
 
         if create:
+            self.n_slots = int(n_slots)
+            self.slot_size = _align(int(slot_size))
+            self._data_offset = _data_offset(self.n_slots)
             # Create a new memory mapping - RW access
-            self.shm = mmap.mmap(-1, SHM_SIZE, tagname=SHM_NAME, access=mmap.ACCESS_WRITE)
+            size = segment_size(self.n_slots, self.slot_size)
+            self.shm = _open_segment(self.name, size, create=True)
+            self._init_layout()
+            self._notifier = FrameNotifier(self.name, create=True)
         else:
             try:
-                # Try to open existing mapping with fixed size
-                self.shm = mmap.mmap(-1, SHM_SIZE, tagname=SHM_NAME, access=mmap.ACCESS_READ)
-            except (FileNotFoundError, OSError) as e:
+                self._attach()
+            except (FileNotFoundError, OSError, ValueError) as e:
                 print(f"[SHM Debug] Failed to connect: {e}")
                 self.shm = None
 
+    # -----------------
+    # Layout
+    # -----------------
+    def _init_layout(self):
+        # Magic duoc ghi sau cung de reader khong attach vao layout dang khoi tao
+        self.generation = struct.unpack('<I', os.urandom(4))[0] or 1
+        _CTRL.pack_into(self.shm, 0, 0, SHM_VERSION, self.n_slots, self.generation,
+                        self.slot_size, -1)
+        _HEALTH.pack_into(self.shm, _CTRL_HEALTH, 0, 0, 0, 0)
+        for i in range(self.n_slots):
+            _SLOT.pack_into(self.shm, self._slot_hdr(i), 0, 0, -1, 0.0, 0, 0, 0, 0, 0, 0, 0)
+        _CTRL.pack_into(self.shm, 0, SHM_MAGIC, SHM_VERSION, self.n_slots, self.generation,
+                        self.slot_size, -1)
+
+    def _attach(self):
+        """Doc control block de biet hinh hoc cua ring roi map toan bo vung nho."""
+        head = _open_segment(self.name, CTRL_SIZE, writable=False)
+        try:
+            magic, version, n_slots, generation, slot_size, _ = _CTRL.unpack_from(head, 0)
+        finally:
+            head.close()
+
+        if magic != SHM_MAGIC or version != SHM_VERSION or n_slots <= 0:
+            raise ValueError("Shared memory chua san sang (magic/version khong khop)")
+
+        self.n_slots = n_slots
+        self.slot_size = slot_size
+        self._data_offset = _data_offset(n_slots)
+        size = segment_size(n_slots, slot_size)
+        # Reader can quyen ghi de cap nhat truong Lease; view pixel tra ra van la read-only
+        self.shm = _open_segment(self.name, size)
+        if self._notifier is None:
+            self._notifier = FrameNotifier(self.name)
+
+        # Chi co mot reader: lan attach dau tien cua reader nay xoa lease con sot lai tu
+        # reader truoc (bi kill). Khi attach lai thi khong xoa: cung generation -> view
+        # dang muon van con hieu luc; generation moi -> writer da xoa lease khi khoi tao.
+        first = self.generation is None
+        self.generation = generation
+        if first:
+            for i in range(self.n_slots):
+                struct.pack_into('<I', self.shm, self._slot_hdr(i) + _SLOT_LEASE, 0)
+
+    def _slot_hdr(self, index):
+        return CTRL_SIZE + index * SLOT_HDR_SIZE
+
+    def _slot_data(self, index):
+        return self._data_offset + index * self.slot_size
+
     def ensure_connected(self):
         """Attempts to connect to the shared memory if not already connected."""
         if self.shm:
             return True
         try:
-            self.shm = mmap.mmap(-1, SHM_SIZE, tagname=SHM_NAME, access=mmap.ACCESS_READ)
+            self._attach()
             return True
-        except (FileNotFoundError, OSError):
+        except (FileNotFoundError, OSError, ValueError):
+            self.shm = None
             return False
 
-    def write_frame(self, frame, frame_id):
+    # -----------------
+    # Writer
+    # -----------------
+    def _claim_slot(self):
+        """
+        Tim slot tiep theo khong bi reader muon va danh dau dang ghi (seq le).
+        Tra ve (index, seq) hoac None neu moi slot deu dang duoc muon.
+        """
+        for k in range(self.n_slots):
+            index = (self._next_slot + k) % self.n_slots
+            hdr = self._slot_hdr(index)
+            seq = _SLOT.unpack_from(self.shm, hdr)[0]
+
+            # Danh dau seq le TRUOC khi kiem tra lease: reader tang lease roi kiem tra lai seq,
+            # nen hoac writer thay lease, hoac reader thay seq da doi. Hang rao giua ghi seq va
+            # doc lease la bat buoc (store->load), xem _fence.
+            struct.pack_into('<I', self.shm, hdr, (seq + 1) & 0xFFFFFFFF)
+            _fence()
+            if struct.unpack_from('<I', self.shm, hdr + _SLOT_LEASE)[0] == 0:
+                self._next_slot = (index + 1) % self.n_slots
+                return index, seq
+
+            # Slot dang duoc muon: tra lai seq cu (du lieu khong doi)
+            struct.pack_into('<I', self.shm, hdr, seq)
+        return None
+
+    def write_frame(self, frame, frame_id, pixel_format=None, timestamp=None):
+        """
+        Ghi frame (HxW hoac HxWxC, uint8/uint16) vao slot trong tiep theo.
+        `pixel_format` mac dinh suy ra tu so kenh (1: MONO, 3: BGR24, 4: BGR32).
+        Tra ve False neu frame bi bo (qua lon, dtype khong ho tro, moi slot dang bi muon).
+        """
         if not self.shm:
-            return
-        
+            return False
+
+        if frame.ndim == 2:
+            frame = frame[:, :, None]
         height, width, channels = frame.shape
-        # Header: Magic(4), FrameID(4), Width(4), Height(4), Channels(4), DataLen(4)
-        header_size = 24
-        # Calculate data length
-        data_len = height * width * channels
-        
-        if header_size + data_len > SHM_SIZE:
+        dtype_code = _DTYPE_CODES.get(frame.dtype)
+        if dtype_code is None:
+            return False
+        if pixel_format is None:
+            pixel_format = {1: PIXFMT_MONO, 3: PIXFMT_BGR24, 4: PIXFMT_BGR32}.get(channels, 0)
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        # Du lieu trong slot luon dong lien tuc: stride = so byte cua mot dong
+        stride = width * channels * frame.itemsize
+        data_len = stride * height
+
+        if data_len > self.slot_size:
              # Just print once or limit spam?
-             return
-
-        # 1. Write Header
-        self.shm.seek(0)
-        self.shm.write(struct.pack('IIIIII', 0xDEADBEEF, frame_id, width, height, channels, data_len))
-        
-        # 2. Write Data (Direct Copy)
-        # Create a numpy array that points directly to the shm buffer at offset 24
-        # This allows us to copy frame data directly into SHM without intermediate bytes object
+             return False
+
+        claimed = self._claim_slot()
+        if claimed is None:
+            # Reader dang giu tat ca cac slot -> bo frame nay
+            return False
+        index, seq = claimed
+        hdr = self._slot_hdr(index)
+
+        # 1. Header (seq da le tu _claim_slot) + Data (Direct Copy vao slot)
+        _SLOT_META.pack_into(self.shm, hdr + 8, frame_id, timestamp, width, height, channels,
+                             dtype_code, pixel_format, stride, data_len)
         try:
-            dst = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm, offset=header_size)
-            dst[:] = frame[:] 
+            dst = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm,
+                             offset=self._slot_data(index))
+            dst[:] = frame[:]
         except Exception as e:
             # Fallback (safer but slower)
-            self.shm.seek(header_size)
-            self.shm.write(frame.tobytes())
+            start = self._slot_data(index)
+            self.shm[start:start + data_len] = frame.tobytes()
+
+        # 2. Commit (seq chan) roi cong bo frame moi nhat
+        struct.pack_into('<I', self.shm, hdr, (seq + 2) & 0xFFFFFFFF)
+        struct.pack_into('<q', self.shm, _CTRL_LATEST, frame_id)
+        if self._notifier:
+            self._notifier.signal()
+        return True
+
+    # -----------------
+    # Reader
+    # -----------------
+    def _header(self, shm, index):
+        """Doc (seq, FrameHeader) cua slot."""
+        fields = _SLOT.unpack_from(shm, self._slot_hdr(index))
+        return fields[0], FrameHeader(fields[2], fields[3], fields[4], fields[5], fields[6],
+                                      _DTYPES.get(fields[7], np.uint8), fields[8], fields[9],
+                                      fields[10])
+
+    def _view(self, shm, index, header):
+        """Numpy view (HxWxC) tren du lieu slot, ton trong stride cua header."""
+        dtype = np.dtype(header.dtype)
+        row = header.width * header.channels * dtype.itemsize
+        stride = header.stride or row
+        if stride < row or stride * header.height > self.slot_size:
+            raise ValueError("Header slot khong hop le")
+        # np.frombuffer giu memoryview (export) cua mmap: close() se bao BufferError thay vi
+        # unmap vung nho duoi cac view dang muon (np.ndarray(buffer=mmap) khong giu export)
+        data = np.frombuffer(shm, dtype=np.uint8, count=stride * header.height,
+                             offset=self._slot_data(index))
+        data.flags.writeable = False
+        return np.ndarray((header.height, header.width, header.channels), dtype=dtype,
+                          buffer=data,
+                          strides=(stride, header.channels * dtype.itemsize, dtype.itemsize))
 
-    def read_frame(self):
+    def _pick_slot(self, last_id):
+        """
+        Chon slot can doc:
+        - last_id None: frame moi nhat da commit.
+        - last_id cho truoc: frame cu nhat con trong ring co id > last_id (doc bu khi bi cham).
+        """
+        best = None
+        for i in range(self.n_slots):
+            seq, _, frame_id = _SLOT.unpack_from(self.shm, self._slot_hdr(i))[:3]
+            if seq & 1 or frame_id < 0:
+                continue
+            if last_id is None:
+                if best is None or frame_id > best[1]:
+                    best = (i, frame_id)
+            elif frame_id > last_id and (best is None or frame_id < best[1]):
+                best = (i, frame_id)
+        return best
+
+    def read_frame(self, last_id=None, retries=3, with_header=False):
+        """
+        Doc (copy) frame. Tra ve (frame, frame_id), hoac (frame, FrameHeader) neu `with_header`.
+        """
         if not self.ensure_connected():
             return None, None
 
         try:
-            # Direct read from buffer (Zero copy read)
-            # Create a view of the header
-            header_view = self.shm[:24]
-            magic, frame_id, width, height, channels, data_len = struct.unpack('IIIIII', header_view)
-            
-            if magic != 0xDEADBEEF:
+            if not self._layout_valid():
                 return None, None
 
-            # Create a numpy view directly on the shared memory
-            # Note: This view is Read-Only if opened with ACCESS_READ
-            src = np.ndarray((height, width, channels), dtype=np.uint8, buffer=self.shm, offset=24)
-            
-            # We must return a COPY because:
-            # 1. OpenCV functions often need writable arrays
-            # 2. We don't want the image to change while we process it (tearing from writer)
-            # This is the ONLY copy operation in the read process now.
-            return src.copy(), frame_id
+            for _ in range(retries):
+                picked = self._pick_slot(last_id)
+                if picked is None:
+                    return None, None
+                index, _ = picked
+                hdr = self._slot_hdr(index)
+
+                seq1, header = self._header(self.shm, index)
+                if seq1 & 1:
+                    continue
+
+                # Create a numpy view directly on the shared memory
+                src = self._view(self.shm, index, header)
+                frame = src.copy()
+
+                # Seqlock: neu writer da ghi de slot trong luc copy thi doc lai
+                seq2 = _SLOT.unpack_from(self.shm, hdr)[0]
+                if seq1 == seq2:
+                    return frame, (header if with_header else header.frame_id)
+
+            return None, None
 
         except Exception as e:
             return None, None
 
+    def _add_lease(self, shm, index, delta):
+        off = self._slot_hdr(index) + _SLOT_LEASE
+        with self._lease_lock:
+            try:
+                n = struct.unpack_from('<I', shm, off)[0]
+                struct.pack_into('<I', shm, off, max(0, n + delta))
+            except (ValueError, TypeError):
+                # mmap da dong (disconnect) -> khong con gi de tra
+                pass
+
+    def _release_lease(self, shm, index, generation):
+        """Tra lease cua view; bo qua neu ring da duoc khoi tao lai sau khi muon."""
+        try:
+            if struct.unpack_from('<I', shm, _CTRL_GEN)[0] != generation:
+                return
+        except (ValueError, TypeError):
+            return
+        self._add_lease(shm, index, -1)
+
+    def publish_stats(self, heartbeat, frames, timeouts, dropped):
+        """Writer: cap nhat heartbeat va bo dem cho GUI giam sat."""
+        if self.shm:
+            _HEALTH.pack_into(self.shm, _CTRL_HEALTH, heartbeat, frames, timeouts, dropped)
+
+    def stats(self):
+        """Reader: ServiceStats hien tai, None neu chua ket noi."""
+        if not self.ensure_connected():
+            return None
+        return ServiceStats(*_HEALTH.unpack_from(self.shm, _CTRL_HEALTH))
+
+    def latest_frame_id(self):
+        """Frame id moi nhat writer da commit (-1 neu chua co)."""
+        if not self.shm:
+            return -1
+        return struct.unpack_from('<q', self.shm, _CTRL_LATEST)[0]
+
+    def wait_frame(self, last_id=None, timeout=0.1):
+        """
+        Chan toi khi writer commit frame moi hon `last_id` hoac het `timeout` (giay).
+        Kiem tra header truoc khi cho nen khong lo tin hieu den giua hai buoc.
+        """
+        if not self.ensure_connected():
+            time.sleep(timeout)
+            return False
+        if last_id is None or self.latest_frame_id() > last_id:
+            return True
+        self._notifier.wait(timeout)
+        return self.shm is not None and self.latest_frame_id() > last_id
+
+    def _layout_valid(self):
+        """Kiem tra writer chua khoi tao lai ring (vd service khoi dong lai)."""
+        magic, version, n_slots, generation, slot_size, _ = _CTRL.unpack_from(self.shm, 0)
+        if (magic == SHM_MAGIC and generation == self.generation
+                and n_slots == self.n_slots and slot_size == self.slot_size):
+            return True
+        # Layout moi (generation/hinh hoc da doi) hoac writer da dong (magic = 0) -> map lai
+        # o lan doc sau; neu writer chua khoi tao xong thi _attach se bao chua san sang
+        self.close()
+        return False
+
+    def _acquire(self, last_id, retries):
+        """Muon slot: tra ve (view, FrameHeader, finalizer) hoac None."""
+        if not self.ensure_connected():
+            return None
+        if not self._layout_valid():
+            return None
+        shm = self.shm
+        generation = self.generation
+
+        for _ in range(retries):
+            picked = self._pick_slot(last_id)
+            if picked is None:
+                return None
+            index, _ = picked
+            hdr = self._slot_hdr(index)
+
+            seq1, header = self._header(shm, index)
+            if seq1 & 1:
+                continue
+
+            # Tang lease roi kiem tra lai seq (doi xung voi _claim_slot cua writer); hang rao
+            # giua ghi lease va doc seq, xem _fence
+            self._add_lease(shm, index, +1)
+            _fence()
+            if _SLOT.unpack_from(shm, hdr)[0] != seq1:
+                self._add_lease(shm, index, -1)
+                continue
+
+            try:
+                view = self._view(shm, index, header)
+            except ValueError:
+                self._add_lease(shm, index, -1)
+                continue
+            view.flags.writeable = False
+            # Lease duoc tra khi view (va moi view con cua no) bi giai phong. View con cua
+            # numpy tro thang toi mang goc (view.base) nen finalizer gan vao mang goc do.
+            fin = weakref.finalize(view.base, self._release_lease, shm, index, generation)
+            return view, header, fin
+        return None
+
+    def acquire_frame(self, last_id=None, retries=3, with_header=False):
+        """
+        Muon frame (khong copy). Chon frame giong read_frame().
+
+        Tra ve (view, frame_id): `view` la numpy read-only tro thang vao slot; slot duoc giu
+        cho toi khi `view` va moi view con cua no bi giai phong. Tra ve (None, None) neu khong co frame.
+        Neu `with_header` thi tra ve (view, FrameHeader) thay cho frame_id.
+        """
+        try:
+            got = self._acquire(last_id, retries)
+        except Exception:
+            got = None
+        if got is None:
+            return None, None
+        view, header, _ = got
+        return view, (header if with_header else header.frame_id)
+
+    @contextmanager
+    def borrow_frame(self, last_id=None, retries=3, with_header=False):
+        """
+        Context manager muon frame:
+            with shm.borrow_frame() as (view, frame_id):
+                ...
+        Lease duoc tra ngay khi ra khoi khoi `with`; khong giu `view` sau do (can giu thi copy).
+        """
+        try:
+            got = self._acquire(last_id, retries)
+        except Exception:
+            got = None
+        if got is None:
+            yield None, None
+            return
+        view, header, fin = got
+        try:
+            yield view, (header if with_header else header.frame_id)
+        finally:
+            fin()
+
+    def close(self):
+        if self.shm:
+            if self.create:
+                # Danh dau layout da dong de reader con map (POSIX: file da unlink) attach lai
+                struct.pack_into('<I', self.shm, 0, 0)
+            try:
+                self.shm.close()
+            except BufferError:
+                # Con view dang muon slot: mmap se duoc giai phong khi view cuoi cung bi GC
+                pass
+            self.shm = None
+            if self.create:
+                _unlink_segment(self.name)
+        if self._notifier:
+            self._notifier.close()
+            self._notifier = None
+
+
+# -----------------
+# Kenh dieu khien (GUI -> service)
+# -----------------
+# Control: Magic, Version, ReqSeq, RspSeq, ReqLen, RspLen, RspStatus
+# Request/Response la JSON utf-8 trong 2 vung payload co dinh sau header.
+_CMD = struct.Struct('<IIIIIIi')
+_CMD_REQ_SEQ = 8
+CMD_HDR_SIZE = 64
+CMD_PAYLOAD_SIZE = 2016
+CMD_SEGMENT_SIZE = CMD_HDR_SIZE + 2 * CMD_PAYLOAD_SIZE
+CMD_VERSION = 1
+
+
+class ControlChannel:
+    """
+    Kenh lenh/phan hoi nho cho mot kenh camera (vung SHM "<name>_ctl").
+
+    - Client (GUI): request(cmd, **params) -> (ok, result); moi lan chi mot lenh dang cho.
+    - Server (service): poll(timeout) -> (seq, cmd, params) hoac None; sau do respond(seq, ok, result).
+    Viec bao hieu dung FrameNotifier ("_cmd" cho request, "_rsp" cho response).
+    """
+
+    def __init__(self, name=SHM_NAME, create=False):
+        self.name = name + "_ctl"
+        self.create = create
+        self.shm = None
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._req_evt = None
+        self._rsp_evt = None
+        if create:
+            self.shm = _open_segment(self.name, CMD_SEGMENT_SIZE, create=True)
+            _CMD.pack_into(self.shm, 0, 0, CMD_VERSION, 0, 0, 0, 0, 0)
+            struct.pack_into('<I', self.shm, 0, SHM_MAGIC)
+            self._open_events()
+
+    def _open_events(self):
+        self._req_evt = FrameNotifier(self.name + "_cmd", create=self.create)
+        self._rsp_evt = FrameNotifier(self.name + "_rsp", create=self.create)
+
+    def ensure_connected(self):
+        if self.shm:
+            return True
+        try:
+            shm = _open_segment(self.name, CMD_SEGMENT_SIZE)
+        except (OSError, ValueError):
+            return False
+        magic, version = struct.unpack_from('<II', shm, 0)
+        if magic != SHM_MAGIC or version != CMD_VERSION:
+            shm.close()
+            return False
+        self.shm = shm
+        self._seq = _CMD.unpack_from(shm, 0)[3]
+        self._open_events()
+        return True
+
+    @staticmethod
+    def _encode(obj):
+        data = json.dumps(obj).encode("utf-8")
+        if len(data) > CMD_PAYLOAD_SIZE:
+            raise ValueError("Lenh qua lon ({} byte)".format(len(data)))
+        return data
+
+    def _payload(self, offset, length):
+        return json.loads(bytes(self.shm[offset:offset + length]).decode("utf-8"))
+
+    # -----------------
+    # Client
+    # -----------------
+    def request(self, cmd, timeout=2.0, **params):
+        """Gui lenh va cho phan hoi. Tra ve (ok, result); het han -> (False, 'timeout')."""
+        with self._lock:
+            if not self.ensure_connected():
+                return False, "not connected"
+            data = self._encode({"cmd": cmd, "params": params})
+            self._seq = (_CMD.unpack_from(self.shm, 0)[2] + 1) & 0xFFFFFFFF
+            self.shm[CMD_HDR_SIZE:CMD_HDR_SIZE + len(data)] = data
+            struct.pack_into('<I', self.shm, 16, len(data))
+            # ReqSeq ghi cuoi cung: server chi doc payload sau khi thay seq moi
+            struct.pack_into('<I', self.shm, _CMD_REQ_SEQ, self._seq)
+            self._req_evt.signal()
+
+            deadline = time.monotonic() + timeout
+            while True:
+                _, _, _, rsp_seq, _, rsp_len, status = _CMD.unpack_from(self.shm, 0)
+                if rsp_seq == self._seq:
+                    result = self._payload(CMD_HDR_SIZE + CMD_PAYLOAD_SIZE, rsp_len)
+                    return status == 0, result
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False, "timeout"
+                self._rsp_evt.wait(min(remaining, 0.05))
+
+    # -----------------
+    # Server
+    # -----------------
+    def poll(self, timeout=0.1):
+        """Cho lenh moi toi `timeout` giay. Tra ve (seq, cmd, params) hoac None."""
+        _, _, req_seq, rsp_seq, req_len, _, _ = _CMD.unpack_from(self.shm, 0)
+        if req_seq == rsp_seq:
+            self._req_evt.wait(timeout)
+            _, _, req_seq, rsp_seq, req_len, _, _ = _CMD.unpack_from(self.shm, 0)
+            if req_seq == rsp_seq:
+                return None
+        try:
+            msg = self._payload(CMD_HDR_SIZE, req_len)
+            return req_seq, msg.get("cmd"), msg.get("params") or {}
+        except ValueError:
+            self.respond(req_seq, False, "bad request")
+            return None
+
+    def respond(self, seq, ok, result=None):
+        try:
+            data = self._encode(result)
+        except (TypeError, ValueError) as e:
+            ok, data = False, self._encode(str(e))
+        off = CMD_HDR_SIZE + CMD_PAYLOAD_SIZE
+        self.shm[off:off + len(data)] = data
+        struct.pack_into('<Ii', self.shm, 20, len(data), 0 if ok else 1)
+        struct.pack_into('<I', self.shm, 12, seq)
+        self._rsp_evt.signal()
+
     def close(self):
         if self.shm:
             self.shm.close()
             self.shm = None
+            if self.create:
+                _unlink_segment(self.name)
+        for evt in (self._req_evt, self._rsp_evt):
+            if evt:
+                evt.close()
+        self._req_evt = self._rsp_evt = None
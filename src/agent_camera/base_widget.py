@@ -17,7 +17,7 @@ from enum import IntEnum
 from typing import Optional, Any, List, Dict
 from dataclasses import asdict, is_dataclass
 
-from PySide6.QtCore import Signal, Qt, QDir
+from PySide6.QtCore import Signal, Qt, QDir, QTimer
 from PySide6.QtGui import QCloseEvent
 from PySide6.QtWidgets import (
     QApplication,
@@ -30,13 +30,20 @@ from PySide6.QtWidgets import (
     QPushButton,
     QFileDialog,
     QMessageBox,
+    QComboBox,
+    QSpinBox,
+    QDoubleSpinBox,
+    QLabel,
 )
 
 import cv2
 import os
 from datetime import datetime
 
+from .frame import Frame
 from .processors.base import Processor, CamSettings
+from .processors.mailbox import FrameMailbox, MailboxPolicy
+from ..utils.metrics import metrics
 
 class CameraType(IntEnum):
     GIGE = 0
@@ -55,7 +62,7 @@ class BaseCameraWidget(QWidget):
     - Quản lý vòng đời của các Camera Processor.
 
     Attributes:
-        frame_ready (Signal): Phát ra ảnh (numpy.ndarray) khi có frame mới từ camera.
+        frame_ready (Signal): Phát ra `Frame` (ảnh + timestamp/seq lúc chụp) khi có frame mới.
         triggerSignal (Signal): Tín hiệu yêu cầu camera chụp một ảnh (Single Frame).
     Layout:
       [ Gige (radio) | Usb (radio) ]
@@ -72,7 +79,16 @@ class BaseCameraWidget(QWidget):
         self._curr_camera: Optional[Processor] = None
         self.is_open: bool = False
         self._shot_path: str = ""
-        self._last_frame: Optional[Any] = None
+        self._last_frame: Optional[Frame] = None
+
+        # Processors đẩy frame trực tiếp vào mailbox (trên luồng camera); GUI chỉ nhận
+        # một thông báo cho mỗi đợt frame mới thay vì một event cho mỗi frame.
+        self._mailbox = FrameMailbox(parent=self)
+        self._mailbox.frame_available.connect(
+            self._drain_mailbox, Qt.ConnectionType.QueuedConnection
+        )
+        metrics.register_gauge("camera.mailbox_depth", lambda: self._mailbox.depth)
+        metrics.register_gauge("camera.mailbox_dropped", lambda: self._mailbox.dropped)
 
         self._setup_ui()
 
@@ -126,6 +142,7 @@ class BaseCameraWidget(QWidget):
     def closeEvent(self, event: QCloseEvent) -> None:
         """Đảm bảo tất cả các processors được ngắt kết nối trước khi đóng."""
         print("[Info] Đang đóng Camera Widget, giải phóng các processors...")
+        self._mailbox.close()
         for proc in self._processors:
             try:
                 proc.disconnect_camera()
@@ -169,6 +186,43 @@ class BaseCameraWidget(QWidget):
         self._type_group.addButton(self._dvp_radio, int(CameraType.DVP))
         self._type_group.idClicked.connect(self._on_type_selected)
 
+        # Frame mailbox (chính sách hàng đợi giữa camera và consumer)
+        mb_layout = QHBoxLayout()
+        mb_layout.addWidget(QLabel("Hàng đợi:"))
+        self._box_policy = QComboBox()
+        self._box_policy.addItem("Mới nhất", int(MailboxPolicy.LATEST))
+        self._box_policy.addItem("Giới hạn N (bỏ cũ)", int(MailboxPolicy.DROP_OLDEST))
+        self._box_policy.addItem("Chặn (không mất frame)", int(MailboxPolicy.BLOCK))
+        self._spin_capacity = QSpinBox()
+        self._spin_capacity.setRange(1, 64)
+        self._spin_capacity.setPrefix("N=")
+        self._spin_capacity.setEnabled(False)
+        self._lbl_mailbox = QLabel()
+        mb_layout.addWidget(self._box_policy, 1)
+        mb_layout.addWidget(self._spin_capacity)
+        mb_layout.addWidget(self._lbl_mailbox)
+        layout.addLayout(mb_layout)
+        self._box_policy.currentIndexChanged.connect(self._on_mailbox_changed)
+        self._spin_capacity.valueChanged.connect(self._on_mailbox_changed)
+
+        # Nhịp thu nhận: giới hạn FPS (tùy chọn) + FPS / jitter đo được
+        fps_layout = QHBoxLayout()
+        fps_layout.addWidget(QLabel("FPS tối đa:"))
+        self._spin_fps = QDoubleSpinBox()
+        self._spin_fps.setRange(0.0, 1000.0)
+        self._spin_fps.setDecimals(1)
+        self._spin_fps.setSpecialValueText("Không giới hạn")
+        self._lbl_fps = QLabel()
+        fps_layout.addWidget(self._spin_fps, 1)
+        fps_layout.addWidget(self._lbl_fps)
+        layout.addLayout(fps_layout)
+        self._spin_fps.valueChanged.connect(self._on_target_fps_changed)
+
+        self._mailbox_timer = QTimer(self)
+        self._mailbox_timer.setInterval(1000)
+        self._mailbox_timer.timeout.connect(self._update_mailbox_stats)
+        self._mailbox_timer.start()
+
         # Stacked config panels
         self._stack = QStackedWidget(self)
         layout.addWidget(self._stack)
@@ -186,12 +240,63 @@ class BaseCameraWidget(QWidget):
 
         self._processors.append(processor)
         self._stack.addWidget(processor.panel)
-        # Forward frames từ processor ra ngoài widget
+        # Forward frames từ processor vào mailbox ngay trên luồng phát (không qua event loop).
+        # Processor nối Worker.frame_ready của mình bằng DirectConnection nên frame đi thẳng
+        # từ luồng Worker vào mailbox; mailbox lo việc chuyển sang GUI (một thông báo cho
+        # mỗi đợt frame thay vì một queued event cho mỗi frame).
         processor.frame_ready.connect(
-            self._handle_frame, Qt.ConnectionType.UniqueConnection
+            lambda frame, name=processor.name: self._mailbox.put(Frame.wrap(frame, name)),
+            Qt.ConnectionType.DirectConnection,
+        )
+
+    # -----------------------
+    # Frame Mailbox
+    # -----------------------
+    def _drain_mailbox(self) -> None:
+        """Lấy các frame đang chờ trong mailbox và phát ra ngoài (luồng GUI)."""
+        for frame in self._mailbox.take():
+            # Thời gian từ lúc chụp tới khi GUI nhận (hàng đợi + event loop)
+            metrics.record("camera.capture_to_gui", frame.age() * 1000.0)
+            metrics.tick("camera.fps")
+            self._handle_frame(frame)
+
+    def _on_mailbox_changed(self, *_):
+        policy = MailboxPolicy(self._box_policy.currentData())
+        self._spin_capacity.setEnabled(policy != MailboxPolicy.LATEST)
+        self._mailbox.configure(policy, self._spin_capacity.value())
+
+    def _update_mailbox_stats(self) -> None:
+        self._lbl_mailbox.setText(
+            f"chờ {self._mailbox.depth} | bỏ {self._mailbox.dropped}"
         )
+        stats = self.acquisition_stats()
+        if stats:
+            self._lbl_fps.setText(f"{stats['fps']:.1f} fps | jitter {stats['jitter_ms']:.1f} ms")
+        else:
+            self._lbl_fps.setText("")
 
-    def _handle_frame(self, frame):
+    def _on_target_fps_changed(self, fps: float) -> None:
+        for proc in self._processors:
+            proc.set_target_fps(fps)
+
+    def acquisition_stats(self) -> Optional[Dict[str, float]]:
+        """FPS / jitter thu nhận của camera đang chọn (None nếu chưa chạy)."""
+        if self._curr_camera is None:
+            return None
+        try:
+            return self._curr_camera.acquisition_stats()
+        except Exception:
+            return None
+
+    def mailbox_stats(self) -> Dict[str, int]:
+        """Bộ đếm của mailbox: số frame đang chờ, đã bỏ, đã giao."""
+        return {
+            "depth": self._mailbox.depth,
+            "dropped": self._mailbox.dropped,
+            "delivered": self._mailbox.delivered,
+        }
+
+    def _handle_frame(self, frame: Frame):
         """Lưu frame mới nhất và phát tín hiệu ra ngoài."""
         # print(f"[Cam Debug] Frame received: {frame.shape if frame is not None else 'None'}")
         self._last_frame = frame
@@ -218,7 +323,7 @@ class BaseCameraWidget(QWidget):
             filepath = os.path.join(self._shot_path, filename)
             
             # Ghi file dùng OpenCV (BGR)
-            success = cv2.imwrite(filepath, self._last_frame)
+            success = cv2.imwrite(filepath, self._last_frame.data)
             
             if success:
                 print(f"[Info] Đã lưu ảnh: {filepath}")
@@ -289,7 +394,12 @@ class BaseCameraWidget(QWidget):
         return {
             "camera_type": int(cam_type), 
             "panel": settings,
-            "shot_path": self._shot_path
+            "shot_path": self._shot_path,
+            "mailbox": {
+                "policy": int(self._mailbox.policy),
+                "capacity": self._spin_capacity.value(),
+            },
+            "target_fps": self._spin_fps.value(),
         }
 
     def load_settings(self, settings: Dict[str, Any]) -> None:
@@ -304,6 +414,13 @@ class BaseCameraWidget(QWidget):
         self._on_type_selected(cam_type)
         
         self._shot_path = settings.get("shot_path", "")
+
+        mailbox = settings.get("mailbox", {})
+        self._spin_capacity.setValue(int(mailbox.get("capacity", 1)))
+        idx = self._box_policy.findData(int(mailbox.get("policy", MailboxPolicy.LATEST)))
+        self._box_policy.setCurrentIndex(max(idx, 0))
+        self._on_mailbox_changed()
+        self._spin_fps.setValue(float(settings.get("target_fps", 0.0)))
         
         panel = settings.get("panel", {})
         s = CamSettings(**panel)
@@ -0,0 +1,301 @@
+"""
+Vòng đời service_dvp.py (Python 3.6, dvp.pyd) dùng chung cho GUI (`IpcCameraProcessor`)
+và headless: khởi động process, chờ handshake `SERVICE_LOOP_START` / `SERVICE_ERROR`,
+watchdog heartbeat và khởi động lại với backoff lũy thừa.
+
+Module không phụ thuộc Qt: trạng thái / sự kiện restart được báo qua callback.
+"""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+try:
+    import shared_memory_utils as smu
+    from shared_memory_utils import SharedMemoryManager, ControlChannel
+except ImportError:
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
+    import shared_memory_utils as smu
+    from shared_memory_utils import SharedMemoryManager, ControlChannel
+
+SERVICE_SCRIPT = "service_dvp.py"
+
+# OpenCV đặt tên mã Bayer theo 2 pixel thứ hai của hàng thứ hai, nên ngược với tên pattern sensor
+_BAYER_CODES = {
+    smu.PIXFMT_BAYER_BG: cv2.COLOR_BayerRG2BGR,
+    smu.PIXFMT_BAYER_GB: cv2.COLOR_BayerGR2BGR,
+    smu.PIXFMT_BAYER_GR: cv2.COLOR_BayerGB2BGR,
+    smu.PIXFMT_BAYER_RG: cv2.COLOR_BayerBG2BGR,
+}
+
+
+def service_python() -> Optional[str]:
+    """
+    Tìm Python chạy service_dvp.py: ưu tiên venv36 (dvp.pyd/dvp.so build cho Python 3.6),
+    trên Linux/macOS nếu không có venv36 thì dùng chính interpreter hiện tại.
+    """
+    if os.name == 'nt':
+        venv_py = os.path.abspath(os.path.join("venv36", "Scripts", "python.exe"))
+        return venv_py if os.path.exists(venv_py) else None
+
+    venv_py = os.path.abspath(os.path.join("venv36", "bin", "python"))
+    return venv_py if os.path.exists(venv_py) else sys.executable
+
+
+def to_bgr(frame: np.ndarray, header) -> np.ndarray:
+    """
+    Chuẩn hóa frame SHM về BGR/MONO cho pipeline. Chỉ chuyển đổi khi cần (Bayer, RGB, 32-bit);
+    frame MONO/BGR24 được trả nguyên (view mượn, không copy).
+    """
+    fmt = header.pixel_format
+    if fmt in _BAYER_CODES:
+        return cv2.cvtColor(frame[:, :, 0], _BAYER_CODES[fmt])
+    if fmt == smu.PIXFMT_RGB24:
+        return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+    if fmt == smu.PIXFMT_RGB32:
+        return cv2.cvtColor(frame, cv2.COLOR_RGBA2BGR)
+    if fmt == smu.PIXFMT_BGR32:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    return frame
+
+
+class ServiceChannel:
+    """
+    Kết nối tới một kênh (một camera) của service: SHM frame + kênh lệnh, và theo dõi
+    heartbeat của kênh đó cho watchdog.
+    """
+
+    def __init__(self, index: int) -> None:
+        self.index = index
+        self.name = smu.channel_name(index)
+        self.lock = threading.Lock()
+        self.shm: Optional[SharedMemoryManager] = None
+        self.ctl: Optional[ControlChannel] = None
+        self.last_beat = -1
+        self.beat_time = time.monotonic()
+        self.reopen()
+
+    def reopen(self) -> None:
+        """Gắn lại vào SHM/kênh lệnh mới (sau khi service được khởi động lại)."""
+        with self.lock:
+            self._close()
+            self.shm = SharedMemoryManager(create=False, name=self.name)
+            self.ctl = ControlChannel(self.name)
+            self.last_beat = -1
+            self.beat_time = time.monotonic()
+
+    def command(self, cmd: str, timeout: float = 1.0, **params):
+        """Gửi lệnh vào service cho camera này. Trả về (ok, result)."""
+        ctl = self.ctl
+        if not ctl:
+            return False, "closed"
+        ok, result = ctl.request(cmd, timeout=timeout, **params)
+        if not ok:
+            print(f"[IPC] {self.name}: lệnh '{cmd}' lỗi: {result}")
+        return ok, result
+
+    def stats(self) -> Optional[smu.ServiceStats]:
+        """Đọc bộ đếm của service và cập nhật thời điểm heartbeat tăng gần nhất."""
+        with self.lock:
+            st = self.shm.stats() if self.shm else None
+        if st is not None and st.heartbeat != self.last_beat:
+            self.last_beat = st.heartbeat
+            self.beat_time = time.monotonic()
+        return st
+
+    def _close(self) -> None:
+        if self.ctl:
+            self.ctl.close()
+            self.ctl = None
+        if self.shm:
+            self.shm.close()
+            self.shm = None
+
+    def close(self) -> None:
+        with self.lock:
+            self._close()
+
+
+class DvpService:
+    """
+    Process service_dvp.py được giám sát.
+
+    `launch()` khởi động và chờ handshake; `start_watchdog(channels)` theo dõi process +
+    heartbeat của các kênh, khởi động lại (backoff 0.5, 1, 2 ... tối đa BACKOFF_MAX giây),
+    gắn lại các kênh rồi gọi `on_restart`; `on_health` nhận trạng thái mỗi chu kỳ.
+    """
+
+    READY_TIMEOUT = 15.0        # Thời gian tối đa chờ camera start (s)
+    HEARTBEAT_TIMEOUT = 5.0     # Heartbeat đứng quá lâu -> coi như service treo (s)
+    BACKOFF_MAX = 10.0          # Giới hạn thời gian chờ giữa các lần restart (s)
+
+    def __init__(self, devices: Sequence[str] = (), script: str = SERVICE_SCRIPT) -> None:
+        self.devices = list(devices)
+        self.script = os.path.abspath(script)
+        self.restarts = 0
+        self._process: Optional[subprocess.Popen] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+        self._channels: List[ServiceChannel] = []
+        self._on_health: Optional[Callable[[dict], None]] = None
+        self._on_restart: Optional[Callable[[], None]] = None
+
+    # -----------------
+    # Vòng đời
+    # -----------------
+    def launch(self):
+        """
+        Khởi động service và chờ dòng `SERVICE_LOOP_START`.
+        Trả về (ok, message); stdout của service được chuyển tiếp ra console bởi luồng riêng.
+        """
+        python = service_python()
+        if not python:
+            return False, "Không tìm thấy Python 3.6 (venv36)"
+        if not os.path.exists(self.script):
+            return False, f"Không tìm thấy script dịch vụ: {self.script}"
+
+        # -u: stdout không buffer để nhận ngay các dòng trạng thái
+        cmd = [python, "-u", self.script]
+        if self.devices:
+            cmd += ["--device", ",".join(self.devices)]
+        print(f"[IPC] Launching: {' '.join(cmd)}")
+
+        # Create Process (Hide window on Windows)
+        startupinfo = None
+        if os.name == 'nt':
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+        process = subprocess.Popen(
+            cmd,
+            cwd=os.getcwd(),
+            startupinfo=startupinfo,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+        )
+        self._process = process
+
+        ready = threading.Event()
+        result = {"ok": False, "msg": "Service thoát trước khi sẵn sàng"}
+        threading.Thread(
+            target=self._stdout_loop, args=(process, ready, result), daemon=True
+        ).start()
+
+        if not ready.wait(self.READY_TIMEOUT):
+            self.terminate()
+            return False, f"Service không sẵn sàng sau {self.READY_TIMEOUT:.0f}s"
+        if not result["ok"]:
+            self.terminate()
+        return result["ok"], result["msg"]
+
+    def start_watchdog(self, channels: Sequence[ServiceChannel],
+                       on_health: Optional[Callable[[dict], None]] = None,
+                       on_restart: Optional[Callable[[], None]] = None) -> None:
+        self._channels = list(channels)
+        self._on_health = on_health
+        self._on_restart = on_restart
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watchdog_loop, name="DvpWatchdog",
+                                          daemon=True)
+        self._watchdog.start()
+
+    def stop_watchdog(self) -> None:
+        self._stop.set()
+        if self._watchdog:
+            self._watchdog.join(timeout=2.0)
+            self._watchdog = None
+
+    def terminate(self) -> None:
+        if self._process:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=1)
+            except Exception:
+                self._process.kill()
+            self._process = None
+
+    def stop(self) -> None:
+        self.stop_watchdog()
+        self.terminate()
+
+    # -----------------
+    # Nội bộ
+    # -----------------
+    @staticmethod
+    def _stdout_loop(process: subprocess.Popen, ready: threading.Event, result: dict):
+        """Đọc stdout của service: bắt handshake sẵn sàng / lỗi, in lại các dòng còn lại."""
+        for line in process.stdout:
+            line = line.rstrip()
+            print(f"[DVP] {line}")
+            if ready.is_set():
+                continue
+            if line.startswith("SERVICE_LOOP_START"):
+                result.update(ok=True, msg=line)
+                ready.set()
+            elif line.startswith("SERVICE_ERROR"):
+                result.update(ok=False, msg=line)
+                ready.set()
+        # EOF: process đã thoát
+        ready.set()
+
+    def _watchdog_loop(self):
+        """
+        Giám sát service: process thoát hoặc heartbeat đứng quá HEARTBEAT_TIMEOUT thì
+        khởi động lại với backoff lũy thừa; báo `on_health` định kỳ.
+        """
+        failures = 0
+        while not self._stop.wait(0.5):
+            now = time.monotonic()
+            stats = [ch.stats() for ch in self._channels]
+
+            reason = None
+            if self._process is None or self._process.poll() is not None:
+                reason = "service đã thoát"
+            elif any(ch.last_beat >= 0 and now - ch.beat_time > self.HEARTBEAT_TIMEOUT
+                     for ch in self._channels):
+                # Chỉ xét kênh đã từng báo heartbeat (camera mở lỗi thì service đã in CAMERA_ERROR)
+                reason = "heartbeat đứng"
+            elif failures and all(st is not None for st in stats):
+                failures = 0
+
+            if self._on_health:
+                self._on_health(self.health("running" if reason is None else "restarting",
+                                            stats))
+            if reason is None:
+                continue
+
+            # Restart với backoff: 0.5, 1, 2, 4 ... tối đa BACKOFF_MAX giây
+            print(f"[IPC] Watchdog: {reason}, khởi động lại service")
+            self.terminate()
+            delay = min(0.5 * (2 ** failures), self.BACKOFF_MAX)
+            failures += 1
+            if self._stop.wait(delay):
+                break
+            self.restarts += 1
+            ok, msg = self.launch()
+            if not ok:
+                print(f"[IPC] Watchdog: restart lỗi: {msg}")
+                continue
+            for ch in self._channels:
+                ch.reopen()
+            if self._on_restart:
+                self._on_restart()
+
+    def health(self, state: str, stats) -> dict:
+        return {
+            "state": state,
+            "restarts": self.restarts,
+            "channels": [st._asdict() if st is not None else None for st in stats],
+        }
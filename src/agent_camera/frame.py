@@ -0,0 +1,71 @@
+"""
+Module định nghĩa `Frame` - phong bì metadata đi kèm ảnh qua toàn bộ pipeline.
+
+Camera → BaseCameraWidget → Detect → MainWindow đều truyền `Frame` thay vì `np.ndarray`
+trần, nhờ đó đo được độ trễ từ lúc chụp tới lúc có kết quả và ghép `ProcessResult` với
+đúng frame đã sinh ra nó. Module không phụ thuộc Qt để dùng được ở mọi nơi.
+"""
+
+import time
+from typing import Any, Optional
+
+import numpy as np
+
+
+class Frame:
+    """
+    Ảnh + metadata lúc chụp (nhẹ, dùng `__slots__`).
+
+    Attributes:
+        data (np.ndarray): Ảnh (có thể là view read-only mượn từ SHM).
+        timestamp (float): time.monotonic() lúc frame được lấy từ camera.
+        seq (int): Số thứ tự frame theo từng camera (tăng dần).
+        camera_id (str): Định danh nguồn (tên processor / kênh).
+        exposure (float | None): Thời gian phơi sáng lúc chụp (nếu biết).
+    """
+
+    __slots__ = ("data", "timestamp", "seq", "camera_id", "exposure")
+
+    def __init__(self, data: np.ndarray, seq: int = -1, camera_id: str = "",
+                 timestamp: Optional[float] = None, exposure: Optional[float] = None) -> None:
+        self.data = data
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        self.seq = seq
+        self.camera_id = camera_id
+        self.exposure = exposure
+
+    def __repr__(self) -> str:
+        shape = getattr(self.data, "shape", None)
+        return f"Frame(seq={self.seq}, camera_id={self.camera_id!r}, shape={shape})"
+
+    def age(self, now: Optional[float] = None) -> float:
+        """Số giây kể từ lúc chụp."""
+        return (time.monotonic() if now is None else now) - self.timestamp
+
+    def replace(self, data: np.ndarray) -> "Frame":
+        """Frame mới với ảnh `data` (vd: ảnh đã vẽ kết quả), giữ nguyên metadata."""
+        return Frame(data, self.seq, self.camera_id, self.timestamp, self.exposure)
+
+    @staticmethod
+    def wrap(obj: Any, camera_id: str = "") -> Optional["Frame"]:
+        """Trả `obj` nếu đã là Frame, bọc ndarray trần thành Frame (seq = -1)."""
+        if obj is None or isinstance(obj, Frame):
+            return obj
+        return Frame(obj, camera_id=camera_id)
+
+
+def as_array(obj: Any) -> Optional[np.ndarray]:
+    """Lấy ndarray từ Frame hoặc ndarray trần."""
+    return obj.data if isinstance(obj, Frame) else obj
+
+
+def detach(obj: Any) -> Any:
+    """
+    Frame / ndarray có dữ liệu riêng: ảnh read-only (view mượn slot SHM) được copy.
+    Dùng khi giữ frame lâu hơn frame hiện tại (hàng đợi, batch) để không chiếm slot ring
+    của writer (`SharedMemoryManager` bỏ frame mới khi mọi slot đang bị mượn).
+    """
+    data = as_array(obj)
+    if not isinstance(data, np.ndarray) or data.flags.writeable:
+        return obj
+    return obj.replace(data.copy()) if isinstance(obj, Frame) else data.copy()
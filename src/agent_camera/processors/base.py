@@ -8,6 +8,8 @@ phải tuân thủ, giúp tách biệt logic điều khiển phần cứng và g
 
 
 
+import itertools
+import threading
 from dataclasses import dataclass, field
 from typing import Any, Optional, Dict, Union, Sequence, List
 # from collections.abc import Sequence
@@ -16,6 +18,8 @@ import numpy as np
 from PySide6.QtCore import QObject, Signal
 from PySide6.QtWidgets import QWidget
 
+from ..frame import Frame
+
 # Nếu bạn có Ui_Form được sinh bởi Qt Designer
 from .ui.cam_control_ui import Ui_Form  # giữ nguyên import như bạn đang dùng
 
@@ -50,10 +54,18 @@ class Processor(QObject):
 
     name: str = "Processor"
     is_open: bool = False
-    # Dùng object để an toàn khi truyền numpy.ndarray
+    # Giới hạn FPS phát frame (0 = không giới hạn)
+    target_fps: float = 0.0
+    # Dùng object để an toàn khi truyền Frame / numpy.ndarray
     frame_ready = Signal(object)
     triggerSignal = Signal()
 
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        # Lớp con phải gọi super().__init__() trước khi dùng Worker / make_frame()
+        super().__init__(parent)
+        self._ready_evt = threading.Event()
+        self._frame_seq = itertools.count()
+
     def configure(self, s: CamSettings) -> None: ...
     def reset(self) -> None: ...
     def connect_camera(self) -> bool: ...
@@ -62,6 +74,47 @@ class Processor(QObject):
     def get_frame(self) -> Optional[np.ndarray]: ...
     def trigger_once(self) -> None: ...
 
+    # ----- Nhịp thu nhận (dùng bởi Worker) -----
+    def notify_ready(self) -> None:
+        """Đánh thức Worker đang chờ trong `wait_ready()` (vd: khi có trigger)."""
+        self._ready_evt.set()
+
+    def wait_ready(self, timeout: float) -> bool:
+        """
+        Worker gọi khi `get_frame()` trả None: chặn tới khi processor có thể trả frame
+        hoặc hết `timeout`. Processor có `get_frame()` tự chặn có thể override để trả ngay.
+        """
+        ok = self._ready_evt.wait(timeout)
+        self._ready_evt.clear()
+        return ok
+
+    # ----- Metadata frame -----
+    def frame_exposure(self) -> Optional[float]:
+        """Exposure đang áp (None nếu auto exposure hoặc không rõ)."""
+        s = getattr(self, "settings", None)
+        if s is None or s.exposure_auto:
+            return None
+        return s.exposure
+
+    def make_frame(self, data: np.ndarray, timestamp: Optional[float] = None,
+                   seq: Optional[int] = None) -> Frame:
+        """Bọc ảnh vừa chụp thành `Frame` (seq tăng dần theo processor nếu không truyền)."""
+        if seq is None:
+            seq = next(self._frame_seq)
+        return Frame(data, seq, self.name, timestamp, self.frame_exposure())
+
+    def set_target_fps(self, fps: float) -> None:
+        """Đặt giới hạn FPS (0 = không giới hạn), áp ngay cho Worker đang chạy."""
+        self.target_fps = max(0.0, float(fps))
+        worker = getattr(self, "_worker", None)
+        if worker is not None:
+            worker.target_fps = self.target_fps
+
+    def acquisition_stats(self) -> Optional[Dict[str, float]]:
+        """FPS / jitter thu nhận đo được ({"fps", "jitter_ms", "frames"}), None nếu chưa chạy."""
+        worker = getattr(self, "_worker", None)
+        return worker.meter.stats() if worker is not None else None
+
     @property
     def panel(self) -> "ConfigPanel": ...
 
@@ -33,6 +33,7 @@ from PySide6.QtWidgets import (
 # Base classes
 from .base import Processor, ConfigPanel, CamSettings
 from .worker import Worker
+from ..frame import Frame
 
 # Import dvp library
 # Assuming dvp.pyd is in the python path or project root
@@ -63,6 +64,8 @@ class DvpCameraProcessor(Processor):
         
         # Trigger emulation/state
         self._want_shot: bool = False
+        # GetFrame vừa chặn (có frame hoặc timeout) -> Worker không cần chờ thêm
+        self._blocked: bool = False
 
         # Wiring
         self.triggerSignal.connect(self.trigger_once)
@@ -146,7 +149,7 @@ class DvpCameraProcessor(Processor):
 
             # Start worker to pull frames
             self._worker = Worker(self)
-            self._worker.frame_ready.connect(self.__on_frame, Qt.ConnectionType.UniqueConnection)
+            self._worker.frame_ready.connect(self.__on_frame, Qt.ConnectionType.DirectConnection)
             self._worker.start()
 
             print("DVP Camera connected and started.")
@@ -195,9 +198,11 @@ class DvpCameraProcessor(Processor):
             # Best practice: always pull, but only return if wanted.
             pass
         
+        self._blocked = False
         try:
             # Timeout 3000ms
             frame = self._camera.GetFrame(3000) 
+            self._blocked = True
             if frame:
                 # Convert to numpy
                 mat = self._frame2mat(frame)
@@ -212,19 +217,25 @@ class DvpCameraProcessor(Processor):
                 return mat
                 
         except dvpException as e:
-            # Status.DVP_STATUS_TIME_OUT
-            # print(f"DVP GetFrame Error: {e.Status}")
-            pass
+            # Timeout: GetFrame đã chặn đủ lâu; lỗi khác trả về ngay -> để wait_ready chờ
+            self._blocked = e.Status == Status.DVP_STATUS_TIME_OUT
         except Exception as e:
             print(f"GetFrame Generic Error: {e}")
             
         return None
 
+    def wait_ready(self, timeout: float) -> bool:
+        # GetFrame(timeout) đã là primitive chờ của DVP: chỉ bỏ qua bước chờ khi lần gọi vừa
+        # rồi thực sự chặn; driver lỗi liên tục thì chờ timeout để Worker không quay vòng rỗng
+        if self._camera and self.is_open and self._blocked:
+            return True
+        return super().wait_ready(timeout)
+
     def trigger_once(self) -> None:
         if self.is_open and self.settings.trigger_mode:
             self._want_shot = True
 
-    def __on_frame(self, frame: np.ndarray) -> None:
+    def __on_frame(self, frame: Frame) -> None:
         self.frame_ready.emit(frame)
 
     def _frame2mat(self, frameBuffer):
@@ -0,0 +1,126 @@
+"""
+Module luồng chụp nền (FrameGrabber) cho các nguồn OpenCV VideoCapture.
+
+Luồng nền gọi `grab()` liên tục để buffer của driver luôn rỗng, còn việc giải mã
+(`retrieve()`) chỉ diễn ra khi consumer thực sự cần frame. Nhờ vậy chi phí decode
+(JPEG với MJPEG, convert với YUYV) chỉ trả một lần cho mỗi frame được dùng và độ trễ
+tối đa là một chu kỳ frame, không phụ thuộc vào số lần "flush".
+"""
+
+import threading
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+class FrameGrabber:
+    """
+    Luồng grab() liên tục trên một `cv2.VideoCapture`.
+
+    Mọi lệnh trên `cap` đều chạy trong luồng grabber: `read()` chỉ đặt yêu cầu, grabber
+    `retrieve()` ngay sau lần grab kế tiếp rồi trả frame về. Lệnh set/get property từ
+    luồng khác phải giữ `lock` (grabber giữ lock trong lúc grab/retrieve).
+
+    Với `release_on_exit=True`, chính luồng grabber `release()` capture khi vòng lặp thoát,
+    nên không bao giờ có hai luồng cùng dùng `cap` (kể cả khi `stop()` hết thời gian chờ
+    vì `grab()` đang treo trên stream chết). Chủ sở hữu khi đó không tự release nữa.
+
+    Attributes:
+        seq (int): Số lần grab thành công (tăng dần).
+        last_grab (float): time.monotonic() của lần grab thành công gần nhất.
+        failures (int): Số lần grab thất bại liên tiếp.
+        decoded (int): Số frame đã retrieve (giải mã).
+    """
+
+    # Nghỉ ngắn sau khi grab() lỗi để không busy-loop khi thiết bị mất kết nối
+    retry_delay = 0.01
+
+    def __init__(self, cap: cv2.VideoCapture, name: str = "FrameGrabber",
+                 release_on_exit: bool = False) -> None:
+        self.cap = cap
+        self.release_on_exit = release_on_exit
+        self.lock = threading.RLock()
+        self._cond = threading.Condition(threading.Lock())
+        self._stop_evt = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._want = False
+        self._frame: Optional[np.ndarray] = None
+        self.seq = 0
+        self.decoded = 0
+        self.last_grab = time.monotonic()
+        self.failures = 0
+
+    # -----------------
+    # Vòng đời
+    # -----------------
+    def start(self) -> "FrameGrabber":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._stop_evt.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive() and not self._stop_evt.is_set()
+
+    def _run(self) -> None:
+        try:
+            self._loop()
+        finally:
+            if self.release_on_exit:
+                with self.lock:
+                    try:
+                        self.cap.release()
+                    except Exception:
+                        pass
+
+    def _loop(self) -> None:
+        while not self._stop_evt.is_set():
+            frame = None
+            with self.lock:
+                ok = self.cap.grab()
+                # Chỉ giải mã khi có consumer đang chờ
+                wanted = ok and self._want
+                if wanted:
+                    got, frame = self.cap.retrieve()
+                    if not got:
+                        frame = None
+
+            if not ok:
+                self.failures += 1
+                self._stop_evt.wait(self.retry_delay)
+                continue
+
+            self.failures = 0
+            with self._cond:
+                self.seq += 1
+                self.last_grab = time.monotonic()
+                if wanted:
+                    self._want = False
+                    self._frame = frame
+                    self.decoded += 1
+                self._cond.notify_all()
+
+    # -----------------
+    # Consumer
+    # -----------------
+    def read(self, timeout: float = 0.5) -> Optional[np.ndarray]:
+        """
+        Yêu cầu và chờ frame của lần grab kế tiếp (tối đa `timeout` giây).
+        Trả None nếu hết hạn, grabber đã dừng hoặc decode lỗi.
+        """
+        with self._cond:
+            target = self.decoded + 1
+            self._want = True
+            if not self._cond.wait_for(
+                    lambda: self.decoded >= target or self._stop_evt.is_set(), timeout):
+                return None
+            frame, self._frame = self._frame, None
+        return frame
@@ -1,48 +1,89 @@
 """
 IPC Camera Processor.
 Kết nối tới service_dvp.py chạy trên Python 3.6 để nhận hình ảnh qua Shared Memory.
+Một service có thể phục vụ nhiều camera DVP; mỗi camera là một kênh SHM riêng và được
+expose thành một nguồn frame riêng (`IpcCameraProcessor.channels`).
+Exposure / trigger / ROI và software trigger được gửi vào service qua kênh lệnh SHM
+(`ControlChannel`) của từng camera. Khởi động / handshake / watchdog service nằm trong
+`dvp_service.DvpService` (dùng chung với headless).
 """
 from __future__ import annotations
 
-import sys
 import os
 import time
-import subprocess
 import threading
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
-import numpy as np
-import cv2
-
-from PySide6.QtCore import Signal, Qt
+from PySide6.QtCore import QObject, QTimer, Signal
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QPushButton, QMessageBox
+    QVBoxLayout, QFormLayout, QLabel, QLineEdit, QComboBox, QPushButton, QMessageBox,
+    QCheckBox, QSpinBox
 )
 
 from .base import Processor, ConfigPanel, CamSettings
+from .worker import FrameRateMeter
+from ..frame import Frame
+from ..dvp_service import DvpService, ServiceChannel, service_python, to_bgr
+
+
+class IpcChannel(QObject, ServiceChannel):
+    """
+    Một kênh SHM (một camera) của service: nguồn frame độc lập với luồng nhận riêng.
+    Kết nối `frame_ready` của từng kênh để xử lý nhiều góc nhìn song song.
+    """
+    frame_ready = Signal(object)
+
+    def __init__(self, index: int, parent=None):
+        QObject.__init__(self, parent)
+        self.thread: Optional[threading.Thread] = None
+        # FPS / jitter đo theo timestamp của service (thời điểm nhận frame từ camera)
+        self.meter = FrameRateMeter()
+        self.last_emit_ts = 0.0
+        ServiceChannel.__init__(self, index)
+
+    def reopen(self) -> None:
+        ServiceChannel.reopen(self)
+        self.meter.reset()
+        self.last_emit_ts = 0.0
 
-# Assume running from root, so shared_memory_utils is available
-try:
-    from shared_memory_utils import SharedMemoryManager
-except ImportError:
-    # Fallback if path issues, though unlikely if running main.py from root
-    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
-    from shared_memory_utils import SharedMemoryManager
 
 class IpcCameraProcessor(Processor):
     name = "DVPCamera"
     frame_ready = Signal(object)
-    
+    # Trạng thái service (phát từ luồng watchdog, nhận ở GUI qua queued connection)
+    health_changed = Signal(dict)
+    # Kết quả lệnh gửi vào service: (kênh, lệnh, ok, result), phát từ luồng gửi lệnh
+    command_done = Signal(int, str, bool, object)
+
     def __init__(self):
         super().__init__()
         self._panel = IpcConfigPanel()
-        self._process: Optional[subprocess.Popen] = None
-        self._thread: Optional[threading.Thread] = None
+        self._service: Optional[DvpService] = None
         self._running = False
-        self._shm: Optional[SharedMemoryManager] = None
+        self._channels: List[IpcChannel] = []
+        self._active = 0
+        # Lệnh vào service chặn tới khi service trả lời (vài giây khi service đang restart):
+        # gửi tuần tự trên một luồng riêng để không treo GUI
+        self._commands: Optional[ThreadPoolExecutor] = None
+        self.settings = CamSettings()
         
         self.triggerSignal.connect(self.trigger_once)
         self._panel.btn_toggle.clicked.connect(self._toggle_connection)
+        self._panel.btn_capture.clicked.connect(self.trigger_once)
+        self._panel.boxChannel.currentIndexChanged.connect(self._set_active_channel)
+        self._panel.settings_changed.connect(self.configure)
+        self.health_changed.connect(self._panel.show_health)
+        self.command_done.connect(self._panel.show_command)
+
+    @property
+    def channels(self) -> List[IpcChannel]:
+        """Các kênh đang mở (mỗi kênh là một nguồn frame riêng)."""
+        return list(self._channels)
+
+    def _set_active_channel(self, index: int) -> None:
+        """Chọn kênh được chuyển tiếp ra `frame_ready` (hiển thị / detect chính)."""
+        self._active = max(index, 0)
         
     def _toggle_connection(self):
         if self.is_open:
@@ -56,47 +97,48 @@ class IpcCameraProcessor(Processor):
         if self.is_open: return True
         
         # 1. Find Python 3.6 Executable
-        venv_py = os.path.abspath(os.path.join("venv36", "Scripts", "python.exe"))
+        venv_py = service_python()
         service_script = os.path.abspath("service_dvp.py")
         
-        if not os.path.exists(venv_py):
-            QMessageBox.critical(self.panel, "Lỗi", f"Không tìm thấy Python 3.6 tại:\n{venv_py}")
+        if not venv_py:
+            expected = os.path.abspath(os.path.join("venv36", "Scripts", "python.exe"))
+            QMessageBox.critical(self.panel, "Lỗi", f"Không tìm thấy Python 3.6 tại:\n{expected}")
             return False
             
         if not os.path.exists(service_script):
             QMessageBox.critical(self.panel, "Lỗi", f"Không tìm thấy script dịch vụ:\n{service_script}")
             return False
 
+        devices = self._panel.devices()
+        self._service = DvpService(devices, service_script)
+
         try:
-            # 2. Start Subprocess
-            print(f"[IPC] Launching: {venv_py} {service_script}")
-            cmd = [venv_py, service_script]
-            
-            # Create Process (Hide window on Windows)
-            startupinfo = None
-            if os.name == 'nt':
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            
-            self._process = subprocess.Popen(
-                cmd,
-                cwd=os.getcwd(),
-                startupinfo=startupinfo
-            )
-            
-            # Wait a bit for server to start and create SHM
-            # We can just start polling in the thread, no need to sleep long here
-            time.sleep(1.0)
-            
-            # 3. Connect Shared Memory
-            self._shm = SharedMemoryManager(create=False)
+            # 2. Start Subprocess và chờ service báo sẵn sàng (thay vì sleep cố định)
+            t0 = time.monotonic()
+            ok, msg = self._service.launch()
+            if not ok:
+                raise RuntimeError(msg)
+            print(f"[IPC] Service ready in {time.monotonic() - t0:.2f}s")
             
+            # 3. Connect Shared Memory: một kênh + một luồng nhận cho mỗi camera
+            self._channels = [IpcChannel(i, self) for i in range(max(len(devices), 1))]
+            self._panel.set_channels(len(self._channels))
+
             self._running = True
-            self._thread = threading.Thread(target=self._recv_loop, daemon=True)
-            self._thread.start()
+            self._commands = ThreadPoolExecutor(max_workers=1, thread_name_prefix="IpcCommand")
+            for ch in self._channels:
+                ch.thread = threading.Thread(target=self._recv_loop, args=(ch,), daemon=True)
+                ch.thread.start()
+            self._service.start_watchdog(
+                self._channels,
+                on_health=self.health_changed.emit,
+                on_restart=lambda: self.configure(self.settings),
+            )
             
             self.is_open = True
             print("[IPC] Connected successfully.")
+            # Áp cấu hình hiện tại của panel (exposure, trigger, ROI) khi service sẵn sàng
+            self.configure(self._panel.dump_settings())
             return True
             
         except Exception as e:
@@ -108,64 +150,127 @@ class IpcCameraProcessor(Processor):
     def disconnect_camera(self) -> bool:
         self._running = False
         self.is_open = False
+
+        if self._service:
+            self._service.stop_watchdog()
+        if self._commands:
+            self._commands.shutdown(wait=False, cancel_futures=True)
+            self._commands = None
         
-        # Wait for thread
-        if self._thread:
-            self._thread.join(timeout=1.0)
-            self._thread = None
-
-        # Close Shared Memory
-        if self._shm:
-            self._shm.close()
-            self._shm = None
-            
-        # Kill Process
-        if self._process:
-            self._process.terminate()
-            try:
-                self._process.wait(timeout=1)
-            except:
-                self._process.kill()
-            self._process = None
-            
+        # Wait for threads, close Shared Memory
+        for ch in self._channels:
+            if ch.thread:
+                ch.thread.join(timeout=1.0)
+                ch.thread = None
+            ch.close()
+        self._channels = []
+
+        if self._service:
+            self._service.terminate()
+            self._service = None
         return True
 
-    def _recv_loop(self):
-        """Poll shared memory for new frames."""
-        print("[IPC] Starting Receive Loop (Shared Memory)")
+    def _recv_loop(self, ch: IpcChannel):
+        """Nhận frame từ một kênh shared memory: chặn trên tín hiệu của service thay vì polling."""
+        print(f"[IPC] Starting Receive Loop (Shared Memory: {ch.name})")
         last_frame_id = -1
+        shm = None
         
         while self._running:
             try:
-                if not self._shm:
-                    time.sleep(0.1)
-                    continue
-
-                frame, frame_id = self._shm.read_frame()
-                
-                if frame is not None and frame_id is not None:
-                    # Check if new frame
-                    if frame_id != last_frame_id:
-                        last_frame_id = frame_id
-                        self.frame_ready.emit(frame)
+                with ch.lock:
+                    if ch.shm is not shm:
+                        # Service vừa restart: frame id đếm lại từ đầu
+                        shm, last_frame_id = ch.shm, -1
+
+                    if not shm or not shm.ensure_connected():
+                        # SHM not ready yet
+                        frame = header = None
+                        ready = False
                     else:
-                        # Same frame, sleep a bit to save CPU
-                        time.sleep(0.005) # 5ms
-                else:
-                    # SHM not ready yet or read failed
+                        ready = True
+                        # Lần đầu lấy frame mới nhất, sau đó đọc lần lượt các frame còn trong ring.
+                        # Frame là view read-only mượn trực tiếp slot SHM (không copy); slot được
+                        # trả cho service khi mọi tham chiếu tới frame trong pipeline được giải phóng.
+                        frame, header = shm.acquire_frame(
+                            last_id=last_frame_id if last_frame_id >= 0 else None, with_header=True
+                        )
+                        if frame is None:
+                            # No new frame: chờ service báo commit (timeout để còn kiểm tra _running)
+                            shm.wait_frame(
+                                last_frame_id if last_frame_id >= 0 else None, timeout=0.1
+                            )
+
+                if not ready:
                     time.sleep(0.1)
+                elif frame is not None and header is not None:
+                    last_frame_id = header.frame_id
+                    ch.meter.tick(header.timestamp)
+                    # Giới hạn FPS theo timestamp camera: bỏ frame tới sớm (trả slot ngay)
+                    if (self.target_fps > 0
+                            and header.timestamp - ch.last_emit_ts < 1.0 / self.target_fps):
+                        del frame
+                        continue
+                    ch.last_emit_ts = header.timestamp
+                    # seq = frame id của service (đếm lại khi service restart)
+                    frame = Frame(to_bgr(frame, header), header.frame_id,
+                                  f"{self.name}[{ch.index}]", exposure=self.frame_exposure())
+                    ch.frame_ready.emit(frame)
+                    if ch.index == self._active:
+                        self.frame_ready.emit(frame)
                     
             except Exception as e:
                 print(f"[IPC] Loop error: {e}")
                 time.sleep(1.0)
         
-        print("[IPC] Loop finished")
+        print(f"[IPC] Loop finished ({ch.name})")
         
     def configure(self, s: CamSettings) -> None:
-        pass 
+        """Chuyển tiếp exposure / trigger mode / ROI vào service (áp cho mọi kênh)."""
+        self.settings = s or CamSettings()
+        if not self.is_open:
+            return
+        params = {
+            "exposure": self.settings.exposure,
+            "exposure_auto": self.settings.exposure_auto,
+            "trigger_mode": self.settings.trigger_mode,
+        }
+        roi = self.settings.advanced.get("roi")
+        if roi:
+            params["roi"] = list(roi)
+        for ch in self._channels:
+            # Service có thể chưa mở xong kênh lệnh; lệnh ROI cần restart acquisition
+            self._send(ch, "configure", timeout=3.0, **params)
+
+    def _send(self, ch: IpcChannel, cmd: str, timeout: float = 1.0, **params) -> None:
+        """Đưa lệnh vào hàng đợi gửi; kết quả báo qua `command_done`."""
+        executor = self._commands
+        if executor is None:
+            return
+
+        def job():
+            ok, result = ch.command(cmd, timeout=timeout, **params)
+            self.command_done.emit(ch.index, cmd, ok, result)
+
+        try:
+            executor.submit(job)
+        except RuntimeError:
+            # Executor vừa shutdown (disconnect)
+            pass
+
+    def acquisition_stats(self):
+        """FPS / jitter của kênh đang hiển thị (đo theo timestamp service)."""
+        for ch in self._channels:
+            if ch.index == self._active:
+                return ch.meter.stats()
+        return None
 
     def trigger_once(self) -> None:
-        pass 
+        """Software trigger cho mọi camera (chụp đồng thời các góc nhìn của một sản phẩm)."""
+        if not self.is_open:
+            return
+        for ch in self._channels:
+            self._send(ch, "trigger")
 
     @property
     def panel(self) -> ConfigPanel:
@@ -173,20 +278,129 @@ class IpcCameraProcessor(Processor):
 
 
 class IpcConfigPanel(ConfigPanel):
+    settings_changed = Signal(CamSettings)
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(200)
+        self._debounce.timeout.connect(self._emit_settings)
+
         layout = QVBoxLayout(self)
         
         layout.addWidget(QLabel("<b>DVP Camera (Service Mode)</b>"))
-        layout.addWidget(QLabel("Chạy process riêng trên Python 3.6<br>Giao tiếp: Shared Memory (mmap)"))
+        layout.addWidget(QLabel("Chạy process riêng trên Python 3.6<br>Giao tiếp: Shared Memory (mmap / /dev/shm, ring buffer, 8/16-bit, Bayer RAW)"))
         
+        form = QFormLayout()
+        self.editDevices = QLineEdit()
+        self.editDevices.setPlaceholderText("0,1,2 (chỉ số hoặc FriendlyName, trống = camera đầu)")
+        form.addRow("Thiết bị:", self.editDevices)
+        self.boxChannel = QComboBox()
+        self.boxChannel.addItem("Kênh 0")
+        form.addRow("Kênh hiển thị:", self.boxChannel)
+
+        self.cbExposureAuto = QCheckBox("Auto Exposure")
+        self.cbExposureAuto.setChecked(True)
+        form.addRow(self.cbExposureAuto)
+        self.spinExposure = QSpinBox()
+        self.spinExposure.setRange(1, 1000000) # Microseconds
+        self.spinExposure.setValue(10000)
+        self.spinExposure.setSuffix(" µs")
+        self.spinExposure.setEnabled(False)
+        form.addRow("Exposure:", self.spinExposure)
+        self.editRoi = QLineEdit()
+        self.editRoi.setPlaceholderText("x,y,w,h (trống = toàn sensor)")
+        form.addRow("ROI:", self.editRoi)
+        self.chkTrigger = QCheckBox("Trigger Mode")
+        form.addRow(self.chkTrigger)
+        self.btn_capture = QPushButton("Trigger / Capture")
+        self.btn_capture.setEnabled(False)
+        form.addRow(self.btn_capture)
+        layout.addLayout(form)
+
         self.btn_toggle = QPushButton("Kết nối")
         layout.addWidget(self.btn_toggle)
+        self.lblHealth = QLabel("Service: chưa chạy")
+        self.lblHealth.setWordWrap(True)
+        layout.addWidget(self.lblHealth)
+        self.lblCommand = QLabel("")
+        self.lblCommand.setWordWrap(True)
+        layout.addWidget(self.lblCommand)
         layout.addStretch()
 
+        self.cbExposureAuto.toggled.connect(self.spinExposure.setDisabled)
+        self.cbExposureAuto.toggled.connect(self._on_change)
+        self.spinExposure.editingFinished.connect(self._on_change)
+        self.editRoi.editingFinished.connect(self._on_change)
+        self.chkTrigger.toggled.connect(self.btn_capture.setEnabled)
+        self.chkTrigger.toggled.connect(self._on_change)
+
+    def _on_change(self):
+        self._debounce.start()
+
+    def _emit_settings(self):
+        self.settings_changed.emit(self.dump_settings())
+
+    def roi(self) -> Optional[List[int]]:
+        try:
+            vals = [int(v) for v in self.editRoi.text().split(",") if v.strip()]
+        except ValueError:
+            return None
+        return vals if len(vals) == 4 else None
+
+    def devices(self) -> List[str]:
+        return [d.strip() for d in self.editDevices.text().split(",") if d.strip()]
+
+    def set_channels(self, count: int) -> None:
+        current = self.boxChannel.currentIndex()
+        self.boxChannel.blockSignals(True)
+        self.boxChannel.clear()
+        self.boxChannel.addItems([f"Kênh {i}" for i in range(count)])
+        self.boxChannel.setCurrentIndex(min(max(current, 0), count - 1))
+        self.boxChannel.blockSignals(False)
+
     def update_ui(self, connected: bool):
         self.btn_toggle.setText("Ngắt kết nối" if connected else "Kết nối")
+        self.editDevices.setEnabled(not connected)
+        if not connected:
+            self.lblHealth.setText("Service: chưa chạy")
+
+    def show_health(self, health: dict) -> None:
+        """Hiển thị trạng thái service: restart, frame đã ghi, GetFrame timeout, frame bị bỏ."""
+        lines = [f"Service: {health['state']} | restarts: {health['restarts']}"]
+        for i, st in enumerate(health["channels"]):
+            if st is None:
+                lines.append(f"Kênh {i}: chưa kết nối")
+            else:
+                lines.append(f"Kênh {i}: frames {st['frames']} | timeouts {st['timeouts']} "
+                             f"| dropped {st['dropped']}")
+        self.lblHealth.setText("<br>".join(lines))
+
+    def show_command(self, index: int, cmd: str, ok: bool, result) -> None:
+        """Hiển thị lệnh lỗi gần nhất (lệnh thành công thì xoá thông báo)."""
+        self.lblCommand.setText("" if ok else f"Kênh {index}: lệnh '{cmd}' lỗi: {result}")
 
     def enum_devices(self): return []
-    def dump_settings(self): return CamSettings()
-    def load_settings(self, s): pass
+
+    def dump_settings(self):
+        advanced = {"channel": self.boxChannel.currentIndex()}
+        if self.roi():
+            advanced["roi"] = self.roi()
+        return CamSettings(dev=self.editDevices.text(),
+                           exposure=self.spinExposure.value(),
+                           exposure_auto=self.cbExposureAuto.isChecked(),
+                           trigger_mode=self.chkTrigger.isChecked(),
+                           advanced=advanced)
+
+    def load_settings(self, s):
+        self.editDevices.setText(s.dev or "")
+        if s.exposure:
+            self.spinExposure.setValue(s.exposure)
+        self.cbExposureAuto.setChecked(s.exposure_auto)
+        self.chkTrigger.setChecked(s.trigger_mode)
+        roi = s.advanced.get("roi")
+        self.editRoi.setText(",".join(str(v) for v in roi) if roi else "")
+        channel = int(s.advanced.get("channel", 0))
+        self.set_channels(max(len(self.devices()), channel + 1, 1))
+        self.boxChannel.setCurrentIndex(channel)
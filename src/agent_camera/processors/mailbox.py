@@ -0,0 +1,114 @@
+"""
+Module hộp thư frame (FrameMailbox) giữa các camera processor và consumer trên GUI.
+
+Thay vì đẩy mọi frame qua queued signal (mỗi frame một event, dồn ứ vô hạn khi GUI/detect
+chậm), producer gọi `put()` trực tiếp trên luồng của nó; mailbox giữ tối đa `capacity`
+frame theo chính sách đã chọn và chỉ phát một thông báo `frame_available` cho mỗi đợt
+frame mới (coalesced). Consumer gọi `take()` trên luồng GUI để lấy frame.
+"""
+
+import threading
+from collections import deque
+from enum import IntEnum
+from typing import Any, Deque, List
+
+from PySide6.QtCore import QObject, QThread, Signal
+
+from ..frame import detach
+
+
+class MailboxPolicy(IntEnum):
+    LATEST = 0       # Chỉ giữ frame mới nhất (độ trễ thấp nhất)
+    DROP_OLDEST = 1  # Giữ tối đa N frame, đầy thì bỏ frame cũ nhất
+    BLOCK = 2        # Giữ tối đa N frame, đầy thì producer chờ (tối đa `block_timeout`)
+
+
+class FrameMailbox(QObject):
+    """
+    Hàng đợi frame có giới hạn, an toàn đa luồng.
+
+    Attributes:
+        frame_available (Signal): Phát khi mailbox chuyển từ rỗng sang có frame.
+        dropped (int): Số frame bị bỏ do đầy (LATEST / DROP_OLDEST).
+        delivered (int): Số frame đã giao cho consumer.
+    """
+
+    frame_available = Signal()
+
+    # Producer không chờ quá lâu để luồng camera luôn dừng được (disconnect từ GUI)
+    block_timeout = 1.0
+
+    def __init__(self, policy: MailboxPolicy = MailboxPolicy.LATEST, capacity: int = 1,
+                 parent=None) -> None:
+        super().__init__(parent)
+        self._cond = threading.Condition()
+        self._frames: Deque[Any] = deque()
+        self._closed = False
+        self.policy = MailboxPolicy.LATEST
+        self.capacity = 1
+        self.dropped = 0
+        self.delivered = 0
+        self.configure(policy, capacity)
+
+    def configure(self, policy: MailboxPolicy, capacity: int = 1) -> None:
+        """Đổi chính sách / dung lượng; frame thừa (nếu có) bị bỏ từ cũ nhất."""
+        with self._cond:
+            self.policy = MailboxPolicy(policy)
+            self.capacity = 1 if self.policy == MailboxPolicy.LATEST else max(1, int(capacity))
+            while len(self._frames) > self.capacity:
+                self._frames.popleft()
+                self.dropped += 1
+            self._cond.notify_all()
+
+    @property
+    def depth(self) -> int:
+        return len(self._frames)
+
+    def put(self, frame: Any) -> None:
+        """Producer: gửi frame (gọi trực tiếp trên luồng camera)."""
+        if self.capacity > 1:
+            # Hàng đợi nhiều frame: không giữ view SHM mượn trong lúc chờ
+            frame = detach(frame)
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._frames) >= self.capacity:
+                # BLOCK từ chính luồng của consumer sẽ tự khóa chết -> xử lý như DROP_OLDEST
+                if (self.policy == MailboxPolicy.BLOCK
+                        and QThread.currentThread() is not self.thread()):
+                    if not self._cond.wait_for(
+                            lambda: len(self._frames) < self.capacity or self._closed,
+                            self.block_timeout):
+                        self.dropped += 1
+                        return
+                    if self._closed:
+                        return
+                else:
+                    self._frames.popleft()
+                    self.dropped += 1
+            was_empty = not self._frames
+            self._frames.append(frame)
+
+        if was_empty:
+            self.frame_available.emit()
+
+    def take(self) -> List[Any]:
+        """Consumer: lấy hết frame đang chờ (cũ -> mới)."""
+        with self._cond:
+            frames = list(self._frames)
+            self._frames.clear()
+            self.delivered += len(frames)
+            self._cond.notify_all()
+        return frames
+
+    def clear(self) -> None:
+        with self._cond:
+            self._frames.clear()
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """Giải phóng producer đang chờ (BLOCK) và bỏ các frame còn lại."""
+        with self._cond:
+            self._closed = True
+            self._frames.clear()
+            self._cond.notify_all()
@@ -2,10 +2,13 @@
 
 Cung cấp lớp `UsbCameraProcessor` và bảng cấu hình `UsbCameraConfigPanel` phục vụ
 việc quét thiết bị USB, điều khiển phơi sáng, trigger-mode và các tuỳ chọn nâng cao.
+Khi kết nối, processor dò các chế độ (FOURCC, W×H, FPS) camera chấp nhận và chọn chế độ
+nhanh nhất thoả độ phân giải / FPS yêu cầu; có thể xuất thẳng ảnh xám (kênh Y).
 """
 
 
 
+from contextlib import nullcontext
 from dataclasses import dataclass
 from typing import Optional, Any, Tuple, Union, Sequence, List
 # from collections.abc import Sequence
@@ -14,6 +17,7 @@ import sys
 import cv2
 import numpy as np
 from PySide6.QtCore import Signal, Qt, QTimer
+from PySide6.QtGui import QActionGroup
 from PySide6.QtWidgets import (
     QToolButton,
     QMenu,
@@ -28,6 +32,8 @@ from PySide6.QtWidgets import (
 
 from .base import Processor, ConfigPanel, CamSettings
 from .worker import Worker
+from ..frame import Frame
+from .grabber import FrameGrabber
 
 
 @dataclass
@@ -42,10 +48,109 @@ class _OpenCvCaps:
     PROP_FRAME_WIDTH: int = getattr(cv2, "CAP_PROP_FRAME_WIDTH", 3)
     PROP_FRAME_HEIGHT: int = getattr(cv2, "CAP_PROP_FRAME_HEIGHT", 4)
     PROP_FPS: int = getattr(cv2, "CAP_PROP_FPS", 5)
+    PROP_FOURCC: int = getattr(cv2, "CAP_PROP_FOURCC", 6)
+    PROP_CONVERT_RGB: int = getattr(cv2, "CAP_PROP_CONVERT_RGB", 16)
 
 
 CAPS = _OpenCvCaps()
 _PREFERRED_RES = [(2560, 1440)]
+# Thứ tự ưu tiên khi cùng FPS: MJPG nén (ít băng thông USB), YUYV, GREY (Y8)
+_FOURCCS = ("MJPG", "YUYV", "GREY")
+_FPS_CANDIDATES = (120, 60, 30)
+
+
+@dataclass
+class UsbMode:
+    """Chế độ thu thực tế camera chấp nhận (đọc lại từ driver sau khi set)."""
+
+    fourcc: str
+    width: int
+    height: int
+    fps: float
+    gray: bool = False
+
+    def __str__(self) -> str:
+        text = f"{self.fourcc} {self.width}×{self.height} @ {self.fps:.0f} fps"
+        return text + (" (xám)" if self.gray else "")
+
+
+def _fourcc_str(value: float) -> str:
+    v = int(value)
+    return "".join(chr((v >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00 ")
+
+
+def probe_mode(cap: cv2.VideoCapture, fourcc: str, w: int, h: int, fps: float) -> Optional[UsbMode]:
+    """Thử đặt một chế độ; trả về chế độ driver thực sự áp dụng nếu khớp W×H và FOURCC."""
+    try:
+        cap.set(CAPS.PROP_FOURCC, float(cv2.VideoWriter_fourcc(*fourcc)))
+        cap.set(CAPS.PROP_FRAME_WIDTH, float(w))
+        cap.set(CAPS.PROP_FRAME_HEIGHT, float(h))
+        if fps:
+            cap.set(CAPS.PROP_FPS, float(fps))
+        got_w = int(cap.get(CAPS.PROP_FRAME_WIDTH) or 0)
+        got_h = int(cap.get(CAPS.PROP_FRAME_HEIGHT) or 0)
+        got_fps = float(cap.get(CAPS.PROP_FPS) or 0.0)
+        got_cc = _fourcc_str(cap.get(CAPS.PROP_FOURCC) or 0)
+    except Exception:
+        return None
+    # chấp nhận sai số nhỏ do rounding/step của driver; backend không báo FOURCC thì bỏ qua
+    if abs(got_w - w) > 16 or abs(got_h - h) > 16:
+        return None
+    if got_cc and got_cc.upper() != fourcc:
+        return None
+    return UsbMode(fourcc, got_w, got_h, got_fps)
+
+
+def negotiate_mode(cap: cv2.VideoCapture, size: Optional[Tuple[int, int]] = None,
+                   fps: float = 0.0, gray: bool = False) -> Optional[UsbMode]:
+    """
+    Dò các tổ hợp (FOURCC, W×H, FPS) và áp chế độ nhanh nhất thoả yêu cầu.
+
+    Args:
+        size: Độ phân giải yêu cầu; None -> thử lần lượt `_PREFERRED_RES`.
+        fps: FPS tối thiểu yêu cầu (0 = càng cao càng tốt).
+        gray: Ưu tiên GREY (Y8) khi downstream chỉ cần độ sáng.
+    """
+    sizes = [tuple(size)] if size else list(_PREFERRED_RES)
+    rates = (fps,) if fps else _FPS_CANDIDATES
+    fourccs = ("GREY",) + tuple(c for c in _FOURCCS if c != "GREY") if gray else _FOURCCS
+
+    for w, h in sizes:
+        found: List[UsbMode] = []
+        for cc in fourccs:
+            best_cc: Optional[UsbMode] = None
+            for rate in rates:
+                mode = probe_mode(cap, cc, w, h, rate)
+                if mode is None:
+                    break  # FOURCC/độ phân giải không hỗ trợ: bỏ các FPS còn lại
+                # Driver có thể nhận lệnh nhưng áp FPS khác: giữ chế độ FPS thực tế cao nhất
+                if (not fps or mode.fps + 0.5 >= fps) and (
+                        best_cc is None or mode.fps > best_cc.fps):
+                    best_cc = mode
+                if mode.fps + 0.5 >= rate:
+                    break  # Driver áp đúng FPS yêu cầu: các FPS thấp hơn không tốt hơn
+            if best_cc is not None:
+                found.append(best_cc)
+        if found:
+            # FPS cao nhất; cùng FPS thì theo thứ tự ưu tiên FOURCC
+            best = max(found, key=lambda m: (round(m.fps), -fourccs.index(m.fourcc)))
+            applied = probe_mode(cap, best.fourcc, best.width, best.height, fps or best.fps)
+            mode = applied or best
+            mode.gray = gray
+            return mode
+    return None
+
+
+def _to_gray(frame: np.ndarray, mode: UsbMode) -> np.ndarray:
+    """Lấy kênh độ sáng rẻ nhất có thể tùy dạng frame backend trả về."""
+    if mode.fourcc == "MJPG" and frame.ndim == 2 and frame.shape[0] == 1:
+        # Buffer JPEG thô (CONVERT_RGB=0): decode thẳng ra xám, bỏ qua chroma
+        return cv2.imdecode(frame, cv2.IMREAD_GRAYSCALE)
+    if frame.ndim == 2:
+        return frame  # GREY
+    if frame.shape[2] == 2:
+        return frame[:, :, 0]  # YUYV thô: kênh Y
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
 
 class UsbCameraProcessor(Processor):
@@ -66,11 +171,15 @@ class UsbCameraProcessor(Processor):
         self._panel = UsbCameraConfigPanel()
         self._worker: Optional[Worker] = None
         self._cap: Optional[cv2.VideoCapture] = None
+        self._grabber: Optional[FrameGrabber] = None
         self.is_open: bool = False
 
         # config
         self._invert_rgb: bool = False
         self._cap_size = None
+        self._req_fps: float = 0.0
+        self._gray: bool = False
+        self._mode: Optional[UsbMode] = None
 
         # trigger emulate flag
         self._want_shot: bool = False
@@ -153,8 +262,8 @@ class UsbCameraProcessor(Processor):
             # ↓ giảm độ trễ: cố gắng đặt buffer size về 1 (nếu driver hỗ trợ)
             self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
             
-            # Đặt độ phân giải mặc định/ưu tiên
-            self._ensure_default_resolution()
+            # Chọn chế độ (FOURCC, độ phân giải, FPS) nhanh nhất thoả yêu cầu
+            self._negotiate_mode()
             
             # Áp settings hiện tại (auto/manual exposure…)
             # Dùng try-except cục bộ để lỗi set property không làm tèo connection
@@ -163,9 +272,15 @@ class UsbCameraProcessor(Processor):
             except Exception as se:
                 print(f"   ⚠ Không thể thiết lập thông số ban đầu: {se}")
 
+            # Luồng grab() liên tục; chỉ decode frame mà Worker thực sự lấy
+            # Từ đây grabber sở hữu capture (release trên chính luồng của nó)
+            self._grabber = FrameGrabber(
+                self._cap, name="UsbGrabber", release_on_exit=True
+            ).start()
+
             self._worker = Worker(self)
             self._worker.frame_ready.connect(
-                self.__on_frame, Qt.ConnectionType.UniqueConnection
+                self.__on_frame, Qt.ConnectionType.DirectConnection
             )
             self._worker.start()
 
@@ -179,7 +294,12 @@ class UsbCameraProcessor(Processor):
 
 
     def disconnect_camera(self) -> bool:
-        """Dừng worker trước, rồi giải phóng camera."""
+        """Dừng grabber (đánh thức Worker đang chờ frame), dừng worker, rồi giải phóng camera."""
+        if self._grabber:
+            self._grabber.stop()
+            self._grabber = None
+            self._cap = None  # grabber đã / sẽ release khi luồng của nó thoát
+
         if self._worker:
             try:
                 self._worker.stop()
@@ -197,6 +317,8 @@ class UsbCameraProcessor(Processor):
                 self._cap = None
 
         self.is_open = False
+        self._mode = None
+        self._panel.show_mode(None)
         self.reset()
         return True
 
@@ -207,41 +329,20 @@ class UsbCameraProcessor(Processor):
         # Worker của bạn sẽ gọi get_frame theo chu kỳ có sẵn
         return True
 
-    def _read_latest_frame(self, flush_count: int = 3) -> Optional[np.ndarray]:
-        """
-        Lấy khung mới nhất bằng cách 'flush' buffer:
-        - gọi grab() flush_count-1 lần (bỏ khung cũ)
-        - sau đó read() lấy khung cuối
-        """
-        if not self._cap:
-            return None
-
-        # flush bớt khung cũ
-        for _ in range(max(0, flush_count - 1)):
-            try:
-                self._cap.read()
-            except Exception:
-                break
-
-        ok, frame = self._cap.read()
-        if not ok or frame is None:
-            return None
-        return frame
-
     def get_frame(self) -> Optional[np.ndarray]:
         """
-        Continuous: trả frame ngay (sau khi flush nhẹ).
+        Continuous: chờ và giải mã frame của lần grab kế tiếp (grabber giữ buffer luôn mới).
         Trigger mode: chỉ trả frame khi _want_shot = True rồi reset cờ.
         Luôn chuyển BGR -> RGB trước khi trả về.
         """
-        if not self._cap:
+        if not self._grabber:
             return None
 
         if self.settings.trigger_mode and not self._want_shot:
             return None
 
-        # Đọc khung mới nhất (flush nhẹ để tránh chậm 1 frame)
-        frame = self._read_latest_frame(flush_count=3)
+        # Frame grab ngay sau yêu cầu: trễ tối đa một chu kỳ frame, decode một lần
+        frame = self._grabber.read(timeout=0.5)
         if frame is None:
             return None
 
@@ -249,6 +350,10 @@ class UsbCameraProcessor(Processor):
         if self.settings.trigger_mode:
             self._want_shot = False
 
+        mode = self._mode
+        if mode is not None and mode.gray:
+            return _to_gray(frame, mode)
+
         # ↓ Chuyển BGR → RGB để không bị ngược màu
         if self._invert_rgb:
             try:
@@ -264,6 +369,7 @@ class UsbCameraProcessor(Processor):
         """
         if self._cap and self.settings.trigger_mode:
             self._want_shot = True
+            self.notify_ready()
 
     # -------------
     # Helpers
@@ -276,6 +382,10 @@ class UsbCameraProcessor(Processor):
         if not self.settings.exposure_auto:
             self._set_exposure(int(self.settings.exposure))
 
+    def _cap_lock(self):
+        """Lock bảo vệ `_cap` khi grabber đang chạy (VideoCapture không an toàn đa luồng)."""
+        return self._grabber.lock if self._grabber else nullcontext()
+
     def _set_auto_exposure(self, enabled: bool) -> None:
         if not self._cap:
             return
@@ -283,12 +393,13 @@ class UsbCameraProcessor(Processor):
         # - V4L2: CAP_PROP_AUTO_EXPOSURE = 1: manual, 3: auto
         # - DirectShow/MSMF: đôi khi dùng 0=manual, 1=auto (hoặc ngược)
         try:
-            if sys.platform.startswith("linux"):
-                self._cap.set(CAPS.PROP_AUTO_EXPOSURE, 3 if enabled else 1)
-            else:
-                # Nhiều driver Windows dùng 0.25 (manual) và 0.75 (auto). Thử cả hai nhánh.
-                val = 0.75 if enabled else 0.25
-                self._cap.set(CAPS.PROP_AUTO_EXPOSURE, val)
+            with self._cap_lock():
+                if sys.platform.startswith("linux"):
+                    self._cap.set(CAPS.PROP_AUTO_EXPOSURE, 3 if enabled else 1)
+                else:
+                    # Nhiều driver Windows dùng 0.25 (manual) và 0.75 (auto). Thử cả hai nhánh.
+                    val = 0.75 if enabled else 0.25
+                    self._cap.set(CAPS.PROP_AUTO_EXPOSURE, val)
         except Exception:
             pass
 
@@ -297,7 +408,8 @@ class UsbCameraProcessor(Processor):
             return
         # Thang đo exposure tuỳ driver (ms, log2, hay EV). Ta chỉ set trực tiếp:
         try:
-            self._cap.set(CAPS.PROP_EXPOSURE, float(value))
+            with self._cap_lock():
+                self._cap.set(CAPS.PROP_EXPOSURE, float(value))
         except Exception:
             pass
 
@@ -314,53 +426,47 @@ class UsbCameraProcessor(Processor):
 
     def set_frame_size(self, w: int, h: int) -> None:
         if self._cap:
-            self._cap.set(CAPS.PROP_FRAME_WIDTH, float(w))
-            self._cap.set(CAPS.PROP_FRAME_HEIGHT, float(h))
+            with self._cap_lock():
+                self._cap.set(CAPS.PROP_FRAME_WIDTH, float(w))
+                self._cap.set(CAPS.PROP_FRAME_HEIGHT, float(h))
 
     def _on_adv_changed(self, cfg: dict):
-        # cfg = {"invert_rgb": bool, "frame_size": (w,h)|None}
+        # cfg = {"invert_rgb": bool, "frame_size": (w,h)|None, "fps": float, "gray": bool}
         self._invert_rgb = cfg.get("invert_rgb", False)
         fs = cfg.get("frame_size")
+        fps = float(cfg.get("fps") or 0.0)
+        gray = bool(cfg.get("gray", False))
+        changed = (fs != self._cap_size or fps != self._req_fps or gray != self._gray)
         self._cap_size = fs
-        # -> cập nhật processor: đảo màu + set frame size (nếu đang connected)
-        if fs:
-            self.set_frame_size(*fs)
+        self._req_fps = fps
+        self._gray = gray
+        # -> cập nhật processor: dò lại chế độ (nếu đang connected)
+        if changed and self._cap:
+            self._negotiate_mode()
 
-    def __on_frame(self, frame: np.ndarray) -> None:
+    def __on_frame(self, frame: Frame) -> None:
         self.frame_ready.emit(frame)
         # USB cam không có auto exposure query thống nhất, bỏ qua polling.
 
-    def _ensure_default_resolution(self) -> Optional[Tuple[int, int]]:
-        """
-        Thử đặt độ phân giải 2K theo thứ tự ưu tiên. Trả về (w,h) nếu thành công, None nếu không đổi.
-        """
+    def _negotiate_mode(self) -> Optional[UsbMode]:
+        """Dò và áp chế độ thu; báo chế độ thực tế lên panel. None nếu không khớp chế độ nào."""
         if not self._cap:
             return None
-
-        size = self._cap_size
-        if size:
-            self.set_frame_size(*size)
-            return size
-
-        for w, h in _PREFERRED_RES:
-            try:
-                self._cap.set(CAPS.PROP_FRAME_WIDTH, float(w))
-                self._cap.set(CAPS.PROP_FRAME_HEIGHT, float(h))
-                # Một số driver cần 1 nhịp nhỏ để áp dụng
-                try:
-                    import time as _t
-
-                    _t.sleep(0.05)
-                except Exception:
-                    pass
-                got_w = int(self._cap.get(CAPS.PROP_FRAME_WIDTH) or 0)
-                got_h = int(self._cap.get(CAPS.PROP_FRAME_HEIGHT) or 0)
-                # chấp nhận sai số nhỏ do rounding/step của driver
-                if abs(got_w - w) <= 16 and abs(got_h - h) <= 16:
-                    return (got_w, got_h)
-            except Exception:
-                continue
-        return None
+        with self._cap_lock():
+            mode = negotiate_mode(self._cap, self._cap_size, self._req_fps, self._gray)
+            if mode is not None and mode.gray:
+                # Lấy buffer thô: YUYV/GREY dùng thẳng kênh Y, MJPG decode thẳng ra xám
+                # (backend không hỗ trợ thì vẫn trả BGR, _to_gray tự xử lý)
+                self._cap.set(CAPS.PROP_CONVERT_RGB, 0.0)
+            else:
+                self._cap.set(CAPS.PROP_CONVERT_RGB, 1.0)
+        if mode is None and self._cap_size:
+            # Driver không báo đúng FOURCC/size: giữ hành vi cũ, chỉ ép kích thước
+            self.set_frame_size(*self._cap_size)
+        self._mode = mode
+        print(f"   -> USB mode: {mode if mode else 'mặc định của driver'}")
+        self._panel.show_mode(mode)
+        return mode
 
     # -------------
     # UI plumbing
@@ -405,6 +511,11 @@ class UsbCameraConfigPanel(ConfigPanel):
         self.btnAdvanced.menu_changed.connect(self.menu_changed.emit)
         self.gridLayout.addWidget(self.btnAdvanced, 6, 0, 1, 2)
 
+        # Chế độ thu thực tế sau khi dò
+        self.lblMode = QLabel(self)
+        self.gridLayout.addWidget(self.lblMode, 7, 0, 1, 2)
+        self.show_mode(None)
+
     # -----------------
     # Properties
     # -----------------
@@ -576,6 +687,9 @@ class UsbCameraConfigPanel(ConfigPanel):
     def show_error(self, msg: str) -> None:
         QMessageBox.critical(self, "Lỗi", msg)
 
+    def show_mode(self, mode: Optional[UsbMode]) -> None:
+        self.lblMode.setText(f"Chế độ: {mode}" if mode else "Chế độ: -")
+
 
 class _AdvancedButton(QToolButton):
     """Nút menu nâng cao cho cấu hình USB camera.
@@ -583,11 +697,13 @@ class _AdvancedButton(QToolButton):
     Cung cấp menu để:
         - Đảo màu RGB (invert)
         - Chọn kích thước khung hình (preset hoặc tuỳ chỉnh)
+        - Chọn FPS yêu cầu và xuất ảnh xám (chỉ kênh Y)
 
-    Phát `menu_changed` mỗi khi có thay đổi cấu hình (invert_rgb/frame_size).
+    Phát `menu_changed` mỗi khi có thay đổi cấu hình (invert_rgb/frame_size/fps/gray).
     """
 
-    menu_changed = Signal(dict)  # emit {"invert_rgb": bool, "frame_size": (w,h)|None}
+    # emit {"invert_rgb": bool, "frame_size": (w,h)|None, "fps": float, "gray": bool}
+    menu_changed = Signal(dict)
 
     def __init__(self, parent=None) -> None:
         super().__init__(parent)
@@ -622,6 +738,22 @@ class _AdvancedButton(QToolButton):
         self.actCustomSize = self.mnuSize.addAction("Tùy chỉnh…")
         self.mnuAdvanced.addMenu(self.mnuSize)
 
+        # 3) FPS yêu cầu
+        self.mnuFps = QMenu("FPS", self.mnuAdvanced)
+        self._fps_group = QActionGroup(self)
+        self._fps_group.setExclusive(True)
+        for text, fps in (("Tự động (cao nhất)", 0), ("30", 30), ("60", 60), ("120", 120)):
+            act = self.mnuFps.addAction(text)
+            act.setCheckable(True)
+            act.setData(fps)
+            act.setChecked(fps == 0)
+            self._fps_group.addAction(act)
+        self.mnuAdvanced.addMenu(self.mnuFps)
+
+        # 4) Ảnh xám
+        self.actGray = self.mnuAdvanced.addAction("Ảnh xám (chỉ kênh Y)")
+        self.actGray.setCheckable(True)
+
         self.setMenu(self.mnuAdvanced)
 
     def _add_style(self):
@@ -638,6 +770,8 @@ class _AdvancedButton(QToolButton):
         # Click phần nút chính -> mở menu mặc định (hoặc bạn có thể mở dialog khác)
         # self.clicked.connect(self._open_something)
         self.actInvert.toggled.connect(lambda _on: self._emit_changed())
+        self.actGray.toggled.connect(lambda _on: self._emit_changed())
+        self._fps_group.triggered.connect(lambda _act: self._emit_changed())
         self.actCustomSize.triggered.connect(self._on_custom_size)
 
     def _add_size_action(self, menu: QMenu, text: str, w: int, h: int):
@@ -672,21 +806,28 @@ class _AdvancedButton(QToolButton):
         """Trả về dict cấu hình hiện tại để lưu/đọc nhanh.
 
         Returns:
-            dict: {'invert_rgb': bool, 'frame_size': [w, h] | None}
+            dict: {'invert_rgb': bool, 'frame_size': [w, h] | None, 'fps': float, 'gray': bool}
         """
+        checked = self._fps_group.checkedAction()
         return {
             "invert_rgb": self.actInvert.isChecked(),
             "frame_size": list(self._frame_size) if self._frame_size else None,
+            "fps": float(checked.data()) if checked else 0.0,
+            "gray": self.actGray.isChecked(),
         }
 
     def from_dict(self, data: dict):
         """Áp dữ liệu cấu hình đã lưu lên nút menu (khởi tạo trạng thái).
 
         Args:
-            data (dict): Dict có thể chứa 'invert_rgb' và 'frame_size'.
+            data (dict): Dict có thể chứa 'invert_rgb', 'frame_size', 'fps' và 'gray'.
         """
         fs = (data or {}).get("frame_size")
         self.actInvert.setChecked(bool((data or {}).get("invert_rgb", False)))
+        self.actGray.setChecked(bool((data or {}).get("gray", False)))
+        fps = float((data or {}).get("fps") or 0.0)
+        for act in self._fps_group.actions():
+            act.setChecked(float(act.data()) == fps)
 
         if isinstance(fs, (list, tuple)) and len(fs) == 2:
             try:
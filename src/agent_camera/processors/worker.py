@@ -6,42 +6,109 @@ Camera Processor và đẩy về luồng chính xử lý, giúp tối ưu hóa h
 đảm bảo tính mượt mà của giao diện.
 """
 
-import numpy as np
+import threading
 import time
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
 from PySide6.QtCore import QThread, Signal
 from .base import Processor
 
 
+class FrameRateMeter:
+    """Đo FPS thu nhận và jitter (độ lệch chuẩn khoảng cách giữa các frame) trên cửa sổ trượt."""
+
+    def __init__(self, window: int = 120) -> None:
+        self._lock = threading.Lock()
+        self._last: Optional[float] = None
+        self._intervals = deque(maxlen=window)
+        self.frames = 0
+
+    def tick(self, t: Optional[float] = None) -> None:
+        """Ghi nhận một frame tại thời điểm `t` (giây; mặc định perf_counter, hoặc timestamp camera)."""
+        t = time.perf_counter() if t is None else t
+        with self._lock:
+            if self._last is not None and t > self._last:
+                self._intervals.append(t - self._last)
+            self._last = t
+            self.frames += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._last = None
+            self._intervals.clear()
+            self.frames = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            dts = np.fromiter(self._intervals, dtype=np.float64)
+            frames = self.frames
+        if dts.size == 0:
+            return {"fps": 0.0, "jitter_ms": 0.0, "frames": frames}
+        return {
+            "fps": float(1.0 / dts.mean()),
+            "jitter_ms": float(dts.std() * 1000.0),
+            "frames": frames,
+        }
+
+
 class Worker(QThread):
     """Thread worker lấy khung ảnh từ một Processor.
 
     Vòng đời:
-        - `run` liên tục gọi `camera_instance.get_frame()` và phát `frame_ready` khi có khung.
+        - `run` liên tục gọi `camera_instance.get_frame()` và phát `frame_ready` (Frame có
+          timestamp / seq lúc chụp) khi có khung.
+          `get_frame()` tự chặn trên primitive của camera (GetFrame(timeout), read()...), nên
+          worker không ngủ cố định giữa các frame.
         - `stop` dừng vòng lặp và chờ kết thúc thread an toàn.
+
+    Attributes:
+        target_fps (float): Giới hạn FPS phát ra (0 = không giới hạn).
+        meter (FrameRateMeter): FPS / jitter thu nhận đo được.
     """
 
-    frame_ready = Signal(np.ndarray)
+    frame_ready = Signal(object)  # Frame
+
+    # Thời gian chờ tối đa khi processor chưa sẵn sàng (trigger mode chưa có shot, lỗi đọc...)
+    idle_timeout = 0.1
 
     def __init__(self, camera_instance: Processor):
         super().__init__()
         self.camera_instance = camera_instance
-        self._running = True
+        self._stop_evt = threading.Event()
+        self.target_fps: float = float(getattr(camera_instance, "target_fps", 0.0) or 0.0)
+        self.meter = FrameRateMeter()
 
     def run(self):
         """Vòng lặp chính: lấy frame bằng `camera_instance.get_frame()` và phát `frame_ready`.
 
-        Nếu `get_frame()` trả None thì tạm ngủ một khoảng ngắn để tránh busy-loop.
+        Nếu `get_frame()` trả None thì chờ `camera_instance.wait_ready()` (được đánh thức ngay
+        khi trigger) thay vì busy-loop. Khi đặt `target_fps`, worker chờ tới hạn frame kế tiếp
+        trước khi đọc, để camera/driver giữ frame mới nhất thay vì đọc rồi bỏ.
         """
-        while self._running:
+        next_due = 0.0
+        while not self._stop_evt.is_set():
+            if self.target_fps > 0:
+                delay = next_due - time.perf_counter()
+                if delay > 0 and self._stop_evt.wait(delay):
+                    break
+
             frame = self.camera_instance.get_frame()
             if frame is None:
-                time.sleep(0.01)
+                self.camera_instance.wait_ready(self.idle_timeout)
                 continue
-            self.frame_ready.emit(frame)
-            time.sleep(0.01)
+
+            now = time.perf_counter()
+            self.meter.tick(now)
+            if self.target_fps > 0:
+                next_due = now + 1.0 / self.target_fps
+            self.frame_ready.emit(self.camera_instance.make_frame(frame))
 
     def stop(self):
         """Yêu cầu dừng worker, gọi quit() và chờ thread kết thúc bằng wait()."""
-        self._running = False
+        self._stop_evt.set()
+        # Đánh thức worker nếu đang chờ processor sẵn sàng
+        self.camera_instance.notify_ready()
         self.quit()
         self.wait()
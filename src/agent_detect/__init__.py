@@ -1,4 +1,13 @@
 from .processors import ProcessResult
-from .base_widget import BaseYoloAgent as BaseDetectWidget
+
+
+def __getattr__(name):
+    # Widget (Qt + ultralytics) chỉ import khi dùng: `processors` chạy được không cần Qt
+    if name == "BaseDetectWidget":
+        from .base_widget import BaseYoloAgent as BaseDetectWidget
+
+        return BaseDetectWidget
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = ["ProcessResult", "BaseDetectWidget"]
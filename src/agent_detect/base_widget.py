@@ -13,19 +13,28 @@ from typing import Any
 import numpy as np
 from ultralytics.engine.results import Results
 
-from PySide6.QtWidgets import QWidget, QFileDialog, QApplication, QMenu
+from PySide6.QtWidgets import (
+    QWidget, QFileDialog, QApplication, QMenu, QLabel, QHBoxLayout, QSpinBox, QComboBox,
+    QProgressBar, QPushButton,
+)
 from PySide6.QtCore import Signal, QTimer, Qt, QPoint
 from PySide6.QtGui import QAction
 
 from .ui.yolo_agent_ui import Ui_Form
-from .utils import ShowResultsDialog, plot, put_status
+from .utils import (
+    ShowResultsDialog, InferenceConfigDialog, PipelineConfigDialog, plot, put_status,
+)
 from .worker import YoloWorker
+from .utils.backends import BACKENDS, PYTORCH, available_backends
 
 from .processors._thresh_Check import ThreshCheck
 
-from .processors.base import Processor, ConfigPanel, ProcessResult
-from .processors.color_check import ColorCheckProcessor
-from .processors.solder_check import SoilderCheckProcessor
+from .processors.base import Processor, ProcessResult
+from .processors.panel import ConfigPanel
+from .processors.pipeline import ProcessorPipeline
+from .processors.registry import create_processors
+from ..agent_camera.frame import Frame
+from ..utils.metrics import metrics
 
 
 class BaseYoloAgent(QWidget, Ui_Form):
@@ -36,20 +45,23 @@ class BaseYoloAgent(QWidget, Ui_Form):
     1. Nhận Frame từ camera.
     2. Kiểm tra điều kiện ánh sáng (ThreshCheck).
     3. Gửi Frame vào luồng Worker để nhận diện đối tượng bằng YOLO.
-    4. Nhận kết quả YOLO và đẩy qua bộ lọc Post-processor đang được chọn (Color, Solder...).
+    4. Nhận kết quả YOLO và đẩy qua bộ lọc Post-processor đang được chọn (Color, Solder...),
+       hoặc qua chuỗi processor đã cấu hình (một lần suy luận cho nhiều phép kiểm).
     5. Phát tín hiệu kết quả để hiển thị trên GUI hoặc điều khiển Robot/PLC.
 
     Attributes:
         processorChanged (Signal): Phát ra khi có sự thay đổi thông số trên giao diện
             (thường dùng để hiển thị dấu '*' báo hiệu chưa lưu).
-        frame_ready (Signal): Phát ra ảnh đã được vẽ kết quả nhận diện (annotated frame).
-        result_ready (Signal): Phát ra đối tượng ProcessResult chứa kết quả phân tích cuối cùng.
+        frame_ready (Signal): Phát ra `Frame` đã được vẽ kết quả nhận diện (annotated frame),
+            giữ nguyên seq / timestamp của frame gốc.
+        result_ready (Signal): Phát ra đối tượng ProcessResult chứa kết quả phân tích cuối cùng
+            (`seq` trỏ về frame đã sinh ra nó).
     """
 
     processorChanged = Signal(
         object
     )  # Phát ra khi UI của processor có thay đổi (hiển thị dấu * - chưa lưu)
-    frame_ready = Signal(np.ndarray)  # Frame đã (hoặc chưa) được vẽ kết quả
+    frame_ready = Signal(object)  # Frame đã (hoặc chưa) được vẽ kết quả
     result_ready = Signal(ProcessResult)
 
     def __init__(self, parent: QWidget | None = None) -> None:
@@ -66,6 +78,15 @@ class BaseYoloAgent(QWidget, Ui_Form):
         self.btnSelectModel.clicked.connect(self._select_model)
         self.btnSelectModel.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.btnSelectModel.customContextMenuRequested.connect(self._show_model_menu)
+        self._setup_batch_ui()
+        self._setup_backend_ui()
+
+        # Tiến trình nạp model (export / nạp / warm-up chạy nền)
+        self.progressModel = QProgressBar(self)
+        self.progressModel.setMaximumHeight(14)
+        self.progressModel.setTextVisible(True)
+        self.progressModel.hide()
+        self.gridLayout.addWidget(self.progressModel, 9, 0, 1, 2)
 
         # Start worker after event loop starts (prevents race at construction time)
         QTimer.singleShot(0, self._start)
@@ -93,9 +114,89 @@ class BaseYoloAgent(QWidget, Ui_Form):
         self.plot_config = ShowResultsDialog(self)
         self.bnResultShow.clicked.connect(self.plot_config.show)
 
-        # Initialize default processors
-        self.add_processor(ColorCheckProcessor())
-        self.add_processor(SoilderCheckProcessor())
+        # Initialize inference settings (imgsz, half, max_det, iou, classes, device, threads)
+        self.infer_config = InferenceConfigDialog(self)
+        self.bnInferConfig = QPushButton("Suy luận", self)
+        self.bnInferConfig.setStyleSheet(self.bnResultShow.styleSheet())
+        self.horizontalLayout.addWidget(self.bnInferConfig)
+        self.bnInferConfig.clicked.connect(self.infer_config.show)
+        self.infer_config.settings_changed.connect(self._on_inference_changed)
+
+        # Chuỗi post-processor dùng chung một kết quả YOLO (rỗng = chỉ processor đang chọn)
+        self._pipeline = ProcessorPipeline()
+        self.pipeline_config = PipelineConfigDialog(self)
+        self.bnPipeline = QPushButton("Chuỗi", self)
+        self.bnPipeline.setStyleSheet(self.bnResultShow.styleSheet())
+        self.horizontalLayout.addWidget(self.bnPipeline)
+        self.bnPipeline.clicked.connect(self.pipeline_config.show)
+        self.pipeline_config.settings_changed.connect(self._on_pipeline_changed)
+
+        # Processor tìm tự động (module trong processors/ + entry point); panel dựng khi chọn
+        for processor in create_processors():
+            self.add_processor(processor)
+
+    def _setup_batch_ui(self) -> None:
+        """Batch inference: gom tối đa B frame hoặc chờ tối đa T ms cho một lần predict."""
+        self.labelBatch = QLabel("Batch:", self)
+        self.spinBatch = QSpinBox(self)
+        self.spinBatch.setRange(1, 32)
+        self.spinBatch.setPrefix("B=")
+        self.spinBatchWait = QSpinBox(self)
+        self.spinBatchWait.setRange(0, 1000)
+        self.spinBatchWait.setPrefix("T=")
+        self.spinBatchWait.setSuffix(" ms")
+        self.spinBatchWait.setEnabled(False)
+        row = QHBoxLayout()
+        row.addWidget(self.spinBatch)
+        row.addWidget(self.spinBatchWait)
+        self.gridLayout.addWidget(self.labelBatch, 6, 0, 1, 1)
+        self.gridLayout.addLayout(row, 6, 1, 1, 1)
+        self.spinBatch.valueChanged.connect(self._on_batch_changed)
+        self.spinBatchWait.valueChanged.connect(self._on_batch_changed)
+
+    def _setup_backend_ui(self) -> None:
+        """Backend suy luận: PyTorch hoặc export (có cache) sang ONNX Runtime / OpenVINO."""
+        self.labelBackend = QLabel("Backend:", self)
+        self.comboBackend = QComboBox(self)
+        installed = available_backends()
+        for name in BACKENDS:
+            self.comboBackend.addItem(name, name)
+            if name not in installed:
+                # Chưa cài runtime: hiện nhưng không cho chọn
+                self.comboBackend.model().item(self.comboBackend.count() - 1).setEnabled(False)
+        self.labelBackendActive = QLabel(self)
+        row = QHBoxLayout()
+        row.addWidget(self.comboBackend, 1)
+        row.addWidget(self.labelBackendActive)
+        self.gridLayout.addWidget(self.labelBackend, 8, 0, 1, 1)
+        self.gridLayout.addLayout(row, 8, 1, 1, 1)
+        self.comboBackend.currentIndexChanged.connect(self._on_backend_changed)
+
+    @property
+    def _backend(self) -> str:
+        return self.comboBackend.currentData() or PYTORCH
+
+    def _on_backend_changed(self, *_) -> None:
+        # Nạp lại model hiện tại qua backend mới
+        if self._model_path:
+            self.__load_model(self._model_path)
+
+    def _on_inference_changed(self, options: dict[str, Any]) -> None:
+        if not self._worker_thread:
+            return
+        old_imgsz = self._worker_thread.imgsz
+        self._worker_thread.set_options(**options)
+        # Warm-up / artifact export gắn với imgsz -> nạp lại (có cache)
+        if self._model_path and options.get("imgsz") != old_imgsz:
+            self.__load_model(self._model_path)
+
+    def _on_pipeline_changed(self, cfg: dict[str, Any]) -> None:
+        self._pipeline = ProcessorPipeline.from_dict(cfg, self._processors())
+
+    def _on_batch_changed(self, *_) -> None:
+        self.spinBatchWait.setEnabled(self.spinBatch.value() > 1)
+        if self._worker_thread:
+            self._worker_thread.set_batch(self.spinBatch.value(), self.spinBatchWait.value())
 
     # ----------------------------- Properties -----------------------------
     @property
@@ -106,6 +207,9 @@ class BaseYoloAgent(QWidget, Ui_Form):
     def _model_conf(self, value: int):
         self.spinConf.setValue(value)
 
+    def _processors(self) -> list[Processor]:
+        return [self.comboMode.itemData(i) for i in range(self.comboMode.count())]
+
     @property
     def _active_proc(self) -> Processor:
         proc = self.comboMode.currentData()
@@ -116,7 +220,11 @@ class BaseYoloAgent(QWidget, Ui_Form):
         if self.comboMode.count() <= 0:
             return
         self.comboMode.setCurrentIndex(index)
-        self.stackPanel.setCurrentIndex(index)
+        # Panel chỉ được dựng lần đầu processor được chọn
+        panel = self.comboMode.itemData(self.comboMode.currentIndex()).panel
+        if self.stackPanel.indexOf(panel) < 0:
+            self.stackPanel.addWidget(panel)
+        self.stackPanel.setCurrentWidget(panel)
 
     # ----------------------------- Qt Events -----------------------------
 
@@ -129,20 +237,28 @@ class BaseYoloAgent(QWidget, Ui_Form):
 
     # ----------------------------- Public API -----------------------------
 
-    def on_frame_ready(self, frame: np.ndarray) -> None:
+    def on_frame_ready(self, frame: Frame | np.ndarray) -> None:
         """Điểm nhập cho khung hình vào pipeline (ví dụ: từ camera).
 
         Nếu có worker đang xử lý thì gửi khung cho worker; nếu không sẽ phát khung thô ra ngoài.
         """
-        result = self.thresh_config.run(frame)
+        frame = Frame.wrap(frame)
+        if frame is None:
+            return
+        img = frame.data
+        with metrics.timer("detect.thresh"):
+            result = self.thresh_config.run(img)
         if not result:
+            # Frame có thể là view read-only (mượn từ SHM) -> copy trước khi vẽ
             f = put_status(
-                frame,
+                img if img.flags.writeable else img.copy(),
                 f"Không phát hiện. Độ sáng trung bình: {self.thresh_config._avg_brightness}",
                 1.2,
             )
-            result = ProcessResult(status="N/A", yolo_results=[])
-            self.frame_ready.emit(f)
+            result = ProcessResult(
+                status="N/A", yolo_results=[], seq=frame.seq, timestamp=frame.timestamp
+            )
+            self.frame_ready.emit(frame.replace(f))
             self.result_ready.emit(result)
             return
 
@@ -153,22 +269,30 @@ class BaseYoloAgent(QWidget, Ui_Form):
 
     # ----------------------------- Worker Hooks ---------------------------
 
-    def _on_yolo_result(self, results: list[Results]) -> None:
+    def _on_yolo_result(self, source: Frame, results: list[Results]) -> None:
         """
-        Receive YOLO results and pass through the current processor.
+        Receive YOLO results and pass through the processor chain (or the current processor).
         """
-        if self._active_proc is None:
+        runner = self._pipeline or self._active_proc
+        if runner is None:
             return
         try:
-            frame = plot(results[0], **self.plot_config.to_dict())
+            with metrics.timer("detect.plot"):
+                frame = plot(results[0], **self.plot_config.to_dict())
 
-            output = self._active_proc.process(results)
+            with metrics.timer("detect.process"):
+                output = runner.process(results)
+            output.seq = source.seq
+            output.timestamp = source.timestamp
 
-            frame = put_status(frame, output.status, 1.2)
+            with metrics.timer("detect.overlay"):
+                frame = put_status(frame, output.status, 1.2)
+            metrics.record("pipeline.capture_to_result", output.latency_ms)
 
-            self.frame_ready.emit(frame)
+            self.frame_ready.emit(source.replace(frame))
             self.result_ready.emit(output)
         except Exception as e:
+            metrics.count("detect.errors")
             print("\rLỗi xử lý processor:", e, end="", flush=True)
 
     def _show_model_menu(self, pos: QPoint) -> None:
@@ -208,8 +332,23 @@ class BaseYoloAgent(QWidget, Ui_Form):
         self._worker_thread.result_ready.connect(
             self._on_yolo_result, Qt.ConnectionType.QueuedConnection
         )
+        self._worker_thread.load_progress.connect(
+            self._on_load_progress, Qt.ConnectionType.QueuedConnection
+        )
+        self._worker_thread.model_loaded.connect(
+            self._on_model_loaded, Qt.ConnectionType.QueuedConnection
+        )
+        self._worker_thread.load_failed.connect(
+            self._on_load_failed, Qt.ConnectionType.QueuedConnection
+        )
+        self._on_batch_changed()
+        self._worker_thread.set_options(**self.infer_config.to_dict())
         self._worker_thread.start()
 
+        # Model đã chọn trước khi worker được tạo (load_settings lúc khởi động)
+        if self._model_path:
+            self.__load_model(self._model_path)
+
         # Confidence spin box (0-100 UI → 0.0-1.0 model)
         if hasattr(self, "spinConf"):
             self.spinConf.valueChanged.connect(
@@ -246,21 +385,41 @@ class BaseYoloAgent(QWidget, Ui_Form):
         Let the user pick a .pt file and set it on the worker.
         """
         f, _ = QFileDialog.getOpenFileName(
-            self, "Chọn model file", "", "Model Files (*.pt)"
+            self, "Chọn model file", "", "Model Files (*.pt *.onnx)"
         )
         self.__load_model(f)
 
     def __load_model(self, f: str | Path | None) -> None:
-        if f and self._worker_thread:
-            self._model_path = Path(f).as_posix()
-            m = self._worker_thread.set_model(Path(f))
-            self._model_name = m.names
-            if self._active_proc and hasattr(self._active_proc, "panel"):
-                self._active_proc.panel.set_class_names(self._model_name)
-            try:
-                self.btnSelectModel.setText(Path(f).name)
-            except Exception:
-                pass
+        """Yêu cầu nạp model trên luồng nền; UI cập nhật trong `_on_model_loaded`."""
+        if not f:
+            return
+        self._model_path = Path(f).as_posix()
+        if not self._worker_thread:
+            # Worker chưa chạy: `_start` sẽ nạp
+            return
+        self.progressModel.setValue(0)
+        self.progressModel.show()
+        self._worker_thread.load_model_async(Path(f), self._backend)
+
+    def _on_load_progress(self, pct: int, msg: str) -> None:
+        self.progressModel.setValue(pct)
+        self.progressModel.setFormat(f"{msg} (%p%)")
+
+    def _on_model_loaded(self, m) -> None:
+        self.progressModel.hide()
+        self._model_name = m.names
+        self.labelBackendActive.setText(f"▶ {self._worker_thread.backend}")
+        if self._active_proc and hasattr(self._active_proc, "panel"):
+            self._active_proc.panel.set_class_names(self._model_name)
+        try:
+            self.btnSelectModel.setText(Path(self._model_path).name)
+        except Exception:
+            pass
+
+    def _on_load_failed(self, msg: str) -> None:
+        self.progressModel.hide()
+        print(f"❌ Lỗi nạp model: {msg}")
+        self.btnSelectModel.setText("Chọn mô hình")
 
     def __clear_model(self) -> None:
         """Xoá model đang chạy khỏi worker và reset UI."""
@@ -268,6 +427,8 @@ class BaseYoloAgent(QWidget, Ui_Form):
         # gọi slot clear_model trong worker thread bằng QueuedConnection
         if self._worker_thread:
             self._worker_thread.clear_model()
+        self.labelBackendActive.setText("")
+        self.progressModel.hide()
         # Cập nhật nút hiển thị tên file
         if hasattr(self, "btnSelectModel"):
             try:
@@ -277,10 +438,10 @@ class BaseYoloAgent(QWidget, Ui_Form):
 
     def add_processor(self, processor: Processor) -> None:
         """
-        Register a processor and its config panel into the UI.
+        Register a processor into the UI (its config panel is attached when first selected).
         """
         self.comboMode.addItem(processor.name, processor)
-        self.stackPanel.addWidget(processor.panel)  # Attach the processor's panel
+        self.pipeline_config.set_processors([p.name for p in self._processors()])
 
     def _sêlect_processor(self, index: int) -> None:
         self._active_proc = index
@@ -343,7 +504,8 @@ class BaseYoloAgent(QWidget, Ui_Form):
           - đường dẫn model (nếu có)
           - độ tự tin conf (0..1)
           - processor đang chọn
-          - cấu hình panel hiện tại (nếu có)
+          - cấu hình panel hiện tại (nếu có) và panel của mọi processor (cho chuỗi)
+          - chuỗi processor + luật gộp
         """
         panel_cfg: dict[str, Any] = {}
         if self._active_proc and isinstance(self._active_proc.panel, ConfigPanel):
@@ -355,24 +517,60 @@ class BaseYoloAgent(QWidget, Ui_Form):
         data: dict[str, Any] = {
             "model_path": self._model_path,
             "model_conf": self._model_conf,
+            "backend": self._backend,
             "active_index": self.comboMode.currentIndex(),
             "active_name": self._active_proc.name if self._active_proc else None,
             "panel": panel_cfg,
+            "panels": self._dump_panels(),
+            "pipeline": self.pipeline_config.to_dict(),
             "thresh_config": self.thresh_config.to_dict(),
             "plot_config": self.plot_config.to_dict(),
+            "inference": self.infer_config.to_dict(),
+            "batch": {
+                "size": self.spinBatch.value(),
+                "wait_ms": self.spinBatchWait.value(),
+            },
         }
         return data
 
+    def _dump_panels(self) -> dict[str, Any]:
+        panels: dict[str, Any] = {}
+        for proc in self._processors():
+            try:
+                panels[proc.name] = proc.dump_settings()
+            except Exception:
+                pass
+        return panels
+
     def load_settings(self, settings: dict[str, Any]):
         if not settings:
             return
+        idx = self.comboBackend.findData(settings.get("backend", PYTORCH))
+        self.comboBackend.blockSignals(True)
+        self.comboBackend.setCurrentIndex(max(idx, 0))
+        self.comboBackend.blockSignals(False)
+        # Tham số suy luận trước khi nạp model (warm-up / export theo imgsz)
+        self.infer_config.from_dict(settings.get("inference", {}))
+        if self._worker_thread:
+            self._worker_thread.set_options(**self.infer_config.to_dict())
         self.__load_model(settings.get("model_path"))
         self._model_conf = settings.get("model_conf", 50)
+        # Cấu hình riêng của từng processor (chuỗi chạy cả processor không được chọn)
+        panels = settings.get("panels", {})
+        for proc in self._processors():
+            if proc.name in panels:
+                proc.load_settings(panels[proc.name])
+                proc.configure(panels[proc.name])
         self._active_proc = settings.get("active_index", 0)
         self._active_proc.load_settings(settings.get("panel", {}))
 
         self.plot_config.from_dict(settings.get("plot_config", {}))
         self.thresh_config.from_dict(settings.get("thresh_config", {}))
+        batch = settings.get("batch", {})
+        self.spinBatch.setValue(int(batch.get("size", 1)))
+        self.spinBatchWait.setValue(int(batch.get("wait_ms", 0)))
+        self.pipeline_config.from_dict(settings.get("pipeline", {}))
+        self._on_pipeline_changed(self.pipeline_config.to_dict())
 
         # if "processor_index" in settings:
         #     self._switch_processor(settings["processor_index"])
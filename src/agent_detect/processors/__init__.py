@@ -1,5 +1,19 @@
-from .base import ProcessResult
+from .base import ProcessResult, Processor
 from .color_check import ColorCheckProcessor
+from .solder_check import SoilderCheckProcessor
+from .registry import ENTRY_POINT_GROUP, discover_processors, create_processors
 
 
-__all__ = ['ProcessResult', 'ColorCheckProcessor']
\ No newline at end of file
+def __getattr__(name):
+    # ProcessorPipeline kéo theo src.utils (Qt) -> chỉ import khi cần
+    if name == "ProcessorPipeline":
+        from .pipeline import ProcessorPipeline
+
+        return ProcessorPipeline
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    'ProcessResult', 'Processor', 'ColorCheckProcessor', 'SoilderCheckProcessor',
+    'ProcessorPipeline', 'ENTRY_POINT_GROUP', 'discover_processors', 'create_processors',
+]
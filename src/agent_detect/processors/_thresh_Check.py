@@ -67,31 +67,45 @@ class ThreshCheck:
 
         self._frame = frame
 
-        cfg = self._panel.to_dict()
+        ok, avg = self.evaluate(frame, self._panel.to_dict())
+        if avg is not None:
+            self._avg_brightness = avg
+        return ok
+
+    @staticmethod
+    def evaluate(frame: np.ndarray, cfg: dict) -> tuple[bool, int | None]:
+        """
+        Kiểm tra độ sáng theo cấu hình `cfg` (dạng `to_dict()`), không cần panel.
+        Trả về (đạt ngưỡng, độ sáng trung bình hoặc None nếu ảnh/ROI lỗi).
+        """
+        if frame is None or frame.size == 0:
+            return False, None
+
         is_roi = cfg.get("is_roi", True)
         if is_roi:
             roi = cfg.get("roi", [0.0, 0.0, 0.0, 0.0])
-            f = self._crop_roi_pct(frame, roi)
+            f = ThreshCheck._crop_roi_pct(frame, roi)
         else:
             f = frame
 
         if f is None or f.size == 0:
-            return False
+            return False, None
 
-        self._avg_brightness = self._calc_avg_brightness(f)
-        if self._avg_brightness is None:
-            return False
+        avg = ThreshCheck._avg_brightness_of(f)
+        if avg is None:
+            return False, None
 
         thresh = cfg.get("bright_thresh", 0)
         is_brighter = cfg.get("is_brighter", False)
-        if is_brighter and self._avg_brightness < thresh:
-            return False
-        elif not is_brighter and self._avg_brightness > thresh:
-            return False
+        if is_brighter and avg < thresh:
+            return False, avg
+        elif not is_brighter and avg > thresh:
+            return False, avg
         else:
-            return True
+            return True, avg
 
-    def _crop_roi_pct(self, gray: np.ndarray, roi: list[float]) -> Optional[np.ndarray]:
+    @staticmethod
+    def _crop_roi_pct(gray: np.ndarray, roi: list[float]) -> Optional[np.ndarray]:
         """
         Crop theo phần trăm ROI trên ảnh `gray` (ndarray 2D hoặc 3D).
         Đảm bảo x2 > x1, y2 > y1 và nằm trong biên ảnh.
@@ -122,10 +136,11 @@ class ThreshCheck:
         """
         if frame is None:
             frame = self._frame
-        if frame is None or frame.size == 0:
-            return None
+        return self._avg_brightness_of(frame)
 
-        img = frame
+    @staticmethod
+    def _avg_brightness_of(img: np.ndarray | None) -> int | None:
+        """Độ sáng trung bình (0..255) của ảnh BGR/gray, None nếu ảnh rỗng."""
         if img is None or img.size == 0:
             return None
 
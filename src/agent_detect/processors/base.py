@@ -1,20 +1,41 @@
 # processors/base.py
 from __future__ import annotations
-from typing import Any, Protocol, ClassVar
-from dataclasses import dataclass
-from ultralytics.engine.results import Results
-from PySide6.QtWidgets import QWidget
-from PySide6.QtCore import Signal
+import time
+from typing import TYPE_CHECKING, Any, Protocol
+from dataclasses import dataclass, field
+
+# Module không import Qt: processor (logic kiểm) dùng được khi chạy headless / test;
+# panel Qt nằm ở module riêng và chỉ được import khi dựng giao diện.
+if TYPE_CHECKING:
+    from ultralytics.engine.results import Results
+    from .panel import ConfigPanel
 
 
 @dataclass
 class ProcessResult:
     status: str
     yolo_results: list[Results]
+    # Frame đã sinh ra kết quả (điền bởi BaseYoloAgent): seq + time.monotonic() lúc chụp
+    seq: int = -1
+    timestamp: float | None = None
+    # Chuỗi processor: {tên processor: {"status", "ms"}} của từng bước
+    details: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def latency_ms(self) -> float | None:
+        """Độ trễ từ lúc chụp tới hiện tại (ms), None nếu không rõ thời điểm chụp."""
+        if self.timestamp is None:
+            return None
+        return (time.monotonic() - self.timestamp) * 1000.0
 
 
 class Processor(Protocol):
-    """Giao diện plugin hậu xử lý."""
+    """
+    Giao diện plugin hậu xử lý. Được tìm tự động bởi `registry.discover_processors`;
+    `panel` nên dựng lười (property tạo widget ở lần truy cập đầu, khi được chọn trên GUI)
+    để chạy headless không import Qt; trước khi có panel, dump/load_settings dùng
+    `settings` của processor.
+    """
 
     name: str
     panel: ConfigPanel
@@ -28,11 +49,10 @@ class Processor(Protocol):
     # Khuyến nghị: trả {"result": "OK/NG/ERR/N/A", "meta": {...}}
 
 
-class ConfigPanel(QWidget):
-    """Panel cấu hình cho một processor."""
-
-    configChanged: ClassVar[Signal]
+def __getattr__(name: str) -> Any:
+    # Tương thích ngược: `from .base import ConfigPanel` (import Qt khi thật sự cần)
+    if name == "ConfigPanel":
+        from .panel import ConfigPanel
 
-    def set_class_names(self, class_names: dict[int, str]) -> None: ...
-    def load_settings(self, s: dict[str, Any]) -> None: ...
-    def dump_settings(self) -> dict[str, Any]: ...
+        return ConfigPanel
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
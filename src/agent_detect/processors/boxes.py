@@ -0,0 +1,50 @@
+"""
+Tiện ích vector hoá cho post-processor trên kết quả YOLO.
+
+Mỗi `Results` chỉ chuyển box về CPU đúng một lần (`boxes.data.cpu().numpy()`), sau đó
+đếm / sắp xếp bằng numpy (`np.bincount`, `np.argsort`) thay vì lặp từng phần tử tensor
+và gọi `.item()` (mỗi lần là một vòng tensor -> Python). Không import Qt / ultralytics.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from ultralytics.engine.results import Results
+
+# Cột của boxes.data: x1, y1, x2, y2, [track_id,] conf, cls (cls luôn là cột cuối)
+X1, Y1, X2, Y2 = 0, 1, 2, 3
+CONF, CLS = -2, -1
+
+
+def boxes_array(result: Results) -> np.ndarray | None:
+    """Ma trận (N, 6|7) của box trên CPU; None nếu kết quả không có `boxes`."""
+    boxes = getattr(result, "boxes", None)
+    if boxes is None:
+        return None
+    data = boxes.data
+    if hasattr(data, "cpu"):
+        data = data.cpu().numpy()
+    return np.asarray(data)
+
+
+def class_ids(arr: np.ndarray) -> np.ndarray:
+    """Class id (int64) của từng box."""
+    return arr[:, CLS].astype(np.int64)
+
+
+def count_classes(results: Iterable[Results], minlength: int = 0) -> np.ndarray:
+    """Số box theo class id (chỉ số = class id), gộp trên mọi `Results`."""
+    ids = [class_ids(a) for a in map(boxes_array, results) if a is not None and len(a)]
+    if not ids:
+        return np.zeros(minlength, np.int64)
+    return np.bincount(np.concatenate(ids), minlength=minlength)
+
+
+def classes_sorted_by(arr: np.ndarray, axis: int = X1) -> np.ndarray:
+    """Class id sắp theo toạ độ cột `axis` (ổn định: box cùng toạ độ giữ thứ tự gốc)."""
+    order = np.argsort(arr[:, axis], kind="stable")
+    return class_ids(arr)[order]
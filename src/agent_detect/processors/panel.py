@@ -0,0 +1,15 @@
+# processors/panel.py
+from __future__ import annotations
+from typing import Any, ClassVar
+from PySide6.QtWidgets import QWidget
+from PySide6.QtCore import Signal
+
+
+class ConfigPanel(QWidget):
+    """Panel cấu hình cho một processor."""
+
+    configChanged: ClassVar[Signal]
+
+    def set_class_names(self, class_names: dict[int, str]) -> None: ...
+    def load_settings(self, s: dict[str, Any]) -> None: ...
+    def dump_settings(self) -> dict[str, Any]: ...
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Sequence
+
+from .base import Processor, ProcessResult
+from ...utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from ultralytics.engine.results import Results
+
+# Luật gộp trạng thái của chuỗi processor
+RULE_ALL_OK = "all_ok"  # OK khi mọi bước OK
+RULE_ANY_NG = "any_ng"  # NG khi có bước NG; bước ERR/N/A bỏ qua
+RULE_WEIGHTED = "weighted"  # tổng trọng số bước OK / tổng trọng số >= ngưỡng
+RULES = (RULE_ALL_OK, RULE_ANY_NG, RULE_WEIGHTED)
+
+DEFAULT_PIPELINE: dict[str, Any] = {
+    "rule": RULE_ALL_OK,
+    "threshold": 0.5,
+    # [{"name", "enabled", "weight"}]; rỗng = chỉ chạy processor đang chọn
+    "steps": [],
+}
+
+
+@dataclass
+class PipelineStep:
+    processor: Processor
+    weight: float = 1.0
+
+
+def combine(statuses: Sequence[str], weights: Sequence[float], rule: str,
+            threshold: float = 0.5) -> str:
+    """Gộp trạng thái các bước thành một trạng thái OK / NG / ERR."""
+    if not statuses:
+        return "ERR"
+    if rule == RULE_ANY_NG:
+        if "NG" in statuses:
+            return "NG"
+        return "OK" if "OK" in statuses else "ERR"
+    if rule == RULE_WEIGHTED:
+        total = sum(weights)
+        if total <= 0:
+            return "ERR"
+        score = sum(w for s, w in zip(statuses, weights) if s == "OK") / total
+        return "OK" if score >= threshold else "NG"
+    # RULE_ALL_OK
+    if all(s == "OK" for s in statuses):
+        return "OK"
+    return "NG" if "NG" in statuses else "ERR"
+
+
+class ProcessorPipeline:
+    """
+    Chuỗi post-processor cùng dùng một kết quả YOLO: mỗi processor chạy một lần trên
+    `yolo_results`, có thời gian riêng (`detect.process.<Lớp>`), rồi gộp trạng thái theo
+    `rule`. Trạng thái + thời gian từng bước nằm trong `ProcessResult.details`.
+    """
+
+    def __init__(self, steps: Sequence[PipelineStep] = (), rule: str = RULE_ALL_OK,
+                 threshold: float = 0.5) -> None:
+        self.steps = list(steps)
+        self.rule = rule if rule in RULES else RULE_ALL_OK
+        self.threshold = float(threshold)
+
+    def __bool__(self) -> bool:
+        return bool(self.steps)
+
+    @classmethod
+    def from_dict(cls, cfg: dict[str, Any] | None,
+                  processors: Sequence[Processor]) -> ProcessorPipeline:
+        """Dựng chuỗi từ cấu hình đã lưu; bước trỏ tới processor không còn thì bỏ qua."""
+        cfg = {**DEFAULT_PIPELINE, **(cfg or {})}
+        by_name = {p.name: p for p in processors}
+        steps = [
+            PipelineStep(by_name[s["name"]], float(s.get("weight", 1.0)))
+            for s in cfg["steps"]
+            if s.get("enabled", True) and s.get("name") in by_name
+        ]
+        return cls(steps, cfg["rule"], cfg["threshold"])
+
+    def process(self, yolo_results: list[Results]) -> ProcessResult:
+        statuses, details = [], {}
+        for step in self.steps:
+            proc = step.processor
+            t0 = time.perf_counter()
+            try:
+                status = proc.process(yolo_results).status
+            except Exception as e:
+                print(f"\rLỗi processor {proc.name}: {e}", end="", flush=True)
+                status = "ERR"
+            ms = (time.perf_counter() - t0) * 1000.0
+            metrics.record(f"detect.process.{type(proc).__name__}", ms)
+            statuses.append(status)
+            details[proc.name] = {"status": status, "ms": round(ms, 3)}
+
+        status = combine(statuses, [s.weight for s in self.steps], self.rule, self.threshold)
+        return ProcessResult(status=status, yolo_results=yolo_results, details=details)
@@ -0,0 +1,99 @@
+"""
+Tìm các Processor hậu xử lý.
+
+Nguồn:
+  - Module trong package `src.agent_detect.processors` (bỏ module `_riêng`, `base`,
+    `boxes`, `panel`, `pipeline`, `registry` và `*_panel`): mọi lớp kế thừa `Processor` định nghĩa
+    trong module.
+  - Entry point nhóm `agent_detect.processors` của package bên thứ ba, vd trong
+    pyproject.toml:
+
+        [project.entry-points."agent_detect.processors"]
+        pin_check = "my_checks.pin:PinCheckProcessor"
+
+Import processor không kéo theo Qt (panel nằm ở module riêng, import khi dựng giao diện).
+"""
+
+from __future__ import annotations
+
+import importlib
+import inspect
+import pkgutil
+from importlib.metadata import entry_points
+from pathlib import Path
+
+from .base import Processor
+
+ENTRY_POINT_GROUP = "agent_detect.processors"
+
+_SKIP_MODULES = {"base", "boxes", "panel", "pipeline", "registry"}
+
+
+def _is_processor(obj, module: str) -> bool:
+    return (
+        inspect.isclass(obj)
+        and obj is not Processor
+        and Processor in obj.__mro__
+        and obj.__module__ == module
+    )
+
+
+def _builtin_processors() -> list[type[Processor]]:
+    found = []
+    package_dir = str(Path(__file__).parent)
+    for info in sorted(pkgutil.iter_modules([package_dir]), key=lambda m: m.name):
+        name = info.name
+        if name.startswith("_") or name in _SKIP_MODULES or name.endswith("_panel"):
+            continue
+        module_name = f"{__package__}.{name}"
+        try:
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            print(f"[Detect] Bỏ qua module processor {name}: {e}")
+            continue
+        found += [obj for _, obj in inspect.getmembers(module)
+                  if _is_processor(obj, module_name)]
+    return found
+
+
+def _entry_point_processors() -> list[type[Processor]]:
+    found = []
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            obj = ep.load()
+        except Exception as e:
+            print(f"[Detect] Không nạp được processor '{ep.name}' ({ep.value}): {e}")
+            continue
+        # Plugin không bắt buộc kế thừa Processor (Protocol): chỉ cần name + process()
+        if inspect.isclass(obj) and isinstance(getattr(obj, "name", None), str) \
+                and callable(getattr(obj, "process", None)):
+            found.append(obj)
+        else:
+            print(f"[Detect] Entry point '{ep.name}' không phải Processor, bỏ qua")
+    return found
+
+
+def discover_processors() -> list[type[Processor]]:
+    """
+    Các lớp Processor tìm được: module nội bộ theo tên module (giữ thứ tự comboMode đã
+    lưu: color_check, solder_check, ...) rồi tới plugin entry point. Trùng `name` thì
+    lấy lớp tìm thấy trước.
+    """
+    classes, names = [], set()
+    for cls in _builtin_processors() + _entry_point_processors():
+        if cls.name in names:
+            continue
+        names.add(cls.name)
+        classes.append(cls)
+    return classes
+
+
+def create_processors() -> list[Processor]:
+    """Khởi tạo mỗi Processor tìm được một lần (chưa dựng panel)."""
+    procs = []
+    for cls in discover_processors():
+        try:
+            procs.append(cls())
+        except Exception as e:
+            print(f"[Detect] Không khởi tạo được {cls.__name__}: {e}")
+    return procs
@@ -1,23 +1,13 @@
-from typing import Any
-from PySide6.QtWidgets import QVBoxLayout
-from ultralytics.engine.results import Results
+from __future__ import annotations
 
-from .base import Processor, ConfigPanel, ProcessResult
+from typing import TYPE_CHECKING, Any
 
-from PySide6.QtCore import Signal
-from PySide6.QtWidgets import (
-    QTableWidgetItem,
-    QTableWidget,
-    QInputDialog,
-    QMessageBox,
-    QHeaderView,
-    QHBoxLayout,
-    QPushButton,
-    QCheckBox,
-    QSpinBox,
-    QWidget,
-)
-from PySide6.QtCore import Qt
+from .base import Processor, ProcessResult
+from .boxes import count_classes
+
+if TYPE_CHECKING:  # Không import Qt / ultralytics khi chỉ cần logic kiểm
+    from ultralytics.engine.results import Results
+    from .solder_check_panel import SoilderCheckConfigPanel
 
 
 def compare_object_counts(
@@ -33,17 +23,9 @@ def compare_object_counts(
     Trả về:
         Dict[class_id -> {'required', 'detected', 'match', 'difference'}]
     """
-    detected_counts = {cid: 0 for cid in required_counts}
-
-    for result in results:
-        boxes = getattr(result, "boxes", None)
-        if boxes is None:
-            continue
-        # Ultralytics: boxes.cls là vector class id
-        for cls_val in boxes.cls:
-            class_id = int(getattr(cls_val, "item", lambda: cls_val)())
-            if class_id in required_counts:
-                detected_counts[class_id] += 1
+    # Một lần chuyển box về CPU cho mỗi Results, đếm bằng np.bincount
+    counts = count_classes(results, minlength=max(required_counts, default=-1) + 1)
+    detected_counts = {cid: int(counts[cid]) if cid >= 0 else 0 for cid in required_counts}
 
     return {
         cid: {
@@ -63,7 +45,17 @@ class SoilderCheckProcessor(Processor):
 
     def __init__(self):
         self.settings: dict[str, Any] = {}
-        self.panel = SoilderCheckConfigPanel()
+        self._panel: SoilderCheckConfigPanel | None = None
+
+    @property
+    def panel(self) -> SoilderCheckConfigPanel:
+        if self._panel is None:
+            from .solder_check_panel import SoilderCheckConfigPanel
+
+            self._panel = SoilderCheckConfigPanel()
+            if self.settings:
+                self._panel.load_settings(self.settings)
+        return self._panel
 
     def configure(self, settings: dict[str, Any]) -> None:
         self.settings = settings or {}
@@ -72,10 +64,16 @@ class SoilderCheckProcessor(Processor):
         self.settings.clear()
 
     def dump_settings(self) -> dict[str, Any]:
-        return self.panel.dump_settings()
+        if self._panel is None:
+            return dict(self.settings)
+        return self._panel.dump_settings()
 
     def load_settings(self, s: dict[str, Any]) -> None:
-        self.panel.load_settings(s)
+        if self._panel is None:
+            # Panel chưa dựng: giữ làm cấu hình, nạp vào panel khi được tạo
+            self.settings = dict(s or {})
+            return
+        self._panel.load_settings(s)
 
     def process(self, yolo_results: list[Results]) -> ProcessResult:
         if not yolo_results:
@@ -97,183 +95,3 @@ class SoilderCheckProcessor(Processor):
         comparison = compare_object_counts(yolo_results, required_counts)
         status = "OK" if all(v["match"] for v in comparison.values()) else "NG"
         return ProcessResult(status=status, yolo_results=yolo_results)
-
-
-TEST_SOLDER = {1: "Loại 1", 2: "Loại 2", 3: "Loại 3"}
-
-
-class SoilderCheckConfigPanel(ConfigPanel):
-    configChanged = Signal()
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self._solder: dict[int, str] = TEST_SOLDER  # id -> tên
-        self._setup_ui()
-
-    def _setup_ui(self):
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-
-        self._table_widget = QTableWidget(self)
-        self._table_widget.setColumnCount(3)
-        self._table_widget.setHorizontalHeaderLabels(["Loại", "Số lượng", "Chọn"])
-        self._table_widget.cellDoubleClicked.connect(self._on_cell_double_clicked)
-
-        header = self._table_widget.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
-        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Fixed)
-        header.setSectionResizeMode(2, QHeaderView.ResizeMode.Fixed)
-        self._table_widget.setColumnWidth(1, 80)
-        self._table_widget.setColumnWidth(2, 40)
-        self._table_widget.setHorizontalScrollBarPolicy(
-            Qt.ScrollBarPolicy.ScrollBarAsNeeded
-        )
-        self._table_widget.setVerticalScrollBarPolicy(
-            Qt.ScrollBarPolicy.ScrollBarAsNeeded
-        )
-        self._table_widget.setMinimumSize(200, 100)
-
-        button_layout = QHBoxLayout()
-        add_button = QPushButton("Thêm")
-        add_button.clicked.connect(self._show_add_dialog)
-
-        delete_button = QPushButton("Xóa")
-        delete_button.clicked.connect(self._delete_selected_rows)
-        delete_button.setStyleSheet(
-            "QPushButton {background-color: #e74c3c;color: white;border: none;}"
-            "QPushButton:hover {background-color: #c0392b;}"
-            "QPushButton:pressed {background-color: #a93226;}"
-        )
-        button_layout.addWidget(add_button)
-        button_layout.addWidget(delete_button)
-
-        layout.addWidget(self._table_widget)
-        layout.addLayout(button_layout)
-
-    # --- Dialog thêm một dòng: chọn theo tên, map ngược -> id
-    def _show_add_dialog(self):
-        if not self._solder:
-            QMessageBox.warning(self, "Cảnh báo", "Danh sách mối hàn trống!")
-            return
-
-        names = list(self._solder.values())
-        name, ok = QInputDialog.getItem(
-            self, "Chọn loại", "Chọn một loại:", names, 0, False
-        )
-        if ok and name:
-            cid = next((k for k, v in self._solder.items() if v == name), None)
-            if cid is not None:
-                self._add_row(cid, 0)
-
-    # --- Thêm một dòng theo ID + số lượng
-    def _add_row(self, cid: int, quantity: int) -> None:
-        if cid is None or cid not in self._solder:
-            return
-
-        row = self._table_widget.rowCount()
-        self._table_widget.insertRow(row)
-
-        # Cột tên (hiển thị tên, lưu ID ở UserRole)
-        name = self._solder[cid]
-        item = QTableWidgetItem(name)
-        item.setData(Qt.ItemDataRole.UserRole, cid)
-        item.setFlags(Qt.ItemFlag.ItemIsEnabled)
-        self._table_widget.setItem(row, 0, item)
-
-        # Cột số lượng (QSpinBox)
-        container_qty = QWidget()
-        spinbox = QSpinBox()
-        spinbox.setRange(0, 100)
-        spinbox.setValue(int(quantity))
-        spinbox.setStyleSheet(
-            "QSpinBox::up-button, QSpinBox::down-button { width: 0; }"
-        )
-        spinbox.valueChanged.connect(lambda _v: self.configChanged.emit())
-        lay_qty = QHBoxLayout(container_qty)
-        lay_qty.setContentsMargins(0, 0, 0, 0)
-        lay_qty.addWidget(spinbox)
-        self._table_widget.setCellWidget(row, 1, container_qty)
-
-        # Cột chọn (checkbox)
-        container_chk = QWidget()
-        checkbox = QCheckBox()
-        lay_chk = QHBoxLayout(container_chk)
-        lay_chk.setContentsMargins(0, 0, 0, 0)
-        lay_chk.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        lay_chk.addWidget(checkbox)
-        self._table_widget.setCellWidget(row, 2, container_chk)
-
-        self.configChanged.emit()
-
-    # --- Đổi loại (chỉ đổi tên hiển thị, không đổi ID)
-    def _on_cell_double_clicked(self, row: int, column: int) -> None:
-        if column != 0:
-            return
-        item = self._table_widget.item(row, 0)
-        if not item:
-            return
-        names = list(self._solder.values())
-        new_name, ok = QInputDialog.getItem(
-            self, "Đổi loại", "Tên mới:", names, 0, False
-        )
-        if not ok:
-            return
-        item.setText(new_name)
-        self.configChanged.emit()
-
-    def _delete_selected_rows(self):
-        rows_to_delete = []
-        for row in range(self._table_widget.rowCount()):
-            container = self._table_widget.cellWidget(row, 2)
-            checkbox = container.findChild(QCheckBox) if container else None
-            if checkbox and checkbox.isChecked():
-                rows_to_delete.append(row)
-
-        if not rows_to_delete:
-            QMessageBox.information(
-                self, "Thông báo", "Không có hàng nào được chọn để xóa!"
-            )
-            return
-
-        for row in reversed(rows_to_delete):
-            self._table_widget.removeRow(row)
-
-        self.configChanged.emit()
-
-    # --- Nhận mapping id->name mới
-    def set_class_names(self, class_names: dict[int, str]) -> None:
-        if not class_names:
-            return
-        self._solder = class_names
-        for r in range(self._table_widget.rowCount()):
-            item = self._table_widget.item(r, 0)
-            if not item:
-                continue
-            cid = int(item.data(Qt.ItemDataRole.UserRole))
-            if cid is not None:
-                item.setText(class_names[cid])
-
-    # --- Load/Save
-    def load_settings(self, s: dict[str, Any]) -> None:
-        # name: mapping id->name
-        self._solder = s.get("name", TEST_SOLDER)
-        solders = s.get("solders", [])
-        qtys = s.get("quantity", [])
-        for cid, q in zip(solders, qtys):
-            self._add_row(int(cid), int(q) or 0)
-
-    def dump_settings(self) -> dict[str, Any]:
-        settings = {"name": self._solder, "solders": [], "quantity": []}
-        for row in range(self._table_widget.rowCount()):
-            item = self._table_widget.item(row, 0)
-            cid = int(item.data(Qt.ItemDataRole.UserRole)) if item else None
-
-            qty_container = self._table_widget.cellWidget(row, 1)
-            spinbox = qty_container.findChild(QSpinBox) if qty_container else None
-            qv = int(spinbox.value()) if spinbox else 0
-
-            if cid is not None:
-                settings["solders"].append(cid)
-                settings["quantity"].append(qv)
-
-        return settings
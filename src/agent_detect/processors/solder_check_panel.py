@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from typing import Any
+from PySide6.QtWidgets import QVBoxLayout
+
+from .panel import ConfigPanel
+
+from PySide6.QtCore import Signal
+from PySide6.QtWidgets import (
+    QTableWidgetItem,
+    QTableWidget,
+    QInputDialog,
+    QMessageBox,
+    QHeaderView,
+    QHBoxLayout,
+    QPushButton,
+    QCheckBox,
+    QSpinBox,
+    QWidget,
+)
+from PySide6.QtCore import Qt
+
+
+TEST_SOLDER = {1: "Loại 1", 2: "Loại 2", 3: "Loại 3"}
+
+
+class SoilderCheckConfigPanel(ConfigPanel):
+    configChanged = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._solder: dict[int, str] = TEST_SOLDER  # id -> tên
+        self._setup_ui()
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self._table_widget = QTableWidget(self)
+        self._table_widget.setColumnCount(3)
+        self._table_widget.setHorizontalHeaderLabels(["Loại", "Số lượng", "Chọn"])
+        self._table_widget.cellDoubleClicked.connect(self._on_cell_double_clicked)
+
+        header = self._table_widget.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Fixed)
+        header.setSectionResizeMode(2, QHeaderView.ResizeMode.Fixed)
+        self._table_widget.setColumnWidth(1, 80)
+        self._table_widget.setColumnWidth(2, 40)
+        self._table_widget.setHorizontalScrollBarPolicy(
+            Qt.ScrollBarPolicy.ScrollBarAsNeeded
+        )
+        self._table_widget.setVerticalScrollBarPolicy(
+            Qt.ScrollBarPolicy.ScrollBarAsNeeded
+        )
+        self._table_widget.setMinimumSize(200, 100)
+
+        button_layout = QHBoxLayout()
+        add_button = QPushButton("Thêm")
+        add_button.clicked.connect(self._show_add_dialog)
+
+        delete_button = QPushButton("Xóa")
+        delete_button.clicked.connect(self._delete_selected_rows)
+        delete_button.setStyleSheet(
+            "QPushButton {background-color: #e74c3c;color: white;border: none;}"
+            "QPushButton:hover {background-color: #c0392b;}"
+            "QPushButton:pressed {background-color: #a93226;}"
+        )
+        button_layout.addWidget(add_button)
+        button_layout.addWidget(delete_button)
+
+        layout.addWidget(self._table_widget)
+        layout.addLayout(button_layout)
+
+    # --- Dialog thêm một dòng: chọn theo tên, map ngược -> id
+    def _show_add_dialog(self):
+        if not self._solder:
+            QMessageBox.warning(self, "Cảnh báo", "Danh sách mối hàn trống!")
+            return
+
+        names = list(self._solder.values())
+        name, ok = QInputDialog.getItem(
+            self, "Chọn loại", "Chọn một loại:", names, 0, False
+        )
+        if ok and name:
+            cid = next((k for k, v in self._solder.items() if v == name), None)
+            if cid is not None:
+                self._add_row(cid, 0)
+
+    # --- Thêm một dòng theo ID + số lượng
+    def _add_row(self, cid: int, quantity: int) -> None:
+        if cid is None or cid not in self._solder:
+            return
+
+        row = self._table_widget.rowCount()
+        self._table_widget.insertRow(row)
+
+        # Cột tên (hiển thị tên, lưu ID ở UserRole)
+        name = self._solder[cid]
+        item = QTableWidgetItem(name)
+        item.setData(Qt.ItemDataRole.UserRole, cid)
+        item.setFlags(Qt.ItemFlag.ItemIsEnabled)
+        self._table_widget.setItem(row, 0, item)
+
+        # Cột số lượng (QSpinBox)
+        container_qty = QWidget()
+        spinbox = QSpinBox()
+        spinbox.setRange(0, 100)
+        spinbox.setValue(int(quantity))
+        spinbox.setStyleSheet(
+            "QSpinBox::up-button, QSpinBox::down-button { width: 0; }"
+        )
+        spinbox.valueChanged.connect(lambda _v: self.configChanged.emit())
+        lay_qty = QHBoxLayout(container_qty)
+        lay_qty.setContentsMargins(0, 0, 0, 0)
+        lay_qty.addWidget(spinbox)
+        self._table_widget.setCellWidget(row, 1, container_qty)
+
+        # Cột chọn (checkbox)
+        container_chk = QWidget()
+        checkbox = QCheckBox()
+        lay_chk = QHBoxLayout(container_chk)
+        lay_chk.setContentsMargins(0, 0, 0, 0)
+        lay_chk.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        lay_chk.addWidget(checkbox)
+        self._table_widget.setCellWidget(row, 2, container_chk)
+
+        self.configChanged.emit()
+
+    # --- Đổi loại (chỉ đổi tên hiển thị, không đổi ID)
+    def _on_cell_double_clicked(self, row: int, column: int) -> None:
+        if column != 0:
+            return
+        item = self._table_widget.item(row, 0)
+        if not item:
+            return
+        names = list(self._solder.values())
+        new_name, ok = QInputDialog.getItem(
+            self, "Đổi loại", "Tên mới:", names, 0, False
+        )
+        if not ok:
+            return
+        item.setText(new_name)
+        self.configChanged.emit()
+
+    def _delete_selected_rows(self):
+        rows_to_delete = []
+        for row in range(self._table_widget.rowCount()):
+            container = self._table_widget.cellWidget(row, 2)
+            checkbox = container.findChild(QCheckBox) if container else None
+            if checkbox and checkbox.isChecked():
+                rows_to_delete.append(row)
+
+        if not rows_to_delete:
+            QMessageBox.information(
+                self, "Thông báo", "Không có hàng nào được chọn để xóa!"
+            )
+            return
+
+        for row in reversed(rows_to_delete):
+            self._table_widget.removeRow(row)
+
+        self.configChanged.emit()
+
+    # --- Nhận mapping id->name mới
+    def set_class_names(self, class_names: dict[int, str]) -> None:
+        if not class_names:
+            return
+        self._solder = class_names
+        for r in range(self._table_widget.rowCount()):
+            item = self._table_widget.item(r, 0)
+            if not item:
+                continue
+            cid = int(item.data(Qt.ItemDataRole.UserRole))
+            if cid is not None:
+                item.setText(class_names[cid])
+
+    # --- Load/Save
+    def load_settings(self, s: dict[str, Any]) -> None:
+        # name: mapping id->name
+        self._solder = s.get("name", TEST_SOLDER)
+        solders = s.get("solders", [])
+        qtys = s.get("quantity", [])
+        for cid, q in zip(solders, qtys):
+            self._add_row(int(cid), int(q) or 0)
+
+    def dump_settings(self) -> dict[str, Any]:
+        settings = {"name": self._solder, "solders": [], "quantity": []}
+        for row in range(self._table_widget.rowCount()):
+            item = self._table_widget.item(row, 0)
+            cid = int(item.data(Qt.ItemDataRole.UserRole)) if item else None
+
+            qty_container = self._table_widget.cellWidget(row, 1)
+            spinbox = qty_container.findChild(QSpinBox) if qty_container else None
+            qv = int(spinbox.value()) if spinbox else 0
+
+            if cid is not None:
+                settings["solders"].append(cid)
+                settings["quantity"].append(qv)
+
+        return settings
@@ -1,2 +1,4 @@
 from .show_results import ShowResultsDialog
-from .common import plot, to_rgb, put_status
\ No newline at end of file
+from .common import plot, to_rgb, put_status
+from .inference_config import InferenceConfigDialog, DEFAULT_INFERENCE
+from .pipeline_config import PipelineConfigDialog
@@ -0,0 +1,111 @@
+"""
+Chọn backend suy luận cho model YOLO: PyTorch (.pt), ONNX Runtime hoặc OpenVINO.
+
+File `.pt` được export sang backend đã chọn một lần rồi lưu cạnh file gốc, tên chứa
+hash nội dung + imgsz (vd: `best.3f2a9c1d.640.onnx`, `best.3f2a9c1d.640_openvino_model/`),
+nên lần sau nạp ngay và tự export lại khi file .pt đổi. Ultralytics `YOLO(path)` tự
+chạy artifact qua đúng runtime.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+PYTORCH = "pytorch"
+ONNX = "onnx"
+OPENVINO = "openvino"
+BACKENDS = (PYTORCH, ONNX, OPENVINO)
+
+# Package runtime cần có để chạy artifact của từng backend
+_RUNTIMES = {PYTORCH: "torch", ONNX: "onnxruntime", OPENVINO: "openvino"}
+
+# Một khóa cho mỗi artifact: hai lần nạp cùng model không export song song
+_export_locks: dict[Path, threading.Lock] = {}
+_export_locks_guard = threading.Lock()
+
+
+def available_backends() -> list[str]:
+    """Các backend có runtime đã cài."""
+    return [b for b in BACKENDS if importlib.util.find_spec(_RUNTIMES[b]) is not None]
+
+
+def backend_of(path: str | Path) -> str:
+    """Backend tương ứng với một file / thư mục model."""
+    p = Path(path)
+    if p.suffix.lower() == ".onnx":
+        return ONNX
+    if p.is_dir() and p.name.endswith("_openvino_model"):
+        return OPENVINO
+    return PYTORCH
+
+
+def file_hash(path: str | Path, chunk: int = 1 << 20) -> str:
+    """16 ký tự đầu SHA-256 nội dung file."""
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        while data := f.read(chunk):
+            h.update(data)
+    return h.hexdigest()[:16]
+
+
+def cached_path(pt_path: str | Path, backend: str, imgsz: int) -> Path:
+    """Đường dẫn artifact export trong cache (cạnh file .pt)."""
+    p = Path(pt_path)
+    key = f"{p.stem}.{file_hash(p)}.{int(imgsz)}"
+    if backend == ONNX:
+        return p.with_name(f"{key}.onnx")
+    if backend == OPENVINO:
+        return p.with_name(f"{key}_openvino_model")
+    raise ValueError(f"Backend không cần export: {backend}")
+
+
+def export_model(pt_path: str | Path, backend: str, imgsz: int = 640) -> Path:
+    """Export `.pt` sang `backend` (nếu chưa có trong cache) và trả về đường dẫn artifact."""
+    target = cached_path(pt_path, backend, imgsz)
+    with _export_locks_guard:
+        lock = _export_locks.setdefault(target, threading.Lock())
+    with lock:
+        if target.exists():
+            return target
+        return _export(pt_path, backend, imgsz, target)
+
+
+def _export(pt_path: str | Path, backend: str, imgsz: int, target: Path) -> Path:
+    from ultralytics.models import YOLO
+
+    print(f"[Detect] Export {Path(pt_path).name} -> {backend} (imgsz={imgsz})...")
+    # Ultralytics ghi artifact cạnh file nguồn (`<stem>.onnx`, `<stem>_openvino_model/`):
+    # export từ bản copy trong thư mục tạm để không ghi đè file cùng tên của người dùng
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / Path(pt_path).name
+        shutil.copy2(pt_path, src)
+        # dynamic: cho phép batch > 1 (YoloWorker batching)
+        out = Path(YOLO(str(src)).export(format=backend, imgsz=int(imgsz), dynamic=True))
+        # Process khác đã export xong trước (có thể đang nạp artifact đó): giữ bản có sẵn,
+        # bản vừa export bị xoá cùng thư mục tạm
+        if not target.exists():
+            shutil.move(str(out), str(target))
+    return target
+
+
+def resolve_model(path: str | Path, backend: str = PYTORCH, imgsz: int = 640) -> tuple[Path, str]:
+    """
+    Trả về (đường dẫn để nạp, backend thực tế). Chỉ export khi đầu vào là `.pt` và
+    backend khác PyTorch; lỗi export / thiếu runtime thì quay về PyTorch.
+    """
+    p = Path(path)
+    if backend == PYTORCH or p.suffix.lower() != ".pt":
+        return p, backend_of(p)
+    if backend not in available_backends():
+        print(f"[Detect] Chưa cài runtime cho {backend}, dùng PyTorch")
+        return p, PYTORCH
+    try:
+        return export_model(p, backend, imgsz), backend
+    except Exception as e:
+        print(f"[Detect] Export {backend} lỗi ({e}), dùng PyTorch")
+        return p, PYTORCH
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+from typing import Any, Mapping, Optional
+from PySide6.QtCore import Signal
+from PySide6.QtWidgets import (
+    QDialog,
+    QWidget,
+    QFormLayout,
+    QSpinBox,
+    QDoubleSpinBox,
+    QCheckBox,
+    QLineEdit,
+    QComboBox,
+    QDialogButtonBox,
+)
+
+# Giá trị mặc định khớp với mặc định của Ultralytics predict()
+DEFAULT_INFERENCE: dict[str, Any] = {
+    "imgsz": 640,
+    "half": False,
+    "max_det": 300,
+    "iou": 0.7,
+    "classes": None,
+    "device": "",
+    "threads": 0,
+    # Suy luận theo tile chồng lấn (đối tượng nhỏ trên ảnh độ phân giải cao)
+    "tile": False,
+    "tile_size": 640,
+    "tile_overlap": 0.2,
+    # Vùng suy luận [x1, y1, x2, y2] theo % frame; rỗng = cả frame
+    "rois": [],
+}
+
+
+def parse_classes(text: str) -> Optional[list[int]]:
+    """'0, 2,5' -> [0, 2, 5]; chuỗi rỗng -> None (không lọc)."""
+    ids = [int(t) for t in text.replace(";", ",").split(",") if t.strip()]
+    return ids or None
+
+
+def parse_rois(text: str) -> list[list[float]]:
+    """'10,20,60,80; 0,0,30,30' -> [[10, 20, 60, 80], [0, 0, 30, 30]] (% frame)."""
+    rois = []
+    for chunk in text.split(";"):
+        if not chunk.strip():
+            continue
+        roi = [float(t) for t in chunk.split(",")]
+        if len(roi) != 4 or not (roi[0] < roi[2] and roi[1] < roi[3]):
+            raise ValueError(f"ROI không hợp lệ: {chunk.strip()}")
+        rois.append(roi)
+    return rois
+
+
+def format_rois(rois) -> str:
+    return "; ".join(",".join(f"{v:g}" for v in roi) for roi in rois or [])
+
+
+class InferenceConfigDialog(QDialog):
+    """
+    Dialog cấu hình tham số suy luận của YoloWorker (imgsz, half, max_det, iou, classes,
+    device, số luồng Torch, ROI, tiling). Phát `settings_changed` khi người dùng bấm OK.
+    """
+
+    settings_changed = Signal(dict)
+
+    def __init__(
+        self,
+        parent: Optional[QWidget] = None,
+        settings: Optional[Mapping[str, Any]] = None,
+    ):
+        super().__init__(parent)
+        self.setWindowTitle("Tham số suy luận")
+        form = QFormLayout(self)
+
+        self.sbImgsz = QSpinBox(self)
+        self.sbImgsz.setRange(32, 4096)
+        self.sbImgsz.setSingleStep(32)
+        form.addRow("Kích thước vào (imgsz):", self.sbImgsz)
+
+        self.chkHalf = QCheckBox("FP16 (chỉ GPU)", self)
+        form.addRow("Half precision:", self.chkHalf)
+
+        self.sbMaxDet = QSpinBox(self)
+        self.sbMaxDet.setRange(1, 10000)
+        form.addRow("Số đối tượng tối đa:", self.sbMaxDet)
+
+        self.sbIou = QDoubleSpinBox(self)
+        self.sbIou.setRange(0.0, 1.0)
+        self.sbIou.setSingleStep(0.05)
+        self.sbIou.setDecimals(2)
+        form.addRow("IoU NMS:", self.sbIou)
+
+        self.leClasses = QLineEdit(self)
+        self.leClasses.setPlaceholderText("Tất cả (vd: 0,2,5)")
+        form.addRow("Chỉ lớp:", self.leClasses)
+
+        self.cbDevice = QComboBox(self)
+        self.cbDevice.setEditable(True)
+        self.cbDevice.addItems(["", "cpu", "0", "1"])
+        self.cbDevice.lineEdit().setPlaceholderText("Tự động")
+        form.addRow("Thiết bị:", self.cbDevice)
+
+        self.sbThreads = QSpinBox(self)
+        self.sbThreads.setRange(0, 64)
+        self.sbThreads.setSpecialValueText("Mặc định")
+        form.addRow("Luồng Torch:", self.sbThreads)
+
+        self.leRois = QLineEdit(self)
+        self.leRois.setPlaceholderText("Cả frame (vd: 10,20,60,80; 0,0,30,30)")
+        self.leRois.setToolTip("Các vùng x1,y1,x2,y2 theo % frame, cách nhau bởi ';'")
+        form.addRow("ROI suy luận (%):", self.leRois)
+
+        self.chkTile = QCheckBox("Chia frame thành tile chồng lấn", self)
+        form.addRow("Tiling:", self.chkTile)
+
+        self.sbTileSize = QSpinBox(self)
+        self.sbTileSize.setRange(64, 4096)
+        self.sbTileSize.setSingleStep(32)
+        self.sbTileSize.setSuffix(" px")
+        form.addRow("Kích thước tile:", self.sbTileSize)
+
+        self.sbTileOverlap = QDoubleSpinBox(self)
+        self.sbTileOverlap.setRange(0.0, 0.9)
+        self.sbTileOverlap.setSingleStep(0.05)
+        self.sbTileOverlap.setDecimals(2)
+        form.addRow("Chồng lấn tile:", self.sbTileOverlap)
+
+        self.chkTile.toggled.connect(self.sbTileSize.setEnabled)
+        self.chkTile.toggled.connect(self.sbTileOverlap.setEnabled)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel, parent=self
+        )
+        buttons.accepted.connect(self._on_accept)
+        buttons.rejected.connect(self.reject)
+        form.addRow(buttons)
+
+        self.from_dict(settings or DEFAULT_INFERENCE)
+
+    # --- Property tổng hợp settings ---------------------------------------
+
+    def to_dict(self) -> dict[str, Any]:
+        try:
+            classes = parse_classes(self.leClasses.text())
+        except ValueError:
+            classes = None
+        try:
+            rois = parse_rois(self.leRois.text())
+        except ValueError:
+            rois = []
+        return {
+            "imgsz": self.sbImgsz.value(),
+            "half": self.chkHalf.isChecked(),
+            "max_det": self.sbMaxDet.value(),
+            "iou": round(self.sbIou.value(), 2),
+            "classes": classes,
+            "device": self.cbDevice.currentText().strip(),
+            "threads": self.sbThreads.value(),
+            "rois": rois,
+            "tile": self.chkTile.isChecked(),
+            "tile_size": self.sbTileSize.value(),
+            "tile_overlap": round(self.sbTileOverlap.value(), 2),
+        }
+
+    def from_dict(self, value: Mapping[str, Any]) -> None:
+        v = {**DEFAULT_INFERENCE, **(value or {})}
+        self.sbImgsz.setValue(int(v["imgsz"]))
+        self.chkHalf.setChecked(bool(v["half"]))
+        self.sbMaxDet.setValue(int(v["max_det"]))
+        self.sbIou.setValue(float(v["iou"]))
+        self.leClasses.setText(",".join(str(c) for c in (v["classes"] or [])))
+        self.cbDevice.setCurrentText(str(v["device"] or ""))
+        self.sbThreads.setValue(int(v["threads"]))
+        self.leRois.setText(format_rois(v["rois"]))
+        self.chkTile.setChecked(bool(v["tile"]))
+        self.sbTileSize.setValue(int(v["tile_size"]))
+        self.sbTileOverlap.setValue(float(v["tile_overlap"]))
+        self.sbTileSize.setEnabled(self.chkTile.isChecked())
+        self.sbTileOverlap.setEnabled(self.chkTile.isChecked())
+
+    # --- Slots -------------------------------------------------------------
+
+    def _on_accept(self) -> None:
+        for edit, parse in ((self.leClasses, parse_classes), (self.leRois, parse_rois)):
+            try:
+                parse(edit.text())
+            except ValueError:
+                edit.setFocus()
+                edit.selectAll()
+                return
+        self.accept()
+        self.settings_changed.emit(self.to_dict())
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from typing import Any, Mapping, Optional, Sequence
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtWidgets import (
+    QDialog,
+    QWidget,
+    QFormLayout,
+    QComboBox,
+    QDoubleSpinBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QDialogButtonBox,
+)
+
+from ..processors.pipeline import (
+    DEFAULT_PIPELINE,
+    RULE_ALL_OK,
+    RULE_ANY_NG,
+    RULE_WEIGHTED,
+)
+
+_RULE_LABELS = {
+    RULE_ALL_OK: "Tất cả OK",
+    RULE_ANY_NG: "Có NG là NG",
+    RULE_WEIGHTED: "Trọng số",
+}
+
+
+class PipelineConfigDialog(QDialog):
+    """
+    Dialog chọn các processor chạy chung trên một kết quả YOLO, trọng số của từng bước
+    và luật gộp trạng thái. Phát `settings_changed` khi người dùng bấm OK.
+    Không chọn processor nào = chỉ chạy processor đang chọn trong comboMode.
+    """
+
+    settings_changed = Signal(dict)
+
+    def __init__(
+        self,
+        parent: Optional[QWidget] = None,
+        settings: Optional[Mapping[str, Any]] = None,
+    ):
+        super().__init__(parent)
+        self.setWindowTitle("Chuỗi hậu xử lý")
+        form = QFormLayout(self)
+
+        self.tableSteps = QTableWidget(0, 2, self)
+        self.tableSteps.setHorizontalHeaderLabels(["Processor", "Trọng số"])
+        header = self.tableSteps.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Fixed)
+        self.tableSteps.setColumnWidth(1, 80)
+        self.tableSteps.verticalHeader().setVisible(False)
+        form.addRow(self.tableSteps)
+
+        self.cbRule = QComboBox(self)
+        for rule, label in _RULE_LABELS.items():
+            self.cbRule.addItem(label, rule)
+        form.addRow("Luật gộp:", self.cbRule)
+
+        self.sbThreshold = QDoubleSpinBox(self)
+        self.sbThreshold.setRange(0.0, 1.0)
+        self.sbThreshold.setSingleStep(0.05)
+        self.sbThreshold.setDecimals(2)
+        form.addRow("Ngưỡng OK (trọng số):", self.sbThreshold)
+        self.cbRule.currentIndexChanged.connect(
+            lambda: self.sbThreshold.setEnabled(self.cbRule.currentData() == RULE_WEIGHTED)
+        )
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel, parent=self
+        )
+        buttons.accepted.connect(self._on_accept)
+        buttons.rejected.connect(self.reject)
+        form.addRow(buttons)
+
+        self.from_dict(settings or DEFAULT_PIPELINE)
+
+    # --- Danh sách processor ------------------------------------------------
+
+    def set_processors(self, names: Sequence[str]) -> None:
+        """Cập nhật các dòng theo processor đã đăng ký, giữ lựa chọn hiện có."""
+        current = {s["name"]: s for s in self.to_dict()["steps"]}
+        self.tableSteps.setRowCount(0)
+        for name in names:
+            self._add_row(name, current.get(name, {"enabled": False, "weight": 1.0}))
+
+    def _add_row(self, name: str, step: Mapping[str, Any]) -> None:
+        row = self.tableSteps.rowCount()
+        self.tableSteps.insertRow(row)
+        item = QTableWidgetItem(name)
+        item.setFlags(Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsUserCheckable)
+        item.setCheckState(
+            Qt.CheckState.Checked if step.get("enabled", True) else Qt.CheckState.Unchecked
+        )
+        self.tableSteps.setItem(row, 0, item)
+        weight = QDoubleSpinBox(self.tableSteps)
+        weight.setRange(0.0, 100.0)
+        weight.setSingleStep(0.5)
+        weight.setValue(float(step.get("weight", 1.0)))
+        self.tableSteps.setCellWidget(row, 1, weight)
+
+    # --- Property tổng hợp settings ---------------------------------------
+
+    def to_dict(self) -> dict[str, Any]:
+        steps = []
+        for row in range(self.tableSteps.rowCount()):
+            item = self.tableSteps.item(row, 0)
+            steps.append({
+                "name": item.text(),
+                "enabled": item.checkState() == Qt.CheckState.Checked,
+                "weight": round(self.tableSteps.cellWidget(row, 1).value(), 2),
+            })
+        return {
+            "rule": self.cbRule.currentData(),
+            "threshold": round(self.sbThreshold.value(), 2),
+            "steps": steps,
+        }
+
+    def from_dict(self, value: Mapping[str, Any]) -> None:
+        v = {**DEFAULT_PIPELINE, **(value or {})}
+        self.cbRule.setCurrentIndex(max(self.cbRule.findData(v["rule"]), 0))
+        self.sbThreshold.setValue(float(v["threshold"]))
+        self.sbThreshold.setEnabled(self.cbRule.currentData() == RULE_WEIGHTED)
+        # Giữ các processor đã đăng ký nhưng chưa có trong cấu hình (bỏ chọn)
+        names = [self.tableSteps.item(r, 0).text() for r in range(self.tableSteps.rowCount())]
+        saved = {s["name"]: s for s in v["steps"]}
+        self.tableSteps.setRowCount(0)
+        for name in list(saved) + [n for n in names if n not in saved]:
+            self._add_row(name, saved.get(name, {"enabled": False, "weight": 1.0}))
+
+    # --- Slots -------------------------------------------------------------
+
+    def _on_accept(self) -> None:
+        self.accept()
+        self.settings_changed.emit(self.to_dict())
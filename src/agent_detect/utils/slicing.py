@@ -0,0 +1,121 @@
+"""
+Suy luận theo vùng cắt: chỉ đưa vào model các ROI kiểm tra và/hoặc các tile chồng lấn,
+predict cả batch vùng cắt rồi dịch box về toạ độ frame gốc và gộp bằng NMS theo từng lớp
+(class-aware).
+
+Giúp giữ độ phân giải gốc cho đối tượng nhỏ (mối hàn trên ảnh 2592x1944) mà không phải
+tăng `imgsz` cho cả frame, và bỏ qua phần ảnh nằm ngoài vùng kiểm tra.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+import torch
+from torchvision.ops import batched_nms
+from ultralytics.engine.results import Results
+
+# (x0, y0, x1, y1) theo pixel của frame
+Window = tuple[int, int, int, int]
+
+
+def _starts(length: int, size: int, step: int) -> list[int]:
+    if length <= size:
+        return [0]
+    starts = list(range(0, length - size, step))
+    starts.append(length - size)  # tile cuối ôm sát mép
+    return starts
+
+
+def tile_windows(width: int, height: int, size: int, overlap: float = 0.2) -> list[Window]:
+    """Các cửa sổ `size`x`size` phủ kín ảnh, chồng lấn theo tỉ lệ `overlap`."""
+    size = max(1, int(size))
+    step = max(1, int(size * (1.0 - min(max(overlap, 0.0), 0.9))))
+    return [
+        (x, y, min(x + size, width), min(y + size, height))
+        for y in _starts(height, size, step)
+        for x in _starts(width, size, step)
+    ]
+
+
+def roi_windows(width: int, height: int, rois: Sequence[Sequence[float]]) -> list[Window]:
+    """ROI [x1, y1, x2, y2] theo % (như ThreshCheck) -> cửa sổ pixel; bỏ ROI rỗng."""
+    wins = []
+    for x1, y1, x2, y2 in rois:
+        win = (
+            int(np.clip(x1 / 100.0 * width, 0, width)),
+            int(np.clip(y1 / 100.0 * height, 0, height)),
+            int(np.clip(x2 / 100.0 * width, 0, width)),
+            int(np.clip(y2 / 100.0 * height, 0, height)),
+        )
+        if win[2] > win[0] and win[3] > win[1]:
+            wins.append(win)
+    return wins
+
+
+def plan_windows(
+    width: int,
+    height: int,
+    rois: Sequence[Sequence[float]] = (),
+    tile_size: int | None = None,
+    overlap: float = 0.2,
+) -> list[Window] | None:
+    """
+    Các cửa sổ cần predict cho một frame: từng ROI (hoặc cả frame), mỗi vùng lại chia tile
+    nếu có `tile_size`. None = không cắt gì, predict nguyên frame.
+    """
+    regions = roi_windows(width, height, rois) if rois else []
+    if not regions and not tile_size:
+        return None
+    regions = regions or [(0, 0, width, height)]
+    if not tile_size:
+        return regions
+    return [
+        (rx0 + x0, ry0 + y0, rx0 + x1, ry0 + y1)
+        for rx0, ry0, rx1, ry1 in regions
+        for x0, y0, x1, y1 in tile_windows(rx1 - rx0, ry1 - ry0, tile_size, overlap)
+    ]
+
+
+def crop(img: np.ndarray, win: Window) -> np.ndarray:
+    """View (không copy) của `img` trong cửa sổ `win`."""
+    x0, y0, x1, y1 = win
+    return img[y0:y1, x0:x1]
+
+
+def merge_results(
+    orig_img: np.ndarray,
+    parts: Sequence[tuple[Results, Window]],
+    names: dict[int, str],
+    iou: float = 0.7,
+    max_det: int = 300,
+) -> Results:
+    """
+    Gộp kết quả của các vùng cắt thành một `Results` trên frame gốc: cộng offset cửa sổ
+    vào box rồi NMS theo lớp để bỏ box trùng ở vùng chồng lấn.
+    """
+    chunks = []
+    for r, (x0, y0, _, _) in parts:
+        data = r.boxes.data if r.boxes is not None else None
+        if data is None or data.numel() == 0:
+            continue
+        data = data.clone()
+        data[:, [0, 2]] += x0
+        data[:, [1, 3]] += y0
+        chunks.append(data)
+
+    if chunks:
+        data = torch.cat(chunks)
+        if len(parts) > 1:
+            keep = batched_nms(data[:, :4], data[:, 4], data[:, 5].long(), iou)
+            data = data[keep[:max_det]]
+    else:
+        data = torch.zeros((0, 6))
+
+    merged = Results(orig_img, path="", names=names, boxes=data)
+    merged.speed = {
+        k: sum((r.speed or {}).get(k) or 0.0 for r, _ in parts)
+        for k in ("preprocess", "inference", "postprocess")
+    }
+    return merged
@@ -1,36 +1,299 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
 from pathlib import Path
+from typing import Callable
 import numpy as np
 from ultralytics.models import YOLO
 from PySide6.QtCore import QThread, Signal
 from .utils import to_rgb
+from .utils.backends import PYTORCH, resolve_model
+from .utils.inference_config import DEFAULT_INFERENCE
+from .utils.slicing import Window, crop, merge_results, plan_windows
+from ..agent_camera.frame import Frame, detach
+from ..utils.metrics import metrics
+
+
+class ModelCache:
+    """LRU các model đã nạp + warm-up, khóa theo (đường dẫn, mtime, backend, imgsz)."""
+
+    def __init__(self, capacity: int = 3) -> None:
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._models: OrderedDict[tuple, YOLO] = OrderedDict()
+
+    @staticmethod
+    def key(path: str | Path, backend: str, imgsz: int) -> tuple:
+        p = Path(path).resolve()
+        return (str(p), os.path.getmtime(p), backend, int(imgsz))
+
+    def get(self, key: tuple) -> YOLO | None:
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+            return model
+
+    def put(self, key: tuple, model: YOLO) -> None:
+        with self._lock:
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.capacity:
+                self._models.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+
+# Dùng chung: đổi qua lại giữa các sản phẩm không phải nạp lại model
+model_cache = ModelCache()
 
 
 class YoloWorker(QThread):
-    """QThread for processing YOLO model predictions to prevent GUI freezing."""
+    """QThread for processing YOLO model predictions to prevent GUI freezing.
+
+    Batching: gom tối đa `batch_size` frame (hoặc chờ tối đa `batch_wait_ms` kể từ frame đầu),
+    chạy một lần `predict` trên cả list rồi phát `result_ready` riêng cho từng frame nguồn.
+    `batch_size = 1` giữ hành vi cũ: chỉ predict frame mới nhất.
+    """
 
     result_ready = Signal(
-        list
-    )  # Prediction results (Results)        # Comparison result and camera ID
+        object, list
+    )  # Frame nguồn + Prediction results (Results) của riêng frame đó
     error = Signal(str)  # Error messages
+    load_progress = Signal(int, str)  # % + mô tả bước nạp model
+    model_loaded = Signal(object)  # YOLO đã nạp + warm-up xong
+    load_failed = Signal(str)
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self._running = True
 
         self._model = None
-        self._frame = None
+        self._cond = threading.Condition()
+        self._pending: deque[Frame] = deque(maxlen=1)
         self._conf = 0.5
+        self._imgsz: int | None = None
+        self.backend = PYTORCH
+        self.batch_size = 1
+        self.batch_wait_ms = 0.0
+        self.options: dict = dict(DEFAULT_INFERENCE)
+        # Nạp model: một luồng nạp duy nhất, yêu cầu mới nhất thay yêu cầu đang chờ
+        self._load_lock = threading.Lock()
+        self._load_gen = 0
+        self._load_request: tuple | None = None
+        self._loader: threading.Thread | None = None
+
+    def on_frame_ready(self, frame: Frame):
+        """Set frame for processing.
+
+        Không copy: predict chỉ đọc pixel (kể cả frame read-only mượn từ SHM). Khi gom batch
+        (B > 1) frame chờ trong `_pending` được copy để không giữ slot ring SHM.
+        """
+        frame = frame.replace(to_rgb(frame.data))
+        if self.batch_size > 1:
+            frame = detach(frame)
+        with self._cond:
+            if len(self._pending) == self._pending.maxlen:
+                # Frame cũ nhất chưa kịp predict đã bị thay
+                metrics.count("detect.dropped")
+            self._pending.append(frame)
+            self._cond.notify()
+
+    @property
+    def imgsz(self) -> int:
+        return int(self.options["imgsz"])
+
+    def set_options(self, **options) -> None:
+        """
+        Cập nhật tham số suy luận: imgsz, half, max_det, iou, classes, device, threads,
+        rois (vùng suy luận, % frame), tile / tile_size / tile_overlap.
+        `threads` > 0 đặt số luồng intra-op của Torch (toàn tiến trình). Đổi `imgsz` với
+        backend export cần nạp lại model (artifact có kích thước vào cố định).
+        """
+        self.options.update({k: v for k, v in options.items() if k in DEFAULT_INFERENCE})
+        threads = int(self.options.get("threads") or 0)
+        if threads > 0:
+            try:
+                import torch
+
+                torch.set_num_threads(threads)
+            except Exception:
+                pass
 
-    def on_frame_ready(self, frame: np.ndarray):
-        """Set frame for processing."""
-        self._frame = to_rgb(frame.copy())
+    def _predict_kwargs(self) -> dict:
+        o = self.options
+        kwargs = {
+            # Backend export: predict đúng imgsz đã export
+            "imgsz": self._imgsz or self.imgsz,
+            "half": bool(o["half"]),
+            "max_det": int(o["max_det"]),
+            "iou": float(o["iou"]),
+        }
+        if o["classes"]:
+            kwargs["classes"] = list(o["classes"])
+        if o["device"]:
+            kwargs["device"] = o["device"]
+        return kwargs
 
-    def set_model(self, model: str | Path) -> YOLO:
-        self._model = YOLO(model)
-        return self._model
+    def _windows(self, img: np.ndarray) -> list[Window] | None:
+        """Các cửa sổ cắt của một frame; None = predict nguyên frame."""
+        o = self.options
+        h, w = img.shape[:2]
+        return plan_windows(
+            w, h, o["rois"],
+            int(o["tile_size"]) if o["tile"] else None, float(o["tile_overlap"]),
+        )
+
+    def _predict(self, model: YOLO, batch: list[Frame], conf: float, kwargs: dict) -> list:
+        """
+        Predict cả batch trong một lần gọi. Frame có cửa sổ cắt (ROI/tile) được tách thành ảnh
+        con (view, không copy) đưa chung vào batch; box của chúng được dịch về toạ độ frame
+        và gộp bằng NMS theo lớp thành một `Results` cho mỗi frame.
+        """
+        plans = [self._windows(f.data) for f in batch]
+        images = []
+        for frame, wins in zip(batch, plans):
+            images.extend([crop(frame.data, w) for w in wins] if wins else [frame.data])
+        if any(plans):
+            metrics.count("detect.crops", len(images))
+
+        with metrics.timer("detect.inference"):
+            results = model.predict(images, conf=conf, verbose=False, **kwargs)
+        if not any(plans):
+            return results
+
+        merged, i = [], 0
+        for frame, wins in zip(batch, plans):
+            n = len(wins) if wins else 1
+            part = results[i:i + n]
+            i += n
+            if wins:
+                merged.append(merge_results(
+                    frame.data, list(zip(part, wins)), model.names,
+                    iou=kwargs["iou"], max_det=kwargs["max_det"],
+                ))
+            else:
+                merged.append(part[0])
+        return merged
+
+    def set_batch(self, size: int, wait_ms: float = 0.0) -> None:
+        """Đặt kích thước batch (B) và thời gian chờ gom batch tối đa (T, ms)."""
+        with self._cond:
+            self.batch_size = max(1, int(size))
+            self.batch_wait_ms = max(0.0, float(wait_ms))
+            self._pending = deque(self._pending, maxlen=self.batch_size)
+            self._cond.notify()
+
+    def _next_batch(self) -> list[Frame]:
+        """Chờ frame đầu tiên rồi gom thêm tới đủ B frame hoặc hết T ms."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._pending or not self._running, 0.1):
+                return []
+            if self.batch_size > 1 and self.batch_wait_ms > 0:
+                deadline = time.monotonic() + self.batch_wait_ms / 1000.0
+                while self._running and len(self._pending) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            batch = list(self._pending)
+            self._pending.clear()
+        return batch
+
+    def set_model(self, model: str | Path, backend: str = PYTORCH, imgsz: int | None = None,
+                  progress: Callable[[int, str], None] | None = None) -> YOLO:
+        """
+        Nạp model (đồng bộ): export sang `backend` nếu cần, fuse, chạy một lần warm-up ở
+        `imgsz` để lần predict đầu trên dây chuyền không phải trả chi phí khởi tạo lười.
+        Model đã nạp được giữ trong `model_cache` nên nạp lại là tức thì.
+        """
+        return self._apply_model(*self._prepare_model(model, backend, imgsz, progress))
+
+    def _prepare_model(self, model, backend, imgsz, progress) -> tuple[YOLO, str, int]:
+        imgsz = int(imgsz or self.imgsz)
+        report = progress or (lambda pct, msg: None)
+
+        report(5, "Chuẩn bị model")
+        path, backend = resolve_model(model, backend, imgsz)
+        key = ModelCache.key(path, backend, imgsz)
+        yolo = model_cache.get(key)
+        if yolo is None:
+            report(40, f"Nạp {Path(path).name}")
+            yolo = YOLO(path, task="detect")
+            if backend == PYTORCH:
+                try:
+                    yolo.fuse()
+                except Exception:
+                    pass
+            report(70, "Warm-up")
+            kwargs = {**self._predict_kwargs(), "imgsz": imgsz}
+            with metrics.timer("detect.warmup"):
+                yolo.predict(np.zeros((imgsz, imgsz, 3), np.uint8), verbose=False, **kwargs)
+            model_cache.put(key, yolo)
+        report(100, "Sẵn sàng")
+        return yolo, backend, imgsz
+
+    def _apply_model(self, yolo: YOLO, backend: str, imgsz: int) -> YOLO:
+        self.backend = backend
+        # Artifact export có kích thước vào cố định -> predict đúng imgsz đã export
+        self._imgsz = imgsz if backend != PYTORCH else None
+        self._model = yolo
+        return yolo
+
+    def load_model_async(self, model: str | Path, backend: str = PYTORCH,
+                         imgsz: int | None = None) -> None:
+        """
+        Nạp model trên luồng nền (không chặn GUI), báo `load_progress` rồi `model_loaded`
+        hoặc `load_failed`. Trong lúc nạp, model cũ vẫn tiếp tục chạy. Các yêu cầu được nạp
+        lần lượt trên một luồng; yêu cầu chưa bắt đầu bị yêu cầu mới hơn thay thế, yêu cầu
+        đang nạp mà đã cũ thì không được áp.
+        """
+        with self._load_lock:
+            self._load_gen += 1
+            self._load_request = (self._load_gen, model, backend, imgsz)
+            if self._loader is None:
+                self._loader = threading.Thread(target=self._load_loop, name="ModelLoader",
+                                                daemon=True)
+                self._loader.start()
+
+    def _is_current(self, gen: int) -> bool:
+        with self._load_lock:
+            return gen == self._load_gen
+
+    def _load_loop(self) -> None:
+        while True:
+            with self._load_lock:
+                request, self._load_request = self._load_request, None
+                if request is None:
+                    self._loader = None
+                    return
+            gen, model, backend, imgsz = request
+            try:
+                def report(pct, msg):
+                    if self._is_current(gen):
+                        self.load_progress.emit(pct, msg)
+
+                prepared = self._prepare_model(model, backend, imgsz, report)
+                with self._load_lock:
+                    if gen != self._load_gen:
+                        # Đã có yêu cầu mới hơn: giữ model trong cache, không áp
+                        continue
+                    yolo = self._apply_model(*prepared)
+                self.model_loaded.emit(yolo)
+            except Exception as e:
+                if self._is_current(gen):
+                    self.load_failed.emit(str(e))
 
     def clear_model(self):
-        self._frame = None
+        """Bỏ model đang dùng; `model_cache` dùng chung được giữ để đổi sản phẩm vẫn tức thì."""
+        with self._cond:
+            self._pending.clear()
+        with self._load_lock:
+            self._load_gen += 1
+            self._load_request = None
         self._model = None
         try:
             import torch
@@ -46,27 +309,26 @@ class YoloWorker(QThread):
 
     def run(self):
         while self._running and not self.isInterruptionRequested():
-            if self._frame is None:
-                self.msleep(10)
+            batch = self._next_batch()
+            if not batch:
                 continue
             try:
-                frame = self._frame
                 model = self._model
                 conf = self._conf
+                kwargs = self._predict_kwargs()
 
                 if model is None:
-                    self.msleep(10)
                     continue
-                else:
-                    result = model.predict(frame, conf=conf, verbose=False)
-                    self.result_ready.emit(result)
+                results = self._predict(model, batch, conf, kwargs)
+                # Trả kết quả về đúng frame nguồn (seq / camera_id đi theo Frame)
+                for frame, result in zip(batch, results):
+                    metrics.tick("detect.fps")
+                    self.result_ready.emit(frame, [result])
             except Exception as e:
                 import traceback
 
+                metrics.count("detect.errors")
                 self.error.emit(f"Prediction error: {str(e)}\n{traceback.format_exc()}")
-            finally:
-                self._frame = None
-            self.msleep(10)
 
         # điểm dọn dẹp cuối thread
         self._cleanup()
@@ -83,6 +345,8 @@ class YoloWorker(QThread):
     def stop(self):
         """Gracefully stop the thread."""
         self._running = False
+        with self._cond:
+            self._cond.notify_all()
         self.requestInterruption()
         self.quit()
         self.wait() # Đảm bảo thread kết thúc hẳn
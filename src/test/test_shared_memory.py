@@ -0,0 +1,180 @@
+"""Kiểm thử ring buffer SHM (shared_memory_utils): thứ tự đọc, seqlock, lease, notifier."""
+
+import gc
+import os
+import struct
+import threading
+import time
+import uuid
+
+import numpy as np
+import pytest
+
+import shared_memory_utils as smu
+
+SLOT = 4096
+
+
+@pytest.fixture
+def ring():
+    """(writer, reader) trên một kênh riêng cho mỗi test, 4 slot x 4 KB."""
+    name = f"Local\\TestRing_{uuid.uuid4().hex[:8]}"
+    writer = smu.SharedMemoryManager(create=True, n_slots=4, slot_size=SLOT, name=name)
+    reader = smu.SharedMemoryManager(create=False, name=name)
+    yield writer, reader
+    reader.close()
+    writer.close()
+    # close() không unlink semaphore theo tên (glibc: /dev/shm/sem.<tên>) -> dọn sau test
+    sem = os.path.join("/dev/shm", "sem." + name.split("\\")[-1] + "_evt")
+    if os.path.exists(sem):
+        os.remove(sem)
+
+
+def frame(value, shape=(8, 8)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+def lease(shm, index):
+    return struct.unpack_from("<I", shm.shm, shm._slot_hdr(index) + smu._SLOT_LEASE)[0]
+
+
+def test_read_in_write_order(ring):
+    writer, reader = ring
+    for i in range(3):
+        assert writer.write_frame(frame(i), i)
+
+    # Không có last_id: frame mới nhất
+    data, fid = reader.read_frame()
+    assert fid == 2 and (data == 2).all()
+
+    # Có last_id: đọc bù lần lượt các frame còn trong ring
+    last, got = -1, []
+    while True:
+        data, fid = reader.read_frame(last_id=last)
+        if data is None:
+            break
+        assert (data == fid).all()
+        got.append(fid)
+        last = fid
+    assert got == [0, 1, 2]
+
+
+def test_header_roundtrip(ring):
+    writer, reader = ring
+    img = np.arange(4 * 6 * 3, dtype=np.uint16).reshape(4, 6, 3)
+    assert writer.write_frame(img, 7, timestamp=12.5)
+    data, header = reader.read_frame(with_header=True)
+    assert header.frame_id == 7 and header.timestamp == 12.5
+    assert (header.width, header.height, header.channels) == (6, 4, 3)
+    assert header.pixel_format == smu.PIXFMT_BGR24
+    np.testing.assert_array_equal(data, img)
+
+
+def test_odd_seq_slot_is_skipped(ring):
+    writer, reader = ring
+    writer.write_frame(frame(1), 1)
+    hdr = reader._slot_hdr(0)
+    seq = struct.unpack_from("<I", writer.shm, hdr)[0]
+
+    # Writer đang ghi (seq lẻ): reader không trả frame dở dang
+    struct.pack_into("<I", writer.shm, hdr, seq + 1)
+    assert reader.read_frame() == (None, None)
+    assert reader.acquire_frame() == (None, None)
+
+    struct.pack_into("<I", writer.shm, hdr, seq + 2)
+    assert reader.read_frame()[1] == 1
+
+
+def test_torn_read_is_rejected(ring, monkeypatch):
+    writer, reader = ring
+    writer.write_frame(frame(1), 1)
+    hdr = reader._slot_hdr(0)
+    view = reader._view
+
+    def racing_view(shm, index, header):
+        # Writer ghi đè slot trong lúc reader đang copy
+        seq = struct.unpack_from("<I", writer.shm, hdr)[0]
+        struct.pack_into("<I", writer.shm, hdr, seq + 2)
+        return view(shm, index, header)
+
+    monkeypatch.setattr(reader, "_view", racing_view)
+    assert reader.read_frame(retries=3) == (None, None)
+
+
+def test_lease_blocks_slot_reuse(ring):
+    writer, reader = ring
+    writer.write_frame(frame(0), 0)
+    view, fid = reader.acquire_frame()
+    assert fid == 0 and not view.flags.writeable
+    assert lease(reader, 0) == 1
+
+    # Ghi nhiều vòng: slot đang mượn không bị ghi đè
+    for i in range(1, 10):
+        assert writer.write_frame(frame(i), i)
+    assert (view == 0).all()
+
+    # Mượn thêm các slot còn lại -> hết slot trống, writer bỏ frame
+    held = []
+    last = 0
+    for _ in range(3):
+        v, last = reader.acquire_frame(last_id=last)
+        held.append(v)
+    assert writer.write_frame(frame(99), 99) is False
+
+    # View (và view con) bị GC -> lease được trả
+    sub = view[2:4]
+    del view
+    gc.collect()
+    assert lease(reader, 0) == 1
+    del sub
+    gc.collect()
+    assert lease(reader, 0) == 0
+    assert writer.write_frame(frame(100), 100)
+    del held
+
+
+def test_borrow_frame_releases_on_exit(ring):
+    writer, reader = ring
+    writer.write_frame(frame(5), 5)
+    with reader.borrow_frame() as (view, fid):
+        assert fid == 5 and lease(reader, 0) == 1
+    assert lease(reader, 0) == 0
+
+
+def test_lease_survives_reattach(ring):
+    writer, reader = ring
+    writer.write_frame(frame(1), 1)
+    view, _ = reader.acquire_frame()
+    reader.close()
+    assert reader.ensure_connected()
+    assert lease(reader, 0) == 1
+    del view
+    gc.collect()
+    assert lease(reader, 0) == 0
+
+
+def test_oversize_frame_is_dropped(ring):
+    writer, reader = ring
+    assert writer.write_frame(frame(1), 1)
+    assert writer.write_frame(frame(2, shape=(SLOT, 2)), 2) is False
+    assert writer.latest_frame_id() == 1
+    assert reader.read_frame()[1] == 1
+
+
+def test_notifier_wakes_reader(ring):
+    writer, reader = ring
+    if not reader._notifier.available:
+        pytest.skip("FrameNotifier không khả dụng trên hệ thống này")
+
+    # Không có frame: chờ hết timeout
+    t0 = time.monotonic()
+    assert reader.wait_frame(last_id=-1, timeout=0.2) is False
+    assert time.monotonic() - t0 >= 0.15
+
+    # Writer commit frame -> reader được đánh thức trước timeout
+    timer = threading.Timer(0.05, writer.write_frame, (frame(1), 1))
+    timer.start()
+    t0 = time.monotonic()
+    assert reader.wait_frame(last_id=-1, timeout=2.0)
+    assert time.monotonic() - t0 < 1.0
+    timer.join()
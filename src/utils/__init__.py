@@ -1,5 +1,6 @@
 from .common import apply_stylesheet, available_theme, center_window
 from .settings_manager import save_config, load_config, load_meta, save_meta, delete_config, SettingsManager
 from .view_image import ViewImage
+from .metrics import metrics, MetricsRegistry
 
-__all__ = ["apply_stylesheet", "available_theme", "center_window", "save_config", "load_config", "load_meta", "save_meta", "delete_config", "SettingsManager", "ViewImage"]
+__all__ = ["metrics", "MetricsRegistry", "apply_stylesheet", "available_theme", "center_window", "save_config", "load_config", "load_meta", "save_meta", "delete_config", "SettingsManager", "ViewImage"]
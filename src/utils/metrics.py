@@ -0,0 +1,192 @@
+# metrics.py
+"""
+Registry đo hiệu năng pipeline Camera → Detect → Protocol.
+
+Mỗi stage ghi thời gian xử lý (ms) vào một histogram cửa sổ trượt; ngoài ra có bộ đếm
+(drop, lỗi), tốc độ (FPS) và gauge (độ sâu hàng đợi, lấy qua callback lúc chụp snapshot).
+Dùng chung qua instance `metrics`:
+
+    with metrics.timer("detect.inference"):
+        model.predict(...)
+    metrics.tick("detect.fps")
+    metrics.count("detect.errors")
+    metrics.register_gauge("camera.mailbox_depth", lambda: mailbox.depth)
+
+Module không phụ thuộc Qt, an toàn đa luồng.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import numpy as np
+
+# Các cột của snapshot / file xuất
+FIELDS = ["time", "name", "kind", "count", "p50_ms", "p95_ms", "p99_ms", "mean_ms", "max_ms", "value"]
+
+
+class _Histogram:
+    """Mẫu latency (ms) trên cửa sổ trượt + tổng số mẫu từ đầu."""
+
+    def __init__(self, window: int) -> None:
+        self.samples: deque[float] = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, ms: float) -> None:
+        self.samples.append(ms)
+        self.count += 1
+
+    def row(self) -> dict[str, Any]:
+        a = np.fromiter(self.samples, dtype=np.float64)
+        if a.size == 0:
+            return {"count": self.count}
+        p50, p95, p99 = np.percentile(a, (50, 95, 99))
+        return {
+            "count": self.count,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "mean_ms": float(a.mean()),
+            "max_ms": float(a.max()),
+        }
+
+
+class _Rate:
+    """Tốc độ sự kiện (lần/giây) trên các mốc thời gian gần nhất."""
+
+    def __init__(self, window: int) -> None:
+        self.stamps: deque[float] = deque(maxlen=window)
+        self.count = 0
+
+    def tick(self, t: float) -> None:
+        self.stamps.append(t)
+        self.count += 1
+
+    def value(self, now: float, horizon: float = 2.0) -> float:
+        # Chỉ tính các mốc trong `horizon` giây gần nhất để FPS về 0 khi pipeline dừng
+        recent = [t for t in self.stamps if now - t <= horizon]
+        if len(recent) < 2:
+            return 0.0
+        return (len(recent) - 1) / max(recent[-1] - recent[0], 1e-9)
+
+
+class MetricsRegistry:
+    """
+    Registry các chỉ số hiệu năng theo tên stage (vd: "detect.inference").
+
+    Attributes:
+        window (int): Số mẫu gần nhất giữ cho mỗi histogram / rate.
+    """
+
+    def __init__(self, window: int = 1000) -> None:
+        self.window = window
+        self._lock = threading.Lock()
+        self._hists: dict[str, _Histogram] = {}
+        self._rates: dict[str, _Rate] = {}
+        self._counters: dict[str, int] = {}
+        self._gauges: dict[str, Callable[[], float]] = {}
+
+    # -----------------
+    # Ghi nhận
+    # -----------------
+    def record(self, name: str, ms: float) -> None:
+        """Ghi một mẫu latency (ms) cho stage `name`."""
+        with self._lock:
+            h = self._hists.get(name)
+            if h is None:
+                h = self._hists[name] = _Histogram(self.window)
+            h.add(ms)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Đo thời gian khối lệnh và ghi vào histogram `name` (kể cả khi có exception)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - t0) * 1000.0)
+
+    def tick(self, name: str) -> None:
+        """Ghi nhận một sự kiện cho chỉ số tốc độ `name` (FPS)."""
+        now = time.monotonic()
+        with self._lock:
+            r = self._rates.get(name)
+            if r is None:
+                r = self._rates[name] = _Rate(self.window)
+            r.tick(now)
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Tăng bộ đếm `name` (drop, lỗi...)."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def register_gauge(self, name: str, fn: Callable[[], float]) -> None:
+        """Đăng ký gauge: `fn()` được gọi lúc lấy snapshot (vd: độ sâu hàng đợi)."""
+        with self._lock:
+            self._gauges[name] = fn
+
+    def reset(self) -> None:
+        """Xóa mọi mẫu / bộ đếm (giữ các gauge đã đăng ký)."""
+        with self._lock:
+            self._hists.clear()
+            self._rates.clear()
+            self._counters.clear()
+
+    # -----------------
+    # Đọc / xuất
+    # -----------------
+    def snapshot(self) -> list[dict[str, Any]]:
+        """Danh sách dòng chỉ số (các khóa trong FIELDS), sắp theo tên."""
+        now = time.monotonic()
+        stamp = time.time()
+        with self._lock:
+            rows = [{"name": n, "kind": "latency", **h.row()} for n, h in self._hists.items()]
+            rows += [
+                {"name": n, "kind": "rate", "count": r.count, "value": r.value(now)}
+                for n, r in self._rates.items()
+            ]
+            rows += [{"name": n, "kind": "counter", "value": v} for n, v in self._counters.items()]
+            gauges = list(self._gauges.items())
+
+        # Gauge gọi ngoài lock: callback có thể chạm tới lock của đối tượng khác
+        for n, fn in gauges:
+            try:
+                rows.append({"name": n, "kind": "gauge", "value": float(fn())})
+            except Exception:
+                pass
+
+        for row in rows:
+            row["time"] = stamp
+        return sorted(rows, key=lambda r: r["name"])
+
+    def export(self, path: str | Path) -> Path:
+        """
+        Ghi thêm snapshot hiện tại vào `path`: .csv (có header khi file mới) hoặc
+        .jsonl / khác (mỗi dòng một JSON). Trả về đường dẫn đã ghi.
+        """
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        rows = self.snapshot()
+        if p.suffix.lower() == ".csv":
+            new = not p.exists() or p.stat().st_size == 0
+            with p.open("a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=FIELDS)
+                if new:
+                    writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with p.open("a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        return p
+
+
+# Registry dùng chung cho toàn ứng dụng
+metrics = MetricsRegistry()